@@ -0,0 +1,57 @@
+"""基准测试用的郊区页面语料：fixtures/ 中保存的页面及其预期解析结果
+
+每个页面都是 Glen Waverley 3150 的页面，渲染其他郊区时把名称替换掉，
+这样本地替身服务器可以用少量语料模拟任意多个郊区。
+"""
+import json
+import os
+import zlib
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURE_SUBURB = 'Glen Waverley'
+FIXTURE_POSTCODE = '3150'
+BLOCK_PAGE = 'block_page.html'
+
+# 与解析结果比较的字段；date 为 None 表示该页面没有日期，不检查
+CHECKED_FIELDS = ['date', 'house_increase', 'unit_increase', 'house_value', 'unit_value', 'house_rent', 'unit_rent']
+
+
+def load_corpus(fixture_dir=FIXTURE_DIR):
+    """返回 {case: {'html': ..., 'suburb': ..., 'note': ..., 'expected': ...}}，按case名排序"""
+    with open(os.path.join(fixture_dir, 'expected.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    corpus = {}
+    for case in sorted(manifest):
+        with open(os.path.join(fixture_dir, f'{case}.html'), 'r', encoding='utf-8') as f:
+            corpus[case] = dict(manifest[case], html=f.read())
+    return corpus
+
+
+def load_block_page(fixture_dir=FIXTURE_DIR):
+    with open(os.path.join(fixture_dir, BLOCK_PAGE), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def case_for(slug, cases):
+    """按slug确定性地选择一个语料页面，同一个郊区总是得到同样的页面"""
+    return cases[zlib.crc32(slug.encode('utf-8')) % len(cases)]
+
+
+def render_page(html, suburb_name, postcode):
+    """把语料页面中的郊区名称和邮编替换为目标郊区"""
+    return html.replace(FIXTURE_SUBURB, suburb_name).replace(FIXTURE_POSTCODE, postcode)
+
+
+def check_result(case, data, expected):
+    """与预期结果比较，返回不一致的字段列表（空列表表示一致）"""
+    if expected is None:
+        return [] if data is None else ['expected None']
+    if data is None:
+        return ['missing']
+    mismatched = []
+    for field in CHECKED_FIELDS:
+        if field == 'date' and expected.get('date') is None:
+            continue
+        if data.get(field) != expected.get(field):
+            mismatched.append(field)
+    return mismatched
@@ -0,0 +1,154 @@
+"""本地替身代理：转发绝对URL形式的HTTP请求，用于离线测试代理池（proxy_pool.py）
+
+每个代理有一个假的出口IP，通过 X-Forwarded-For 告诉替身服务器（fake_site.py 按它分别限流）。
+可以设置额外延迟、直接返回封禁页面的比例和返回502的比例，模拟慢代理和已经被封的出口IP。
+只支持 http:// 目标，不支持 CONNECT。
+
+单独运行: python benchmarks/fake_proxy.py --count 4 --port 9000 --slow 1 --banned 1
+"""
+import argparse
+import http.client
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import load_block_page
+
+# 转发时去掉的逐跳请求头
+HOP_HEADERS = {'connection', 'proxy-connection', 'keep-alive', 'proxy-authorization', 'te', 'trailer', 'upgrade'}
+# 原样转发回客户端的响应头
+RESPONSE_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Retry-After')
+
+
+class FakeProxy:
+    """代理的行为配置和统计：latency 为额外延迟（秒），block_rate/error_rate 为直接返回403/502的比例"""
+
+    def __init__(self, exit_ip, latency=0.0, block_rate=0.0, error_rate=0.0, seed=None):
+        self.exit_ip = exit_ip
+        self.latency = latency
+        self.block_rate = block_rate
+        self.error_rate = error_rate
+        self.block_page = load_block_page()
+        self.statuses = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _roll(self):
+        with self._lock:
+            value = self._random.random()
+        if value < self.block_rate:
+            return 403
+        if value < self.block_rate + self.error_rate:
+            return 502
+        return None
+
+    def forward(self, url, headers):
+        """返回 (状态码, 响应头列表, 内容)；在调用线程中模拟延迟"""
+        if self.latency:
+            time.sleep(self.latency)
+        status = self._roll()
+        if status == 403:
+            return 403, [('Content-Type', 'text/html; charset=utf-8')], self.block_page.encode('utf-8')
+        if status == 502:
+            return 502, [], b'<html><body><h1>Bad Gateway</h1></body></html>'
+        parts = urlsplit(url)
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        forwarded = {name: value for name, value in headers.items() if name.lower() not in HOP_HEADERS}
+        forwarded['X-Forwarded-For'] = self.exit_ip
+        connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        try:
+            connection.request('GET', path, headers=forwarded)
+            response = connection.getresponse()
+            body = response.read()
+            kept = [(name, response.getheader(name)) for name in RESPONSE_HEADERS if response.getheader(name)]
+            return response.status, kept, body
+        except OSError:
+            return 502, [], b'<html><body><h1>Bad Gateway</h1></body></html>'
+        finally:
+            connection.close()
+
+    def record(self, status):
+        with self._lock:
+            self.statuses[status] += 1
+
+
+def _make_handler(proxy):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if not self.path.startswith('http://'):
+                status, headers, body = 400, [], b'<html><body><h1>Bad Request</h1></body></html>'
+            else:
+                status, headers, body = proxy.forward(self.path, self.headers)
+            proxy.record(status)
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_proxy(exit_ip, host='127.0.0.1', port=0, **options):
+    """在后台线程启动一个替身代理，返回 (server, proxy, proxy_url)；用完调用 server.shutdown()"""
+    proxy = FakeProxy(exit_ip, **options)
+    server = ThreadingHTTPServer((host, port), _make_handler(proxy))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, proxy, f"http://{host}:{server.server_port}"
+
+
+def start_proxies(count, slow=0, banned=0, slow_latency=0.3, host='127.0.0.1', port=0, seed=None):
+    """启动 count 个替身代理：最后 banned 个总是返回封禁页面，其前 slow 个额外延迟 slow_latency 秒
+
+    出口IP依次为 198.51.100.1、198.51.100.2……；port 不为0时从这个端口开始依次使用。
+    """
+    proxies = []
+    for i in range(count):
+        options = {}
+        if i >= count - banned:
+            options['block_rate'] = 1.0
+        elif i >= count - banned - slow:
+            options['latency'] = slow_latency
+        proxies.append(start_proxy(f'198.51.100.{i + 1}', host, port + i if port else 0,
+                                   seed=None if seed is None else seed + i, **options))
+    return proxies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地替身代理')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000, help='第一个代理的端口，之后的代理依次加1')
+    parser.add_argument('--count', type=int, default=4, help='代理数量')
+    parser.add_argument('--slow', type=int, default=0, help='其中慢代理的数量')
+    parser.add_argument('--slow-latency', type=float, default=0.3, help='慢代理的额外延迟（秒）')
+    parser.add_argument('--banned', type=int, default=0, help='其中总是返回封禁页面的代理数量')
+    args = parser.parse_args()
+
+    proxies = start_proxies(args.count, args.slow, args.banned, args.slow_latency, args.host, args.port)
+    print("替身代理已启动（Ctrl+C 退出）:")
+    print(','.join(url for _, _, url in proxies))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for server, proxy, url in proxies:
+            server.shutdown()
+            print(f"{url}（出口 {proxy.exit_ip}）响应状态: {dict(proxy.statuses)}")
+
+
+if __name__ == "__main__":
+    main()
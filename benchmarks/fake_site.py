@@ -0,0 +1,152 @@
+"""onthehouse.com.au 的本地替身服务器：用语料页面响应 /suburb/<州>/<郊区>-<邮编>
+
+可以设置延迟、抖动、错误率和限流（超过速率返回429和封禁页面），用于离线测量抓取吞吐量。
+限流按客户端IP分别计算；经由替身代理（fake_proxy.py）的请求按代理在 X-Forwarded-For 中给出的出口IP计算。
+
+单独运行: python benchmarks/fake_site.py --port 8765 --latency 0.3 --jitter 0.1 --error-rate 0.02 --throttle-rate 5
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import case_for, load_block_page, load_corpus, render_page
+
+SUBURB_PATH = re.compile(r'^/suburb/(?P<state>[a-z]+)/(?P<slug>[a-z0-9-]+?)-(?P<postcode>\d{4})/?$')
+
+
+class FakeSite:
+    """服务器的行为配置和统计；throttle_rate 为每个客户端IP每秒允许的请求数（0表示不限流）"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, throttle_burst=5,
+                 seed=None, case=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.throttle_burst = throttle_burst
+        self.corpus = load_corpus()
+        self.cases = list(self.corpus)
+        self.case = case
+        self.block_page = load_block_page()
+        self.statuses = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # 客户端IP -> [令牌数, 上次补充时间]
+        self._buckets = {}
+
+    def _take_token(self, client=None):
+        if not self.throttle_rate:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._buckets.setdefault(client, [float(self.throttle_burst), now])
+            bucket[0] = min(self.throttle_burst, bucket[0] + (now - bucket[1]) * self.throttle_rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True
+            return False
+
+    def _delay(self):
+        with self._lock:
+            offset = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+            failed = self._random.random() < self.error_rate
+        return max(0.0, self.latency + offset), failed
+
+    def respond(self, path, client=None):
+        """返回 (状态码, HTML)；在调用线程中模拟延迟，client 为限流时使用的客户端IP"""
+        match = SUBURB_PATH.match(path.split('?')[0])
+        if not match:
+            return 404, '<html><body><h1>Not Found</h1></body></html>'
+        if not self._take_token(client):
+            return 429, self.block_page
+        delay, failed = self._delay()
+        time.sleep(delay)
+        if failed:
+            return 500, '<html><body><h1>Internal Server Error</h1></body></html>'
+        slug, postcode = match.group('slug'), match.group('postcode')
+        case = self.case or case_for(slug, self.cases)
+        name = slug.replace('-', ' ').title()
+        return 200, render_page(self.corpus[case]['html'], name, postcode)
+
+    def record(self, status):
+        with self._lock:
+            self.statuses[status] += 1
+
+
+def _make_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            client = self.headers.get('X-Forwarded-For') or self.client_address[0]
+            status, html = site.respond(self.path, client)
+            body = html.encode('utf-8')
+            # 正常页面带 ETag，条件请求命中时返回304（用于测量新鲜度判断省下的流量）
+            etag = f'"{zlib.crc32(body):08x}"' if status == 200 else None
+            if etag and self.headers.get('If-None-Match') == etag:
+                status, body = 304, b''
+            site.record(status)
+            self.send_response(status)
+            if etag:
+                self.send_header('ETag', etag)
+            if status != 304:
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            if status == 429:
+                self.send_header('Retry-After', '1')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_site(host='127.0.0.1', port=0, **options):
+    """在后台线程启动替身服务器，返回 (server, site, base_url)；用完调用 server.shutdown()"""
+    site = FakeSite(**options)
+    server = ThreadingHTTPServer((host, port), _make_handler(site))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, site, f"http://{host}:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='onthehouse.com.au 本地替身服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的平均延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='延迟的随机抖动范围（±秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回500的比例')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='每个客户端IP每秒允许的请求数，超过返回429（0为不限）')
+    parser.add_argument('--throttle-burst', type=int, default=5, help='限流的突发请求数')
+    parser.add_argument('--case', help='所有郊区都使用这个语料页面')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    server, site, base_url = start_site(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                                        error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                                        throttle_burst=args.throttle_burst, seed=args.seed, case=args.case)
+    print(f"替身服务器已启动: {base_url}/suburb/vic/glen-waverley-3150（Ctrl+C 退出）")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"响应状态统计: {dict(site.statuses)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""启动时间基准：在全新的Python进程中测量各入口的导入耗时，并列出被加载的重量级依赖
+
+用法: python benchmarks/import_time.py [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['selenium', 'pandas', 'numpy', 'matplotlib', 'bs4', 'webdriver_manager', 'aiohttp', 'requests',
+                 'tqdm']
+
+# (名称, 在子进程中执行的代码)
+IMPORT_TARGETS = [
+    ('cli', "import cli"),
+    ('result_store', "import result_store"),
+    ('property_analyzer', "import property_analyzer"),
+    ('house_price_scraper', "import house_price_scraper"),
+    ('main-multi_suburb_scraper', "import cli; cli.load_crawler()"),
+    ('report_engine', "import report_engine"),
+]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed, ','.join(heavy) or '-')
+"""
+
+
+def measure_import(code, runs):
+    """每次都启动新进程，避免模块缓存影响结果；返回 (导入耗时中位数秒, 加载的重量级依赖)"""
+    timings = []
+    heavy = ''
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE.format(code=code, heavy=HEAVY_MODULES)],
+                                cwd=ROOT, capture_output=True, text=True)
+        if output.returncode != 0:
+            return None, output.stderr.strip().splitlines()[-1]
+        elapsed, heavy = output.stdout.split()[-2:]
+        timings.append(float(elapsed))
+    return statistics.median(timings), heavy
+
+
+def measure_command(args, runs, cwd):
+    """整条命令（解释器启动 + 导入 + 执行）的耗时中位数"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=cwd, capture_output=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量各入口的导入和启动耗时')
+    parser.add_argument('--runs', type=int, default=5, help='每项测量的重复次数，取中位数')
+    args = parser.parse_args()
+
+    print(f"{'入口':<28}{'导入耗时':>10}  加载的重量级依赖")
+    for name, code in IMPORT_TARGETS:
+        elapsed, heavy = measure_import(code, args.runs)
+        if elapsed is None:
+            print(f"{name:<28}{'失败':>10}  {heavy}")
+        else:
+            print(f"{name:<28}{elapsed * 1000:>8.1f}ms  {heavy}")
+
+    # 用一个小的临时结果库测量快速命令的端到端耗时
+    with tempfile.TemporaryDirectory() as tmp:
+        sys.path.insert(0, ROOT)
+        from result_store import ResultStore
+        store = ResultStore(os.path.join(tmp, 'suburb_analysis.db'))
+        store.add({'date': '2025.04.30', 'suburb': 'Box Hill 3128', 'house_value': 1500000.0,
+                   'house_increase': 12.0, 'house_rent': 700.0, 'unit_value': 600000.0,
+                   'unit_increase': -2.0, 'unit_rent': 500.0})
+        store.close()
+
+        cli = os.path.join(ROOT, 'cli.py')
+        baseline = measure_command(['-c', 'pass'], args.runs, tmp)
+        print(f"\n{'命令':<28}{'总耗时':>10}")
+        print(f"{'python -c pass':<28}{baseline * 1000:>8.1f}ms")
+        for label, command in [('cli.py list', [cli, 'list']), ('cli.py report', [cli, 'report'])]:
+            print(f"{label:<28}{measure_command(command, args.runs, tmp) * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
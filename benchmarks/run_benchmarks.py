@@ -0,0 +1,378 @@
+"""离线基准测试：用语料页面和本地替身服务器测量解析速度和抓取吞吐量
+
+报告每种模式的每分钟郊区数、单个郊区耗时的 p50/p95、与预期结果不一致的数量和Python峰值内存
+（tracemalloc，不含Chrome进程）。--output 把结果连同当前提交追加到 JSON Lines 文件，便于逐个提交比较。
+
+用法:
+    python benchmarks/run_benchmarks.py                                  # parse、fields、http-async
+    python benchmarks/run_benchmarks.py --modes all --suburbs 100 --latency 0.2 --jitter 0.1
+    python benchmarks/run_benchmarks.py --error-rate 0.05 --throttle-rate 20 --output benchmark_results.jsonl
+    python benchmarks/run_benchmarks.py --modes http-async,http-proxies --rate 5 --throttle-rate 5 --proxies 4
+"""
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import case_for, check_result, load_corpus
+from fake_proxy import start_proxies
+from fake_site import start_site
+
+DEFAULT_MODES = ['parse', 'fields', 'http-async']
+CHROME_MODES = ['chrome-script', 'chrome-xpath', 'analyzer']
+ALL_MODES = DEFAULT_MODES + ['http-proxies'] + CHROME_MODES
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def target_urls(base_url, count):
+    """用默认郊区目录生成指向替身服务器的URL，数量不够时循环使用"""
+    from suburb_catalog import load_catalog
+
+    entries = load_catalog()
+    return [f"{base_url}/suburb/{e['state']}/{e['slug']}-{e['postcode']}"
+            for e in (entries[i % len(entries)] for i in range(count))]
+
+
+def _slug(url):
+    return url.rstrip('/').split('/')[-1].rsplit('-', 1)[0]
+
+
+@contextmanager
+def _quiet():
+    """抓取函数会打印大量进度信息，基准测试时丢弃"""
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        yield
+
+
+def bench_parse(args, base_url, corpus):
+    from extraction import extract_from_html
+
+    latencies, results = [], []
+    with _quiet():
+        for _ in range(args.repeat):
+            for case, item in corpus.items():
+                start = time.perf_counter()
+                data = extract_from_html(item['html'], item['suburb'])
+                latencies.append(time.perf_counter() - start)
+                results.append((case, data))
+    mismatches = sum(1 for case, data in results if check_result(case, data, corpus[case]['expected']))
+    return {'pages': len(results), 'ok': sum(1 for _, data in results if data), 'mismatches': mismatches,
+            'sources': _sources(data for _, data in results), 'latencies': latencies}
+
+
+def bench_fields(args, base_url, corpus):
+    """只测字段规则：页面预先转换成文本，计时一次扫描提取全部字段，并统计每个字段由哪条规则匹配到
+
+    没有统计句子的页面（只有内嵌数据）不参与比较。
+    """
+    from extraction import extract_from_text, has_stats_text, html_to_text
+
+    texts = {case: html_to_text(item['html']) for case, item in corpus.items()}
+    cases = [case for case, text in texts.items() if has_stats_text(text) or corpus[case]['expected'] is None]
+    latencies, results, rules = [], [], defaultdict(int)
+    with _quiet():
+        for _ in range(args.repeat):
+            for case in cases:
+                provenance = {}
+                start = time.perf_counter()
+                data = extract_from_text(texts[case], corpus[case]['suburb'], provenance)
+                latencies.append(time.perf_counter() - start)
+                results.append((case, data))
+                for name, found in provenance.items():
+                    rules[f'{name}:{found.rule}'] += 1
+    mismatches = sum(1 for case, data in results if check_result(case, data, corpus[case]['expected']))
+    return {'pages': len(results), 'ok': sum(1 for _, data in results if data), 'mismatches': mismatches,
+            'rules': dict(sorted(rules.items())), 'latencies': latencies}
+
+
+def _sources(results):
+    """各数据来源（内嵌结构化数据或统计句子）的页面数"""
+    counts = defaultdict(int)
+    for data in results:
+        if data:
+            counts[data.get('source', 'text')] += 1
+    return dict(counts)
+
+
+def _network_result(urls, results, latencies, corpus):
+    cases = list(corpus)
+    mismatches = 0
+    for url, data in results:
+        case = case_for(_slug(url), cases)
+        if data is not None and check_result(case, data, corpus[case]['expected']):
+            mismatches += 1
+    return {'pages': len(urls), 'ok': sum(1 for _, data in results if data), 'mismatches': mismatches,
+            'sources': _sources(data for _, data in results), 'latencies': latencies}
+
+
+def _pipeline_crawl(urls, args, timer, proxies=None):
+    """用 main-multi_suburb_scraper.py 的HTTP下载和解析阶段（pipeline.py）抓取，返回 [(url, data)]"""
+    from crawl_engine import extract_page
+    from pipeline import HttpFetchStage, Pipeline, Stage
+
+    results = []
+
+    def parse(item):
+        url, html, validators = item
+        results.append((url, extract_page(url, html, validators, timer) if html else None))
+
+    def failed(item, error):
+        results.append((item if isinstance(item, str) else item[0], None))
+
+    parser = Stage('parse', parse, workers=args.parse_workers, capacity=16, timer=timer, on_error=failed)
+    fetcher = HttpFetchStage('fetch', lambda url, html, validators: parser.put((url, html, validators)),
+                             concurrency=args.concurrency, rate=args.rate, capacity=2 * args.concurrency,
+                             timer=timer, on_error=failed, proxies=proxies)
+    pipeline = Pipeline([fetcher, parser], timer)
+    pipeline.start()
+    for url in urls:
+        fetcher.put(url)
+    pipeline.close()
+    return results
+
+
+def _per_suburb_latencies(timer):
+    """并发抓取时单个郊区的耗时取各阶段之和，不含限速等待"""
+    per_suburb = defaultdict(float)
+    for suburb, stage, elapsed, _, _ in timer.records:
+        if stage != 'throttle':
+            per_suburb[suburb] += elapsed
+    return list(per_suburb.values())
+
+
+def bench_http_async(args, base_url, corpus):
+    from pacing import StageTimer
+
+    urls = target_urls(base_url, args.suburbs)
+    timer = StageTimer()
+    with _quiet():
+        results = _pipeline_crawl(urls, args, timer)
+    return _network_result(urls, results, _per_suburb_latencies(timer), corpus)
+
+
+def bench_http_proxies(args, base_url, corpus):
+    """与 http-async 相同，但经由 --proxies 个本地替身代理（其中有慢代理和被封的代理），每个代理按 --rate 限速"""
+    from pacing import StageTimer
+    from proxy_pool import ProxyPool
+
+    proxies = start_proxies(args.proxies, slow=args.slow_proxies, banned=args.banned_proxies, seed=args.seed)
+    pool = ProxyPool([url for _, _, url in proxies], rate=args.rate, seed=args.seed)
+    urls = target_urls(base_url, args.suburbs)
+    timer = StageTimer()
+    try:
+        with _quiet():
+            results = _pipeline_crawl(urls, args, timer, pool)
+    finally:
+        for server, _, _ in proxies:
+            server.shutdown()
+    result = _network_result(urls, results, _per_suburb_latencies(timer), corpus)
+    result['proxies'] = {f"{item['proxy']}（{proxy.exit_ip}）": dict(item['outcomes'], quarantines=item['quarantines'])
+                         for item, (_, proxy, _) in zip(pool.stats(), proxies)}
+    return result
+
+
+def _bench_chrome_scraper(args, base_url, corpus, extract_mode):
+    from cli import load_crawler
+    from pacing import StageTimer
+
+    scraper = load_crawler()
+    urls = target_urls(base_url, args.suburbs)
+    timer = StageTimer()
+    results, latencies = [], []
+    with _quiet():
+        driver = scraper.setup_driver(args.browser_profile, timer=timer)
+    if driver is None:
+        raise RuntimeError("无法启动Chrome")
+    try:
+        with _quiet():
+            for url in urls:
+                start = time.perf_counter()
+                data = scraper.get_property_data(url, driver, timer=timer, extract_mode=extract_mode,
+                                                 profile=args.browser_profile)
+                latencies.append(time.perf_counter() - start)
+                results.append((url, data))
+    finally:
+        driver.quit()
+    return _network_result(urls, results, latencies, corpus)
+
+
+def bench_chrome_script(args, base_url, corpus):
+    return _bench_chrome_scraper(args, base_url, corpus, 'script')
+
+
+def bench_chrome_xpath(args, base_url, corpus):
+    return _bench_chrome_scraper(args, base_url, corpus, 'xpath')
+
+
+def bench_analyzer(args, base_url, corpus):
+    from pacing import AdaptiveThrottle
+    from property_analyzer import PropertyAnalyzer
+
+    urls = target_urls(base_url, args.suburbs)
+    with _quiet():
+        analyzer = PropertyAnalyzer(workers=1, browser_profile=args.browser_profile)
+    # 测量页面处理本身，限速放开到替身服务器能承受的速度
+    analyzer.throttle = AdaptiveThrottle(rate=args.rate, max_rate=args.rate)
+    latencies, futures = [], []
+    try:
+        with _quiet():
+            # 与 analyze_suburbs 相同：浏览器线程只取回统计区块，解析在线程池中进行；延迟为浏览器占用时间
+            for url in urls:
+                start = time.perf_counter()
+                future = analyzer.submit(url)
+                latencies.append(time.perf_counter() - start)
+                if future:
+                    futures.append(future)
+            results = [future.result() for future in futures]
+    finally:
+        with _quiet():
+            analyzer.close()
+    ok = sum(1 for stats in results if stats and len(stats) > 1)
+    # 分析器只读取统计区块，不与语料的预期结果比较
+    return {'pages': len(urls), 'ok': ok, 'mismatches': 0, 'latencies': latencies}
+
+
+BENCHMARKS = {
+    'parse': bench_parse,
+    'fields': bench_fields,
+    'http-async': bench_http_async,
+    'http-proxies': bench_http_proxies,
+    'chrome-script': bench_chrome_script,
+    'chrome-xpath': bench_chrome_xpath,
+    'analyzer': bench_analyzer,
+}
+
+
+def chrome_available():
+    """安装了 selenium 且能找到Chrome；只检查是否安装，不导入 selenium"""
+    if importlib.util.find_spec('selenium') is None:
+        return False
+    from browser_session import find_chrome_binary
+    return find_chrome_binary() is not None
+
+
+def run_mode(mode, args, base_url, corpus):
+    # tracemalloc 会让纯Python的解析慢两三倍，比较解析速度时可以用 --no-memory 关闭
+    if args.memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = BENCHMARKS[mode](args, base_url, corpus)
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if args.memory else None
+        tracemalloc.stop()
+    latencies = result.pop('latencies')
+    result.update({
+        'mode': mode,
+        'elapsed_s': round(elapsed, 3),
+        'suburbs_per_min': round(result['pages'] / elapsed * 60, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        'peak_mb': round(peak / 1024 / 1024, 2) if peak is not None else None,
+    })
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_table(results):
+    print(f"\n{'模式':<16}{'页面':>6}{'成功':>6}{'不一致':>8}{'郊区/分钟':>12}{'p50(ms)':>10}{'p95(ms)':>10}{'峰值内存(MB)':>14}")
+    for r in results:
+        print(f"{r['mode']:<16}{r['pages']:>6}{r['ok']:>6}{r['mismatches']:>8}{r['suburbs_per_min']:>12}"
+              f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['peak_mb'] if r['peak_mb'] is not None else '-':>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线基准测试（语料页面 + 本地替身服务器）')
+    parser.add_argument('--modes', default=','.join(DEFAULT_MODES),
+                        help=f"逗号分隔，可选 {', '.join(ALL_MODES)}，或 all")
+    parser.add_argument('--suburbs', type=int, default=50, help='网络模式抓取的郊区数量')
+    parser.add_argument('--repeat', type=int, default=200, help='parse 模式每个语料页面的重复次数')
+    parser.add_argument('--concurrency', type=int, default=8, help='http-async 的并发数')
+    parser.add_argument('--parse-workers', type=int, default=2, help='http-async 解析页面的线程数')
+    parser.add_argument('--rate', type=float, default=1000.0, help='每秒请求数上限（基准测试默认不限速）')
+    parser.add_argument('--proxies', type=int, default=4, help='http-proxies 模式的本地替身代理数量')
+    parser.add_argument('--slow-proxies', type=int, default=1, help='其中额外延迟0.3秒的慢代理数量')
+    parser.add_argument('--banned-proxies', type=int, default=1, help='其中总是返回封禁页面的代理数量')
+    parser.add_argument('--browser-profile', default='lean')
+    parser.add_argument('--latency', type=float, default=0.05, help='替身服务器的平均延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.02, help='延迟抖动（±秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='替身服务器返回500的比例')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='替身服务器对每个客户端IP每秒允许的请求数，超过返回429')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='不测量峰值内存（计时更准确）')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='把结果追加到这个 JSON Lines 文件')
+    args = parser.parse_args()
+
+    modes = ALL_MODES if args.modes == 'all' else [m.strip() for m in args.modes.split(',') if m.strip()]
+    unknown = [m for m in modes if m not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的模式: {', '.join(unknown)}")
+
+    corpus = load_corpus()
+    server, site, base_url = start_site(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                        throttle_rate=args.throttle_rate, seed=args.seed)
+    print(f"替身服务器: {base_url}（延迟 {args.latency}s ±{args.jitter}s，错误率 {args.error_rate}，"
+          f"限流 {args.throttle_rate or '无'}）")
+    has_chrome = chrome_available()
+    results = []
+    try:
+        for mode in modes:
+            if mode in CHROME_MODES and not has_chrome:
+                print(f"跳过 {mode}：没有找到Chrome或selenium")
+                continue
+            print(f"正在运行 {mode} ...")
+            try:
+                results.append(run_mode(mode, args, base_url, corpus))
+            except Exception as e:
+                print(f"{mode} 运行失败: {str(e)}")
+    finally:
+        server.shutdown()
+
+    print_table(results)
+    for result in results:
+        if result.get('sources'):
+            print(f"{result['mode']} 数据来源: {result['sources']}")
+        if result.get('rules'):
+            print(f"{result['mode']} 字段规则: {result['rules']}")
+        for proxy, outcomes in result.get('proxies', {}).items():
+            print(f"{result['mode']} 代理 {proxy}: {outcomes}")
+    print(f"\n替身服务器响应状态: {dict(site.statuses)}")
+
+    if args.output and results:
+        run = {'commit': git_commit(), 'time': datetime.now().isoformat(timespec='seconds'),
+               'config': {k: v for k, v in vars(args).items() if k != 'output'}}
+        with open(args.output, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(dict(run, **result), ensure_ascii=False) + '\n')
+        print(f"结果已追加到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
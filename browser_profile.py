@@ -0,0 +1,158 @@
+"""Chrome启动配置：与原来一致的默认模式、可选的精简模式（无头、eager加载、屏蔽重资源），以及每个页面的流量和加载时间统计"""
+import json
+import random
+import threading
+
+from crawl_engine import USER_AGENTS
+
+# 图片、字体、视频、地图和统计/广告脚本都与统计句子无关
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googlesyndication.com*',
+    '*facebook.net*', '*facebook.com/tr*', '*hotjar.com*', '*newrelic.com*', '*nr-data.net*',
+    '*maps.googleapis.com*', '*maps.gstatic.com*', '*api.mapbox.com*', '*tiles.mapbox.com*',
+]
+
+# 默认与原来一样用有界面的浏览器：这个网站对无头浏览器的反应没有验证过，无头的 lean 需要显式选择
+DEFAULT_PROFILE = 'full'
+
+PROFILES = {
+    # 与原来一致：有界面、等待页面完全加载
+    'full': {
+        'headless': False,
+        'page_load_strategy': 'normal',
+        'block_images': False,
+        'blocked_url_patterns': [],
+        'track_bytes': False,
+    },
+    # 无头、DOM可用即返回，屏蔽图片/字体/地图/统计脚本，并统计传输字节数
+    'lean': {
+        'headless': True,
+        'page_load_strategy': 'eager',
+        'block_images': True,
+        'blocked_url_patterns': BLOCKED_URL_PATTERNS,
+        'track_bytes': True,
+    },
+}
+
+
+def get_profile(name_or_profile):
+    if isinstance(name_or_profile, dict):
+        return name_or_profile
+    if name_or_profile not in PROFILES:
+        raise ValueError(f"未知的浏览器配置: {name_or_profile}，可选 {sorted(PROFILES)}")
+    return PROFILES[name_or_profile]
+
+
+def build_chrome_options(profile=DEFAULT_PROFILE, user_agent=None, proxy=None):
+    """根据配置生成ChromeOptions；proxy 为代理地址（Chrome的 --proxy-server 不支持用户名密码）"""
+    from selenium.webdriver.chrome.options import Options
+
+    profile = get_profile(profile)
+    chrome_options = Options()
+
+    # 基本设置
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    if profile['headless']:
+        chrome_options.add_argument('--headless=new')
+    chrome_options.page_load_strategy = profile['page_load_strategy']
+
+    # 高级反检测设置
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.add_argument(f'--user-agent={user_agent or random.choice(USER_AGENTS)}')
+    chrome_options.add_argument('--accept-language=en-US,en;q=0.9')
+    chrome_options.add_argument('--accept=text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8')
+    if proxy:
+        chrome_options.add_argument(f'--proxy-server={proxy}')
+
+    if profile['block_images']:
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+        })
+    if profile['track_bytes']:
+        # 通过性能日志读取Network事件，统计每个页面实际传输的字节数
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return chrome_options
+
+
+def apply_profile(driver, profile=DEFAULT_PROFILE):
+    """浏览器启动后通过DevTools设置URL屏蔽规则"""
+    profile = get_profile(profile)
+    patterns = profile['blocked_url_patterns']
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    except Exception as e:
+        print(f"设置资源屏蔽规则失败: {str(e)}")
+
+
+# 从 Navigation Timing 读取加载时间；跨域资源的 transferSize 可能为0，只作为没有性能日志时的估算
+PAGE_TIMING_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var bytes = nav ? (nav.transferSize || 0) : 0;
+for (var i = 0; i < resources.length; i++) { bytes += resources[i].transferSize || 0; }
+return {
+    bytes: bytes,
+    requests: resources.length + 1,
+    dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd - nav.startTime : null,
+    load_ms: nav && nav.loadEventEnd ? nav.loadEventEnd - nav.startTime : null
+};
+"""
+
+
+def _bytes_from_performance_log(driver):
+    """汇总性能日志中的 Network.loadingFinished 事件；读取后日志会被清空"""
+    total = 0
+    requests = 0
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])['message']
+        if message.get('method') == 'Network.loadingFinished':
+            total += message['params'].get('encodedDataLength', 0)
+            requests += 1
+    return total, requests
+
+
+def page_metrics(driver, profile=DEFAULT_PROFILE):
+    """当前页面的传输字节数、请求数和加载时间（毫秒）"""
+    metrics = driver.execute_script(PAGE_TIMING_SCRIPT) or {}
+    if get_profile(profile)['track_bytes']:
+        try:
+            metrics['bytes'], metrics['requests'] = _bytes_from_performance_log(driver)
+            metrics['bytes_source'] = 'devtools'
+        except Exception:
+            metrics['bytes_source'] = 'resource_timing'
+    else:
+        metrics['bytes_source'] = 'resource_timing'
+    return metrics
+
+
+class PageMetricsLog:
+    """收集每个郊区页面的流量和加载时间"""
+
+    def __init__(self):
+        self.pages = {}
+        self._lock = threading.Lock()
+
+    def record(self, suburb, metrics):
+        with self._lock:
+            self.pages[suburb] = metrics
+
+    def print_summary(self):
+        if not self.pages:
+            return
+        total_bytes = sum(m.get('bytes') or 0 for m in self.pages.values())
+        load_times = [m['dom_content_loaded_ms'] for m in self.pages.values() if m.get('dom_content_loaded_ms')]
+        print(f"\n浏览器页面流量: {len(self.pages)} 个页面，共 {total_bytes / 1024 / 1024:.2f} MB，"
+              f"平均每页 {total_bytes / len(self.pages) / 1024:.0f} KB")
+        if load_times:
+            print(f"平均DOM加载时间: {sum(load_times) / len(load_times):.0f} ms")
@@ -0,0 +1,246 @@
+"""浏览器启动加速：缓存chromedriver路径和版本，并支持连接已经在运行的Chrome（远程调试端口）"""
+import json
+import os
+import shutil
+import subprocess
+import time
+
+from browser_profile import DEFAULT_PROFILE, get_profile
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'melbourne-property-scraper')
+DRIVER_CACHE_FILE = os.path.join(CACHE_DIR, 'chromedriver.json')
+PERSISTENT_PROFILE_DIR = os.path.join(CACHE_DIR, 'chrome-profile')
+DEFAULT_DEBUG_PORT = 9222
+
+CHROME_BINARIES = [
+    'google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome',
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+]
+
+
+def find_chrome_binary():
+    for name in CHROME_BINARIES:
+        path = shutil.which(name) or (name if os.path.isabs(name) and os.path.exists(name) else None)
+        if path:
+            return path
+    return None
+
+
+def chrome_major_version(binary=None):
+    """本机Chrome的主版本号，无法判断时返回None"""
+    binary = binary or find_chrome_binary()
+    if not binary:
+        return None
+    try:
+        output = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=5).stdout
+    except Exception:
+        return None
+    for token in output.split():
+        if token[:1].isdigit():
+            return token.split('.')[0]
+    return None
+
+
+def _load_driver_cache(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _browser_mtime(binary):
+    try:
+        return os.path.getmtime(os.path.realpath(binary)) if binary else None
+    except OSError:
+        return None
+
+
+def resolve_chromedriver(cache_file=DRIVER_CACHE_FILE, max_age_days=30):
+    """返回chromedriver路径
+
+    缓存有效（文件存在、未过期、本机Chrome可执行文件没有被更新过）时直接使用，不做任何网络请求，
+    也不启动Chrome查询版本；否则用webdriver_manager解析一次并写入缓存。
+    解析失败（例如离线）时退回到旧缓存或PATH中的chromedriver。
+    """
+    cached = _load_driver_cache(cache_file)
+    binary = find_chrome_binary()
+    if cached and os.path.exists(cached.get('path', '')):
+        fresh = time.time() - cached.get('resolved_at', 0) < max_age_days * 86400
+        # Chrome升级会替换可执行文件，用修改时间判断比运行 --version 快得多
+        same_browser = cached.get('browser_mtime') == _browser_mtime(binary)
+        if fresh and same_browser:
+            return cached['path']
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+    except Exception as e:
+        print(f"解析chromedriver失败: {str(e)}")
+        if cached and os.path.exists(cached.get('path', '')):
+            print(f"使用缓存的chromedriver: {cached['path']}")
+            return cached['path']
+        path = shutil.which('chromedriver')
+        if path:
+            return path
+        raise
+
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    tmp_file = cache_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({'path': path, 'browser_version': chrome_major_version(binary),
+                   'browser_mtime': _browser_mtime(binary), 'resolved_at': time.time()}, f)
+    os.replace(tmp_file, cache_file)
+    return path
+
+
+def chromedriver_service():
+    """使用缓存的chromedriver路径创建Service；完全无法解析时交给Selenium Manager处理"""
+    from selenium.webdriver.chrome.service import Service
+
+    try:
+        return Service(resolve_chromedriver())
+    except Exception:
+        return Service()
+
+
+def debugger_alive(address, timeout=0.5):
+    """address（host:port）上是否有可以连接的Chrome"""
+    import urllib.request
+
+    try:
+        with urllib.request.urlopen(f"http://{address}/json/version", timeout=timeout) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+
+def launch_persistent_chrome(port=DEFAULT_DEBUG_PORT, user_data_dir=PERSISTENT_PROFILE_DIR, headless=True,
+                             extra_args=(), wait_seconds=15):
+    """在后台启动一个带远程调试端口的Chrome，脚本退出后它继续运行，下次直接连接"""
+    binary = find_chrome_binary()
+    if not binary:
+        raise RuntimeError("找不到Chrome可执行文件")
+    os.makedirs(user_data_dir, exist_ok=True)
+    args = [binary, f'--remote-debugging-port={port}', f'--user-data-dir={user_data_dir}',
+            '--no-first-run', '--no-default-browser-check', '--disable-dev-shm-usage']
+    if headless:
+        args.append('--headless=new')
+    args.extend(extra_args)
+    subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+    address = f"127.0.0.1:{port}"
+    deadline = time.time() + wait_seconds
+    while time.time() < deadline:
+        if debugger_alive(address):
+            return address
+        time.sleep(0.2)
+    raise RuntimeError(f"Chrome在 {wait_seconds} 秒内没有打开调试端口 {port}")
+
+
+def attach_driver(address, profile=DEFAULT_PROFILE, service=None):
+    """连接已经在运行的Chrome；quit()只会断开连接，不会关闭浏览器
+
+    连接模式下chromedriver不接受启动参数，只设置页面加载策略和性能日志，资源屏蔽仍由 apply_profile 完成。
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    profile = get_profile(profile)
+    options = Options()
+    options.debugger_address = address
+    options.page_load_strategy = profile['page_load_strategy']
+    if profile['track_bytes']:
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return webdriver.Chrome(service=service or chromedriver_service(), options=options)
+
+
+def persistent_chrome_args(profile=DEFAULT_PROFILE, user_agent=None):
+    """启动常驻Chrome时使用的命令行参数，与 build_chrome_options 的设置保持一致"""
+    import random
+
+    from crawl_engine import USER_AGENTS
+
+    args = ['--disable-blink-features=AutomationControlled', '--window-size=1920,1080',
+            f'--user-agent={user_agent or random.choice(USER_AGENTS)}', '--accept-language=en-US,en;q=0.9']
+    if get_profile(profile)['block_images']:
+        args.append('--blink-settings=imagesEnabled=false')
+    return args
+
+
+def warm_browser_address(attach=None, keep_browser=False, profile=DEFAULT_PROFILE, port=DEFAULT_DEBUG_PORT):
+    """确定要连接的常驻浏览器地址：优先用 --attach 指定的，其次是本机调试端口上已运行的，
+    keep_browser 为True时必要时启动一个新的；都没有时返回None（按原方式启动新浏览器）"""
+    if attach:
+        if debugger_alive(attach):
+            return attach
+        print(f"无法连接 {attach} 上的Chrome，改为启动新浏览器")
+        return None
+    if not keep_browser:
+        return None
+    address = f"127.0.0.1:{port}"
+    if debugger_alive(address):
+        return address
+    print(f"正在启动常驻Chrome（调试端口 {port}）...")
+    return launch_persistent_chrome(port, headless=get_profile(profile)['headless'],
+                                    extra_args=persistent_chrome_args(profile))
+
+
+def process_tree_rss(pid):
+    """进程及其所有子进程的常驻内存（字节），无法读取时返回None
+
+    安装了 psutil 时使用它；否则在Linux上读取 /proc，其他系统返回None。
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+    if not os.path.isdir('/proc'):
+        return None
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # 第2个字段是带括号的进程名，可能包含空格，从最后一个右括号之后开始分割
+                fields = f.read().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total, found, stack = 0, False, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f'/proc/{current}/statm', 'r') as f:
+                total += int(f.read().split()[1]) * page_size
+            found = True
+        except (OSError, IndexError, ValueError):
+            pass
+        stack.extend(children.get(current, []))
+    return total if found else None
+
+
+def driver_rss(driver):
+    """chromedriver 及其启动的Chrome进程树的常驻内存（字节）
+
+    连接到常驻Chrome（attach_driver）时Chrome不是chromedriver的子进程，只能得到chromedriver本身的内存；
+    无法确定进程时返回None。
+    """
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    pid = getattr(process, 'pid', None)
+    return process_tree_rss(pid) if pid else None
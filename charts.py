@@ -0,0 +1,263 @@
+"""价格趋势图：先把成交记录预先汇总成月度分位数和价格密度网格，再交给进程池并行绘图
+
+绘图只处理汇总后的数组（每个郊区几百个月 × 几十个价格区间），耗时与原始成交数量无关；
+matplotlib 固定使用非交互的 Agg 后端，只在绘图进程中导入。
+
+用法:
+    python charts.py sales.csv --output-dir charts --workers 4
+    python charts.py sales.csv --compare "Box Hill,Doncaster,Glen Waverley" --compare "Carlton,Fitzroy"
+"""
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_OUTPUT_DIR = 'charts'
+PRICE_BINS = 40
+# 对比图每张最多画的郊区数，超过时分成多张
+COMPARE_SIZE = 8
+# 中文字体按顺序尝试，都没有时退回 DejaVu Sans（中文会显示为方框，但不影响出图）
+CJK_FONTS = ['Noto Sans CJK SC', 'Source Han Sans SC', 'PingFang SC', 'Microsoft YaHei', 'SimHei', 'DejaVu Sans']
+
+
+def _month_keys(suburb_codes, days):
+    """郊区编码和月份合成一个整数键（月份为自1970-01的月数）"""
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    return suburb_codes.astype(np.int64) * 100_000 + months + 50_000, months
+
+
+def monthly_quantiles(history):
+    """所有郊区的月度成交数和 25/50/75 分位价格，一次排序算出
+
+    返回 {郊区编码: (月份 datetime64[M], 成交数, p25, p50, p75)}。
+    """
+    if not len(history):
+        return {}
+    keys, months = _month_keys(history.suburb_codes, history.days)
+    order = np.lexsort((history.prices, keys))
+    keys, prices = keys[order], history.prices[order]
+    _, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+
+    def quantile(q):
+        # 组内价格已排序，按位置线性插值，与 np.quantile 的默认口径一致
+        position = starts + q * (counts - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, starts + counts - 1)
+        return prices[low] + (prices[high] - prices[low]) * (position - low)
+
+    p25, p50, p75 = quantile(0.25), quantile(0.5), quantile(0.75)
+    group_codes = history.suburb_codes[order][starts]
+    group_months = months[order][starts].astype('datetime64[M]')
+    bounds = np.flatnonzero(np.diff(group_codes)) + 1
+    result = {}
+    for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(group_codes)]):
+        result[int(group_codes[lo])] = (group_months[lo:hi], counts[lo:hi], p25[lo:hi], p50[lo:hi], p75[lo:hi])
+    return result
+
+
+def price_density(days, prices, bins=PRICE_BINS):
+    """按月份 × 对数价格区间统计成交数；价格范围取 1%~99% 分位，超出的计入两端的区间"""
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    low, high = np.percentile(prices, [1, 99])
+    low, high = max(low, 1.0), max(high, low * 1.01)
+    month_starts = np.arange(months.min(), months.max() + 2)
+    price_edges = np.geomspace(low, high, bins + 1)
+    grid, _, _ = np.histogram2d(months, np.clip(prices, low, high), bins=[month_starts, price_edges])
+    # 返回每个月的起始日期作为横轴边界（比月份数多一个）
+    return grid.T.astype(np.int32), month_starts.astype('datetime64[M]'), price_edges
+
+
+def _safe_filename(name):
+    return re.sub(r'[^\w-]+', '_', name).strip('_').lower() or 'suburb'
+
+
+def suburb_chart_jobs(history, output_dir=DEFAULT_OUTPUT_DIR, suburbs=None, bins=PRICE_BINS, quantiles=None):
+    """每个郊区一张趋势图的绘图任务：密度网格 + 月度中位数和四分位区间
+
+    history 按 (郊区, 日期) 排序，每个郊区的记录是连续的一段，用二分查找取出。
+    quantiles 为 monthly_quantiles 的结果，同时画趋势图和对比图时可以只算一次。
+    """
+    quantiles = monthly_quantiles(history) if quantiles is None else quantiles
+    wanted = None if suburbs is None else {name.lower() for name in suburbs}
+    jobs = []
+    for code, name in enumerate(history.suburbs):
+        if code not in quantiles or (wanted is not None and name.lower() not in wanted):
+            continue
+        lo, hi = np.searchsorted(history.suburb_codes, [code, code + 1])
+        grid, month_edges, price_edges = price_density(history.days[lo:hi], history.prices[lo:hi], bins)
+        months, counts, p25, p50, p75 = quantiles[code]
+        jobs.append({
+            'kind': 'suburb',
+            'title': f'{name} 房价趋势（{hi - lo:,} 笔成交）',
+            'path': os.path.join(output_dir, f'{_safe_filename(name)}.png'),
+            'grid': grid, 'month_edges': month_edges, 'price_edges': price_edges,
+            'months': months, 'counts': counts, 'p25': p25, 'p50': p50, 'p75': p75,
+        })
+    return jobs
+
+
+def comparison_chart_jobs(history, groups, output_dir=DEFAULT_OUTPUT_DIR, size=COMPARE_SIZE, quantiles=None):
+    """郊区对比图的绘图任务：每组郊区的月度中位数画在同一张图上，超过 size 个时拆成多张"""
+    quantiles = monthly_quantiles(history) if quantiles is None else quantiles
+    codes = {name.lower(): code for code, name in enumerate(history.suburbs)}
+    jobs = []
+    for group in groups:
+        found = [name for name in group if codes.get(name.lower()) in quantiles]
+        missing = [name for name in group if name not in found]
+        if missing:
+            print(f"以下郊区没有成交记录，不画入对比图: {', '.join(missing)}")
+        for start in range(0, len(found), size):
+            names = found[start:start + size]
+            series = []
+            for name in names:
+                months, counts, _, p50, _ = quantiles[codes[name.lower()]]
+                series.append((history.suburbs[codes[name.lower()]], months, p50, counts))
+            jobs.append({
+                'kind': 'compare',
+                'title': '月度成交价中位数对比',
+                'path': os.path.join(output_dir, 'compare_' + '_'.join(_safe_filename(n) for n in names)[:120] + '.png'),
+                'series': series,
+            })
+    return jobs
+
+
+def _setup_matplotlib():
+    """在绘图进程中固定使用 Agg 后端，并设置中文字体；缺字的警告每张图都会出现，直接屏蔽"""
+    import warnings
+
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    matplotlib.rcParams['font.sans-serif'] = CJK_FONTS
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    warnings.filterwarnings('ignore', message='Glyph .* missing from')
+    warnings.filterwarnings('ignore', message='.*findfont.*')
+
+
+def _price_formatter():
+    from matplotlib.ticker import FuncFormatter
+    return FuncFormatter(lambda value, _: f'${value / 1e6:.1f}M' if value >= 1e6 else f'${value / 1e3:.0f}K')
+
+
+def _draw_suburb(job):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    density = np.ma.masked_equal(job['grid'], 0)
+    mesh = ax.pcolormesh(job['month_edges'].astype('datetime64[D]'), job['price_edges'], density, cmap='Blues',
+                         shading='flat')
+    fig.colorbar(mesh, ax=ax, label='成交数')
+    months = job['months'].astype('datetime64[D]') + 14
+    ax.fill_between(months, job['p25'], job['p75'], color='tab:orange', alpha=0.25, label='25%~75%')
+    ax.plot(months, job['p50'], color='tab:orange', linewidth=1.5, label='月度中位数')
+    ax.yaxis.set_major_formatter(_price_formatter())
+    ax.set_title(job['title'])
+    ax.set_xlabel('年份')
+    ax.set_ylabel('价格 ($)')
+    ax.grid(True, alpha=0.3)
+    ax.legend(loc='upper left')
+    return fig
+
+
+def _draw_comparison(job):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    for name, months, p50, counts in job['series']:
+        ax.plot(months.astype('datetime64[D]') + 14, p50, linewidth=1.2, label=f'{name}（{int(counts.sum()):,}）')
+    ax.yaxis.set_major_formatter(_price_formatter())
+    ax.set_title(job['title'])
+    ax.set_xlabel('年份')
+    ax.set_ylabel('价格 ($)')
+    ax.grid(True, alpha=0.3)
+    ax.legend(loc='upper left', fontsize='small')
+    return fig
+
+
+DRAWERS = {'suburb': _draw_suburb, 'compare': _draw_comparison}
+
+
+def render_chart(job, dpi=100):
+    """绘制一张图并保存，返回 (路径, 耗时秒)"""
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    fig = DRAWERS[job['kind']](job)
+    # 所有图的版式相同，用固定边距代替 tight_layout（后者每张图要多排版一遍，约占绘图时间的四分之一）
+    fig.autofmt_xdate(bottom=0.12)
+    fig.subplots_adjust(left=0.08, right=0.98 if job['kind'] == 'compare' else 1.0, top=0.93)
+    directory = os.path.dirname(job['path'])
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fig.savefig(job['path'], dpi=dpi)
+    plt.close(fig)
+    return job['path'], time.perf_counter() - start
+
+
+def render_charts(jobs, workers=None, dpi=100):
+    """并行绘制所有图，返回 [(路径, 耗时秒)]；workers 为1时在当前进程中绘制"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        _setup_matplotlib()
+        return [render_chart(job, dpi) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_setup_matplotlib) as pool:
+        # 任务只含汇总后的小数组，按小批量分发减少进程间往返
+        chunksize = max(1, len(jobs) // (workers * 4))
+        return list(pool.map(render_chart, jobs, [dpi] * len(jobs), chunksize=chunksize))
+
+
+def write_price_chart(history, path, title, bins=PRICE_BINS):
+    """在当前进程中为整份成交记录画一张趋势图（所有记录视为同一个郊区）"""
+    jobs = suburb_chart_jobs(history, os.path.dirname(path), bins=bins)
+    if not jobs:
+        return None
+    job = dict(jobs[0], path=path, title=title)
+    _setup_matplotlib()
+    return render_chart(job)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='由成交历史并行绘制各郊区的价格趋势图和对比图')
+    parser.add_argument('paths', nargs='+', help='CSV（可为.gz）、JSON Lines 或 JSON 文件')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='图片输出目录')
+    parser.add_argument('--suburbs', help='只为这些郊区画趋势图（逗号分隔），默认全部')
+    parser.add_argument('--compare', action='append', default=[],
+                        help='画一张对比图的郊区（逗号分隔），可以重复指定')
+    parser.add_argument('--compare-only', action='store_true', help='只画对比图')
+    parser.add_argument('--compare-size', type=int, default=COMPARE_SIZE, help='每张对比图最多的郊区数')
+    parser.add_argument('--bins', type=int, default=PRICE_BINS, help='密度图的价格区间数')
+    parser.add_argument('--workers', type=int, help='绘图进程数，默认为CPU核数')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--dayfirst', action='store_true', help='日期为 日/月/年 格式')
+    args = parser.parse_args()
+
+    from sales_history import SalesHistory
+
+    start = time.perf_counter()
+    history = SalesHistory.from_files(args.paths, dayfirst=args.dayfirst)
+    loaded = time.perf_counter()
+    print(f"读取了 {len(history):,} 条成交记录，耗时 {loaded - start:.2f}s")
+
+    quantiles = monthly_quantiles(history)
+    jobs = []
+    if not args.compare_only:
+        suburbs = [s.strip() for s in args.suburbs.split(',') if s.strip()] if args.suburbs else None
+        jobs.extend(suburb_chart_jobs(history, args.output_dir, suburbs, args.bins, quantiles))
+    groups = [[s.strip() for s in group.split(',') if s.strip()] for group in args.compare]
+    jobs.extend(comparison_chart_jobs(history, groups, args.output_dir, args.compare_size, quantiles))
+    aggregated = time.perf_counter()
+    print(f"汇总了 {len(jobs)} 张图的数据，耗时 {aggregated - loaded:.2f}s")
+    if not jobs:
+        print("没有需要绘制的图")
+        return
+
+    results = render_charts(jobs, args.workers, args.dpi)
+    elapsed = time.perf_counter() - aggregated
+    slowest = max(seconds for _, seconds in results)
+    print(f"绘制了 {len(results)} 张图，耗时 {elapsed:.2f}s（单张最慢 {slowest:.2f}s），已保存到 {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
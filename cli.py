@@ -0,0 +1,164 @@
+"""统一命令行入口：crawl / replay / daemon / analyze / report / list
+
+这个文件只导入标准库；selenium、pandas等依赖由各子命令在执行时才导入，
+查看已保存的数据或由数据库生成报告不需要加载浏览器和数据分析相关的模块。
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CRAWLER_SCRIPT = os.path.join(SCRIPT_DIR, 'main-multi_suburb_scraper.py')
+
+
+def load_crawler():
+    """加载批量抓取脚本（文件名带连字符，不能直接import）"""
+    spec = importlib.util.spec_from_file_location('multi_suburb_scraper', CRAWLER_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run_script_main(main, argv):
+    """用给定参数调用脚本原有的 main()，参数含义与直接运行脚本时相同"""
+    saved_argv = sys.argv
+    sys.argv = [saved_argv[0]] + list(argv)
+    try:
+        main()
+    finally:
+        sys.argv = saved_argv
+
+
+def cmd_crawl(args, extra):
+    _run_script_main(load_crawler().main, extra)
+
+
+def cmd_replay(args, extra):
+    _run_script_main(load_crawler().main, ['--replay'] + extra)
+
+
+def cmd_daemon(args, extra):
+    _run_script_main(load_crawler().main, ['--daemon'] + extra)
+
+
+def cmd_analyze(args, extra):
+    from property_analyzer import main
+    _run_script_main(main, extra)
+
+
+def cmd_sales(args, extra):
+    from sales_history import main
+    _run_script_main(main, extra)
+
+
+def cmd_trends(args, extra):
+    from timeseries import main
+    _run_script_main(main, extra)
+
+
+def _open_existing_store(path):
+    from result_store import ResultStore
+
+    if not os.path.exists(path):
+        print(f"结果数据库 {path} 不存在，请先运行 crawl")
+        return None
+    return ResultStore(path)
+
+
+def cmd_report(args, extra):
+    if args.property_csv:
+        # 由 analyze 保存的CSV重新生成排名报告，需要pandas
+        import pandas as pd
+        from report_engine import render_markdown_report, write_json_report
+
+        df = pd.read_csv(args.property_csv)
+        render_markdown_report(df, 'property_report.md', top_n=args.top, page=args.page,
+                               page_size=args.page_size)
+        write_json_report(df, 'property_data.json')
+        return
+    store = _open_existing_store(args.db)
+    if store is None:
+        return
+    try:
+        store.render_markdown(args.output)
+    finally:
+        store.close()
+    print(f"表格已由 {args.db} 生成到 {args.output}")
+
+
+def cmd_list(args, extra):
+    from result_store import MARKDOWN_HEADER, markdown_row
+
+    store = _open_existing_store(args.db)
+    if store is None:
+        return
+    try:
+        shown = 0
+        lines = [MARKDOWN_HEADER]
+        for row in store.rows(date=args.date, suburb=args.suburb):
+            if args.limit is not None and shown >= args.limit:
+                break
+            lines.append(markdown_row(row))
+            shown += 1
+        sys.stdout.write(''.join(lines))
+        print(f"\n共 {shown} 行（数据库共 {store.count()} 行）")
+    finally:
+        store.close()
+
+
+def build_parser():
+    # 默认值与 result_store.DEFAULT_DB 一致；这里直接写出，构建参数时不导入任何项目模块
+    parser = argparse.ArgumentParser(description='墨尔本郊区房产数据工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    # 这几个子命令的参数（包括 --help）都交给原脚本解析
+    crawl = subparsers.add_parser('crawl', add_help=False,
+                                  help='抓取郊区数据（其余参数传给 main-multi_suburb_scraper.py）')
+    crawl.set_defaults(handler=cmd_crawl)
+    replay = subparsers.add_parser('replay', add_help=False,
+                                   help='不访问网络，用缓存页面重新提取数据（等同 crawl --replay）')
+    replay.set_defaults(handler=cmd_replay)
+    daemon = subparsers.add_parser('daemon', add_help=False,
+                                   help='常驻运行，按更新时间表刷新郊区并随时发布结果（等同 crawl --daemon）')
+    daemon.set_defaults(handler=cmd_daemon)
+    analyze = subparsers.add_parser('analyze', add_help=False,
+                                    help='分析郊区房产数据（其余参数传给 property_analyzer.py）')
+    analyze.set_defaults(handler=cmd_analyze)
+    sales = subparsers.add_parser('sales', add_help=False,
+                                  help='统计成交历史的多时间窗口均价和涨幅（其余参数传给 sales_history.py）')
+    sales.set_defaults(handler=cmd_sales)
+    trends = subparsers.add_parser('trends', add_help=False,
+                                   help='查询环比、同比、滑动平均和排名变化（其余参数传给 timeseries.py）')
+    trends.set_defaults(handler=cmd_trends)
+
+    report = subparsers.add_parser('report', help='由已保存的数据生成报告，不访问网络')
+    report.add_argument('--db', default='suburb_analysis.db', help='结果数据库文件')
+    report.add_argument('--output', default='suburb_analysis.md', help='生成的Markdown表格')
+    report.add_argument('--property-csv',
+                        help='由 analyze 保存的CSV重新生成 property_report.md 和 property_data.json')
+    report.add_argument('--top', type=int, help='每个排名只输出前N个郊区')
+    report.add_argument('--page', type=int, help='分页输出排名时的页码（从1开始）')
+    report.add_argument('--page-size', type=int, help='分页输出排名时每页的郊区数量')
+    report.set_defaults(handler=cmd_report)
+
+    listing = subparsers.add_parser('list', help='查看结果数据库中的数据')
+    listing.add_argument('--db', default='suburb_analysis.db', help='结果数据库文件')
+    listing.add_argument('--date', help='只显示该日期的数据，例如 2025.04.30')
+    listing.add_argument('--suburb', help='按郊区名称筛选（模糊匹配）')
+    listing.add_argument('--limit', type=int, help='最多显示的行数')
+    listing.set_defaults(handler=cmd_list)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    # crawl/replay/daemon/analyze/sales/trends 的参数原样交给对应脚本解析
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command not in ('crawl', 'replay', 'daemon', 'analyze', 'sales', 'trends'):
+        parser.error(f"无法识别的参数: {' '.join(extra)}")
+    args.handler(args, extra)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""HTTP抓取的基本操作：按主机的令牌桶限速、异步下载页面和提取数据，由 pipeline.HttpFetchStage 组合使用"""
+import asyncio
+import random
+import time
+from urllib.parse import urlsplit
+
+from embedded_data import extract_embedded
+from extraction import extract_from_text, html_to_text, suburb_name_from_url
+from freshness import UNCHANGED
+from pacing import AimdController, StageTimer, is_block_page
+
+# HTTP请求和Chrome（browser_profile、browser_session）共用
+USER_AGENTS = [
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3 Safari/605.1.15',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:123.0) Gecko/20100101 Firefox/123.0'
+]
+
+DEFAULT_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 个请求，最多允许 burst 个突发请求
+
+    传入 controller 时，速率由AIMD控制器根据请求结果动态调整。
+    """
+
+    def __init__(self, rate, burst=1, controller=None):
+        if rate <= 0:
+            raise ValueError("rate 必须大于0")
+        self._rate = rate
+        self.controller = controller
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def rate(self):
+        return self.controller.rate if self.controller else self._rate
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class HostRateLimiter:
+    """为每个主机维护一个令牌桶，所有并发请求共享同一限速
+
+    adaptive 为True时，rate 是上限：被限流或出错时自动降速，恢复正常后再逐步提速。
+    """
+
+    def __init__(self, rate, burst=1, adaptive=True):
+        self.rate = rate
+        self.burst = burst
+        self.adaptive = adaptive
+        self.buckets = {}
+
+    def bucket_for(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            controller = AimdController(self.rate, min_rate=min(0.05, self.rate)) if self.adaptive else None
+            self.buckets[host] = TokenBucket(self.rate, self.burst, controller)
+        return self.buckets[host]
+
+    async def acquire(self, url):
+        await self.bucket_for(url).acquire()
+
+    def record(self, url, outcome):
+        controller = self.bucket_for(url).controller
+        if controller:
+            controller.record(outcome)
+
+
+async def fetch_html(session, url, timeout=15, headers=None, validators=None, proxy=None):
+    """获取页面HTML，返回 (html, outcome)，失败时 html 为None
+
+    headers 为额外的请求头（例如条件请求头），服务器返回304时 outcome 为 'not_modified'；
+    传入 validators（dict）时，响应的 ETag / Last-Modified 会写入其中；proxy 为代理地址。
+    """
+    import aiohttp
+
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout), headers=headers,
+                               proxy=proxy) as response:
+            if response.status == 304:
+                return None, 'not_modified'
+            if validators is not None:
+                for header, key in (('ETag', 'etag'), ('Last-Modified', 'last_modified')):
+                    if response.headers.get(header):
+                        validators[key] = response.headers[header]
+            if response.status != 200:
+                print(f"HTTP请求 {url} 返回状态码 {response.status}")
+                return None, 'blocked' if response.status in (403, 429) else 'error'
+            html = await response.text()
+    except asyncio.TimeoutError:
+        print(f"HTTP请求 {url} 超时")
+        return None, 'timeout'
+    except Exception as e:
+        print(f"HTTP请求 {url} 时发生错误: {str(e)}")
+        return None, 'error'
+    # 正常页面的脚本里也可能出现 captcha 等字样，只有缺少统计句子时才判定为封禁页
+    if 'median value' not in html and is_block_page(html):
+        print(f"HTTP请求 {url} 返回了限流/封禁页面")
+        return None, 'blocked'
+    return html, 'ok'
+
+
+def open_session(concurrency=8, headers=None):
+    """抓取用的 aiohttp 会话：连接数上限为并发数，随机选择一个 User-Agent"""
+    import aiohttp
+
+    request_headers = dict(DEFAULT_HEADERS, **{'User-Agent': random.choice(USER_AGENTS)})
+    if headers:
+        request_headers.update(headers)
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency), headers=request_headers)
+
+
+async def fetch_page(session, limiter, url, timeout=15, timer=None, freshness=None, cache=None, proxies=None):
+    """按主机限速下载一个郊区页面，返回 (html, validators)
+
+    传入 proxies（proxy_pool.ProxyPool）时经由代理下载，按每个代理（出口IP）限速，不再按主机限速。
+    下载失败时 html 为None；条件请求返回304且已有保存的数据时 html 为 freshness.UNCHANGED。
+    """
+    timer = timer or StageTimer()
+    suburb_name = suburb_name_from_url(url)
+    proxy = None
+    with timer.stage(suburb_name, 'throttle'):
+        if proxies:
+            proxy = await proxies.acquire_async()
+        else:
+            await limiter.acquire(url)
+    conditional = freshness.conditional_headers(url) if freshness else None
+    validators = {}
+    start = time.perf_counter()
+    with timer.stage(suburb_name, 'fetch'):
+        html, outcome = await fetch_html(session, url, timeout, conditional, validators,
+                                         proxy.url if proxy else None)
+    if proxy:
+        proxies.record(proxy, 'ok' if outcome == 'not_modified' else outcome, time.perf_counter() - start)
+    else:
+        limiter.record(url, 'ok' if outcome == 'not_modified' else outcome)
+    timer.count('page_outcomes', backend='http', outcome=outcome)
+    if outcome == 'not_modified' and not freshness.observe(url, not_modified=True):
+        return UNCHANGED, validators
+    if html and cache:
+        with timer.stage(suburb_name, 'cache'):
+            cache.put(url, html)
+    return html, validators
+
+
+def extract_page(url, html, validators=None, timer=None, freshness=None):
+    """从下载到的页面提取数据（同步函数，可以在事件循环之外的线程中运行）
+
+    找不到统计数据时返回None；传入 freshness 且统计字段与上次保存时相同时返回 freshness.UNCHANGED。
+    """
+    timer = timer or StageTimer()
+    suburb_name = suburb_name_from_url(url)
+    provenance = {}
+    with timer.stage(suburb_name, 'extract'):
+        # 先读内嵌的结构化数据（微秒级），没有时才把整页转换成文本，按字段规则扫描一遍
+        data = extract_embedded(html, suburb_name) or extract_from_text(html_to_text(html), suburb_name, provenance)
+        if freshness and not freshness.observe(url, validators=validators, data=data):
+            data = UNCHANGED
+    if data and data is not UNCHANGED:
+        timer.count('extraction_source', source=data['source'])
+    for name, found in provenance.items():
+        timer.count('field_rule', field=name, rule=found.rule)
+    return data
@@ -0,0 +1,163 @@
+"""WebDriver池：K个常驻浏览器并行工作，按郊区租用，坏掉的浏览器自动替换"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+
+def _quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class DriverPool:
+    """check(driver) 返回False的浏览器（例如所用的代理已被隔离）在下次租用时被替换
+
+    长时间运行时Chrome的内存会不断增长：打开了 max_pages 个页面，或 chromedriver/Chrome 进程树的
+    常驻内存超过 max_rss_mb 的浏览器在下次租用时关闭并换成新的（回收）。
+    """
+
+    def __init__(self, factory, size=2, health_timeout=10, create_attempts=3, check=None, max_pages=None,
+                 max_rss_mb=None):
+        self.factory = factory
+        self.check = check
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.recycled = 0
+        self._pages = {}
+        self.size = max(1, size)
+        self.health_timeout = health_timeout
+        self.create_attempts = create_attempts
+        self.replaced = 0
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._all = set()
+
+    def _create(self):
+        """创建一个新浏览器，失败时重试几次"""
+        for attempt in range(1, self.create_attempts + 1):
+            driver = self.factory()
+            if driver is not None:
+                with self._lock:
+                    self._all.add(driver)
+                return driver
+            print(f"创建浏览器失败（第 {attempt}/{self.create_attempts} 次）")
+        raise RuntimeError("无法创建新的浏览器实例")
+
+    def is_healthy(self, driver):
+        """浏览器能在限定时间内执行脚本才算健康"""
+        if self.check and not self.check(driver):
+            return False
+        result = {}
+        done = threading.Event()
+
+        def run():
+            try:
+                result['value'] = driver.execute_script("return 1")
+            except Exception as e:
+                result['error'] = e
+            finally:
+                done.set()
+
+        # 每次检查用一个单独的守护线程：卡死的浏览器只占住它自己的检查线程（浏览器被丢弃、quit 之后
+        # 这个调用随之出错结束），不会占满共用的线程池，让之后健康浏览器的检查排队超时
+        threading.Thread(target=run, name='driver-health', daemon=True).start()
+        if not done.wait(self.health_timeout):
+            print("浏览器健康检查超时")
+            return False
+        if 'error' in result:
+            print(f"浏览器健康检查失败: {str(result['error'])}")
+            return False
+        return result.get('value') == 1
+
+    def _discard(self, driver):
+        with self._lock:
+            self._all.discard(driver)
+            self._pages.pop(driver, None)
+        # quit() 在卡死的浏览器上也可能卡住，放到后台线程处理
+        threading.Thread(target=_quit_quietly, args=(driver,), daemon=True).start()
+
+    def acquire(self):
+        """租用一个健康的浏览器，没有空闲浏览器且已达上限时阻塞等待"""
+        with self._lock:
+            can_create = self._idle.empty() and self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        driver = self._idle.get()
+        reason = self.recycle_reason(driver)
+        if reason:
+            print(f"回收浏览器：{reason}")
+            self._discard(driver)
+            self.recycled += 1
+        elif self.is_healthy(driver):
+            return driver
+        else:
+            print("替换无响应或不可用的浏览器...")
+            self._discard(driver)
+            self.replaced += 1
+        try:
+            return self._create()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def recycle_reason(self, driver):
+        """浏览器需要回收的原因（打开的页面数或内存超过上限），不需要时返回None"""
+        with self._lock:
+            pages = self._pages.get(driver, 0)
+        if self.max_pages and pages >= self.max_pages:
+            return f"已打开 {pages} 个页面"
+        if self.max_rss_mb:
+            from browser_session import driver_rss
+
+            rss = driver_rss(driver)
+            if rss and rss > self.max_rss_mb * 1024 * 1024:
+                return f"内存 {rss / 1024 / 1024:.0f} MB 超过 {self.max_rss_mb} MB（已打开 {pages} 个页面）"
+        return None
+
+    def release(self, driver):
+        with self._lock:
+            self._pages[driver] = self._pages.get(driver, 0) + 1
+        self._idle.put(driver)
+
+    @contextmanager
+    def lease(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def map(self, urls, scrape):
+        """在 size 个工作线程中并行执行 scrape(url, driver)，按完成顺序产出 (url, data)"""
+        def task(url):
+            try:
+                with self.lease() as driver:
+                    return scrape(url, driver)
+            except Exception as e:
+                print(f"处理 {url} 时发生错误: {str(e)}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='driver-worker') as executor:
+            futures = {executor.submit(task, url): url for url in urls}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def close(self):
+        with self._lock:
+            drivers = list(self._all)
+            self._all.clear()
+        for driver in drivers:
+            _quit_quietly(driver)
@@ -0,0 +1,191 @@
+"""从页面内嵌的结构化数据（Next.js 的 __NEXT_DATA__、window.__INITIAL_STATE__ 之类的状态对象、
+application/json 和 ld+json 脚本）中直接读取郊区统计，找不到时再用 extraction 的英文句子正则
+
+结构化数据里的涨跌幅本身带符号，不需要根据 increase/decrease 猜正负；只查找几段脚本，
+不必把整页HTML转换成文本，单个页面的解析耗时在微秒级。
+"""
+import json
+import re
+from datetime import datetime
+
+# (来源名称, 定位数据开头的正则)；script 标签内是完整的JSON，赋值语句后面是一个JSON对象
+SCRIPT_PAYLOADS = [
+    ('next_data', re.compile(r'<script[^>]*\bid=["\']__NEXT_DATA__["\'][^>]*>', re.I)),
+    ('ld_json', re.compile(r'<script[^>]*\btype=["\']application/ld\+json["\'][^>]*>', re.I)),
+    ('json_script', re.compile(r'<script[^>]*\btype=["\']application/json["\'][^>]*>', re.I)),
+]
+STATE_PAYLOAD = re.compile(
+    r'window\.(__INITIAL_STATE__|__PRELOADED_STATE__|__APOLLO_STATE__|__APP_STATE__)\s*=\s*')
+SCRIPT_END = re.compile(r'</script\s*>', re.I)
+AS_AT_DATE = re.compile(r'As at (\d+ \w+ \d+)')
+
+# 字段名统一为小写、去掉下划线和连字符后比较
+PROPERTY_TYPE_NAMES = {
+    'house': 'house', 'houses': 'house',
+    'unit': 'unit', 'units': 'unit', 'apartment': 'unit', 'apartments': 'unit', 'unitsapartments': 'unit',
+}
+TYPE_KEYS = {'propertytype', 'type', 'dwellingtype', 'category'}
+VALUE_KEYS = {'medianvalue', 'medianprice', 'medianvaluation', 'medianestimatedvalue'}
+RENT_KEYS = {'medianrent', 'weeklyrent', 'medianweeklyrent', 'rent'}
+DATE_KEYS = {'asat', 'asatdate', 'dataasat', 'reportdate', 'valuationdate', 'updatedat', 'lastupdated'}
+DATE_FORMATS = ('%Y-%m-%d', '%d %B %Y', '%d %b %Y', '%Y.%m.%d', '%d/%m/%Y')
+
+
+def _normalize_key(key):
+    return re.sub(r'[_\-\s]', '', str(key)).lower()
+
+
+def _is_change_key(key):
+    """五年涨幅：例如 fiveYearChange、growth5y、capital_growth_5_year"""
+    return ('growth' in key or 'change' in key) and ('5' in key or 'five' in key) and 'rent' not in key
+
+
+def _to_number(value):
+    if isinstance(value, dict):
+        value = next((value[k] for k in ('value', 'amount', 'median') if k in value), None)
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace('$', '').replace(',', '').rstrip('%')
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _parse_date(value):
+    if not isinstance(value, str):
+        return None
+    text = value.strip()
+    for candidate in (text[:10], text):
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.strptime(candidate, date_format).strftime('%Y.%m.%d')
+            except ValueError:
+                continue
+    return None
+
+
+def find_payloads(html):
+    """页面中所有可以解析的内嵌JSON，按 (来源, 对象) 产出；无法解析的片段直接跳过"""
+    for source, pattern in SCRIPT_PAYLOADS:
+        for match in pattern.finditer(html):
+            end = SCRIPT_END.search(html, match.end())
+            if not end:
+                continue
+            try:
+                yield source, json.loads(html[match.end():end.start()])
+            except ValueError:
+                continue
+    decoder = json.JSONDecoder()
+    for match in STATE_PAYLOAD.finditer(html):
+        try:
+            yield 'state', decoder.raw_decode(html, match.end())[0]
+        except ValueError:
+            continue
+
+
+def _stats_from_node(node):
+    """一个对象里的中位价、五年涨幅和租金（没有的字段为None）"""
+    stats = {'value': None, 'change': None, 'rent': None}
+    for key, value in node.items():
+        name = _normalize_key(key)
+        if name in VALUE_KEYS and stats['value'] is None:
+            stats['value'] = _to_number(value)
+        elif name in RENT_KEYS and stats['rent'] is None:
+            stats['rent'] = _to_number(value)
+        elif _is_change_key(name) and stats['change'] is None:
+            stats['change'] = _to_number(value)
+    return stats
+
+
+def find_suburb_stats(payload):
+    """在任意结构的JSON中查找 house 和 unit 的统计，返回 ({类型: 统计}, 日期)
+
+    统计对象可以是 {"house": {...}, "unit": {...}}，也可以是带 propertyType 字段的列表元素；
+    每种类型取第一个同时有中位价和涨幅的对象。日期取统计对象自身或其上层对象中的 asAt 等字段，
+    不会误用页面其他部分的时间戳。
+    """
+    found = {}
+    report_date = None
+    stack = [(None, payload, None)]
+    while stack and len(found) < 2:
+        parent_key, node, inherited_date = stack.pop()
+        if isinstance(node, list):
+            stack.extend((parent_key, item, inherited_date) for item in reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+        property_type = PROPERTY_TYPE_NAMES.get(_normalize_key(parent_key)) if parent_key else None
+        node_date = None
+        for key, value in node.items():
+            name = _normalize_key(key)
+            if name in TYPE_KEYS and isinstance(value, str):
+                property_type = PROPERTY_TYPE_NAMES.get(_normalize_key(value), property_type)
+            elif name in DATE_KEYS and node_date is None:
+                node_date = _parse_date(value)
+        node_date = node_date or inherited_date
+        if property_type and property_type not in found:
+            stats = _stats_from_node(node)
+            if stats['value'] is not None and stats['change'] is not None:
+                found[property_type] = stats
+                report_date = report_date or node_date
+        stack.extend((key, value, node_date) for key, value in reversed(list(node.items()))
+                     if isinstance(value, (dict, list)))
+    return found, report_date
+
+
+def build_record(suburb_name, house, unit, report_date, source):
+    """与 extraction.parse_property_text 返回相同的字段，另加 source 表示数据来源"""
+    house_yield = f"{(house['rent'] * 52 / house['value'] * 100):.2f}%" if house['rent'] and house['value'] else "-"
+    unit_yield = f"{(unit['rent'] * 52 / unit['value'] * 100):.2f}%" if unit['rent'] and unit['value'] else "-"
+    return {
+        'suburb': suburb_name,
+        'date': report_date,
+        'house_increase': house['change'],
+        'unit_increase': unit['change'],
+        'house_value': house['value'],
+        'unit_value': unit['value'],
+        'house_rent': house['rent'],
+        'unit_rent': unit['rent'],
+        'house_yield': house_yield,
+        'unit_yield': unit_yield,
+        'source': source,
+    }
+
+
+def extract_from_payloads(payloads, suburb_name, html=None):
+    """从 (来源, 对象) 中提取郊区数据；与句子解析的要求一致，house 和 unit 的中位价、涨幅都要有
+
+    结构化数据里没有日期时，在 html 中查找 "As at" 日期，仍然没有或无法识别（例如 "5 Sept 2025"）则按当前月份计算。
+    """
+    from extraction import _fallback_report_date
+
+    for source, payload in payloads:
+        found, report_date = find_suburb_stats(payload)
+        if 'house' not in found or 'unit' not in found:
+            continue
+        if report_date is None and html:
+            match = AS_AT_DATE.search(html)
+            if match:
+                report_date = _parse_date(match.group(1))
+        return build_record(suburb_name, found['house'], found['unit'], report_date or _fallback_report_date(),
+                            source)
+    return None
+
+
+def extract_embedded(html, suburb_name):
+    """直接从HTML中的内嵌JSON提取郊区数据，页面没有可用的结构化数据时返回None"""
+    if not html:
+        return None
+    return extract_from_payloads(find_payloads(html), suburb_name, html)
+
+
+def parse_script_payloads(items):
+    """浏览器脚本收集到的 [{'source':..., 'text':...}] 转换为 (来源, 对象)，解析失败的跳过"""
+    for item in items or []:
+        try:
+            yield item.get('source'), json.loads(item.get('text') or '')
+        except ValueError:
+            continue
@@ -0,0 +1,202 @@
+import json
+from datetime import datetime
+from html.parser import HTMLParser
+
+from embedded_data import build_record, extract_embedded, extract_from_payloads, parse_script_payloads
+from field_spec import SUBURB_STATS
+
+
+def suburb_name_from_url(url):
+    """从URL中解析郊区名称，例如 box-hill-3128 -> Box Hill 3128"""
+    return url.rstrip('/').split('/')[-1].replace('-', ' ').title()
+
+
+class _TextCollector(HTMLParser):
+    """把HTML转换为按块分行的纯文本，跳过script/style"""
+
+    BLOCK_TAGS = {'p', 'div', 'li', 'tr', 'td', 'th', 'section', 'article', 'br',
+                  'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'span', 'header', 'footer'}
+    SKIP_TAGS = {'script', 'style', 'noscript', 'template'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    """提取HTML中的可见文本，每个块级元素一行"""
+    collector = _TextCollector()
+    collector.feed(html)
+    collector.close()
+    lines = (' '.join(line.split()) for line in ''.join(collector.parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def find_stats_sections(text):
+    """按与XPath选择器相同的规则，从页面文本中找出统计、价值和租金句子"""
+    sections = {'stats_text': None, 'value_text': None, 'rent_text': None}
+    for line in text.split('\n'):
+        if sections['stats_text'] is None and 'properties' in line and 'median value' in line:
+            sections['stats_text'] = line
+        if sections['value_text'] is None and 'median value' in line and '$' in line:
+            sections['value_text'] = line
+        if sections['rent_text'] is None and 'median rent' in line:
+            sections['rent_text'] = line
+    return sections
+
+
+def has_stats_text(text):
+    """页面文本中是否包含统计数据句子"""
+    return bool(text) and find_stats_sections(text)['stats_text'] is not None
+
+
+def _fallback_report_date():
+    """未找到日期信息时，使用当前月份减1作为日期"""
+    current_date = datetime.now()
+    if current_date.month == 1:
+        # 如果是1月，则变为去年12月
+        last_month_date = current_date.replace(year=current_date.year - 1, month=12)
+    else:
+        last_month_date = current_date.replace(month=current_date.month - 1, day=min(current_date.day, 28))
+    return last_month_date.strftime('%Y.%m.%d')
+
+
+def parse_property_text(suburb_name, stats_text, value_text=None, rent_text=None, full_text=None,
+                        date_text=None, provenance=None):
+    """从统计文本中提取房产数据，字段规则见 field_spec.SUBURB_STATS
+
+    先扫描统计、价值、租金和日期文本，有字段缺失时再扫描整页文本补齐；
+    full_text 可以是字符串或返回字符串的函数，只在需要时才会读取。
+    """
+    sections = '\n'.join(text for text in (stats_text, value_text, rent_text, date_text) if text)
+    matches = SUBURB_STATS.scan(sections)
+    if full_text and len(matches) < len(SUBURB_STATS.fields):
+        text = full_text() if callable(full_text) else full_text
+        if text and text != sections:
+            for name, found in SUBURB_STATS.scan(text).items():
+                matches.setdefault(name, found)
+    return build_stats_record(suburb_name, matches, provenance)
+
+
+def build_stats_record(suburb_name, matches, provenance=None):
+    """由 SUBURB_STATS 的匹配结果生成与内嵌数据相同字段的记录，必需字段缺失时返回None
+
+    传入 provenance（字典）时填入每个字段的 FieldMatch。
+    """
+    if provenance is not None:
+        provenance.update(matches)
+    missing = SUBURB_STATS.missing(matches)
+    if missing:
+        print(f"无法从页面文本提取完整数据，缺少: {', '.join(missing)}")
+        return None
+    fallback = [name for name, found in matches.items() if found.rule == 'loose']
+    if fallback:
+        print(f"以下字段使用了宽松规则: {', '.join(fallback)}")
+
+    if 'date' in matches:
+        report_date = matches['date'].value
+        print(f"从网页提取到日期: {report_date}")
+    else:
+        report_date = _fallback_report_date()
+        print(f"未找到日期信息，使用计算的日期: {report_date}")
+
+    def stats(kind):
+        rent = matches.get(f'{kind}_rent')
+        return {'value': matches[f'{kind}_value'].value, 'change': matches[f'{kind}_increase'].value,
+                'rent': rent.value if rent else None}
+
+    return build_record(suburb_name, stats('house'), stats('unit'), report_date, 'text')
+
+
+def extract_from_html(html, suburb_name):
+    """直接从原始HTML提取房产数据：先读内嵌的结构化数据，没有时再解析统计句子，都找不到时返回None
+
+    返回的数据中 source 表示来源：next_data、ld_json、json_script、state 或 text。
+    """
+    return extract_embedded(html, suburb_name) or extract_from_text(html_to_text(html), suburb_name)
+
+
+def extract_from_text(text, suburb_name, provenance=None):
+    """从 html_to_text 得到的页面文本提取房产数据（整页只扫描一遍），缺少必需字段时返回None"""
+    matches = SUBURB_STATS.scan(text)
+    if not matches:
+        return None
+    return build_stats_record(suburb_name, matches, provenance)
+
+
+# 在浏览器内一次性收集统计、价值、租金和日期文本；统计句子还没出现时返回null
+BROWSER_EXTRACT_SCRIPT = """
+var body = document.body;
+if (!body) { return null; }
+var result = {stats_text: null, value_text: null, rent_text: null, date_text: null, payloads: []};
+var scripts = document.querySelectorAll('script#__NEXT_DATA__, script[type="application/json"], script[type="application/ld+json"]');
+for (var i = 0; i < scripts.length; i++) {
+    var s = scripts[i];
+    var source = s.id === '__NEXT_DATA__' ? 'next_data' : (s.type === 'application/ld+json' ? 'ld_json' : 'json_script');
+    if (s.textContent && s.textContent.indexOf('edian') !== -1) { result.payloads.push({source: source, text: s.textContent}); }
+}
+var states = ['__INITIAL_STATE__', '__PRELOADED_STATE__', '__APOLLO_STATE__', '__APP_STATE__'];
+for (var j = 0; j < states.length; j++) {
+    if (window[states[j]]) {
+        try { result.payloads.push({source: 'state', text: JSON.stringify(window[states[j]])}); } catch (e) {}
+    }
+}
+var walker = document.createTreeWalker(body, NodeFilter.SHOW_TEXT, null);
+var node;
+while ((node = walker.nextNode())) {
+    var text = node.nodeValue;
+    var el = node.parentElement;
+    if (!text || text.length < 6 || !el || el.tagName === 'SCRIPT' || el.tagName === 'STYLE') { continue; }
+    if (!result.stats_text && text.indexOf('properties') !== -1 && text.indexOf('median value') !== -1) {
+        result.stats_text = el.innerText;
+    }
+    if (!result.value_text && text.indexOf('median value') !== -1 && text.indexOf('$') !== -1) {
+        result.value_text = el.innerText;
+    }
+    if (!result.rent_text && text.indexOf('median rent') !== -1) {
+        result.rent_text = el.innerText;
+    }
+    if (!result.date_text && text.indexOf('As at') !== -1) {
+        result.date_text = el.innerText;
+    }
+}
+if (!result.stats_text && !result.payloads.length) { return null; }
+result.full_text = result.stats_text ? body.innerText : null;
+return JSON.stringify(result);
+"""
+
+
+def collect_page_sections(driver, timeout=30, poll_frequency=0.2, suburb_name=None):
+    """轮询同一段脚本：页面就绪的那一次调用就直接带回全部候选文本
+
+    页面内嵌的结构化数据能解析出统计时，不必等统计句子渲染出来，结果放在 sections['embedded']。
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    def ready(d):
+        payload = d.execute_script(BROWSER_EXTRACT_SCRIPT)
+        if not payload:
+            return False
+        sections = json.loads(payload)
+        sections['embedded'] = extract_from_payloads(parse_script_payloads(sections.pop('payloads', None)),
+                                                     suburb_name, sections.get('date_text'))
+        return sections if sections['stats_text'] or sections['embedded'] else False
+
+    return WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(ready)
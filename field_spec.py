@@ -0,0 +1,177 @@
+"""声明式字段规则：每个字段声明名称、按优先级排列的正则规则、单位、正负号规则和是否必需，
+全部规则编译成一个组合正则，页面文本只扫描一遍就得到所有字段，并记录每个字段由哪条规则、
+在文本的哪个位置匹配到（来源）。
+
+规则只在一行之内匹配，涨跌幅的 increase/decrease 必须紧跟在数字后面，不会误用同一句中另一类型的措辞。
+
+用法: python field_spec.py page.html [...]   # 打印每个字段的值和匹配到它的规则
+"""
+import html
+import re
+import sys
+from collections import namedtuple
+from datetime import datetime
+
+SIGN_WORDS = {'increase': 1, 'decrease': -1}
+NUMBER = r'(-?\d+(?:\.\d+)?)'
+CHANGE = NUMBER + r'% (increase|decrease)'
+MONEY = r'\$(\d[\d,]*(?:\.\d+)?)'
+UNITS = ('percent', 'money', 'date', 'text')
+MONTHS = {name: number for number, name in enumerate(
+    ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+     'November', 'December'], 1)}
+SPECIAL_CHARS = set('\\.^$*+?{}[]|()')
+QUANTIFIERS = set('*+?{')
+
+# value 为转换后的值，rule 为规则名，start/end 为值在文本中的位置，text 为整条规则匹配到的文本
+FieldMatch = namedtuple('FieldMatch', 'value rule start end text')
+
+
+class Field:
+    """一个字段：rules 为 [(规则名, 正则)]，排在前面的优先
+
+    正则必须以一个普通字符开头（组合正则据此快速跳过不可能匹配的位置）；第1组是值，
+    signed 为True时第2组是 increase/decrease，decrease 且数值为正时取负数。
+    required 的字段缺失时整条记录无效。
+    """
+
+    def __init__(self, name, rules, unit='percent', signed=False, required=True):
+        if unit not in UNITS:
+            raise ValueError(f"字段 {name} 的单位 {unit} 无效")
+        for rule_name, pattern in rules:
+            if len(pattern) < 2 or pattern[0] in SPECIAL_CHARS or pattern[1] in QUANTIFIERS:
+                raise ValueError(f"字段 {name} 的规则 {rule_name} 必须以普通字符开头")
+            groups = re.compile(pattern).groups
+            if groups != (2 if signed else 1):
+                raise ValueError(f"字段 {name} 的规则 {rule_name} 应有 {2 if signed else 1} 个分组，实际为 {groups}")
+        self.name = name
+        self.rules = rules
+        self.unit = unit
+        self.signed = signed
+        self.required = required
+
+    def convert(self, raw, sign_word=None):
+        """把匹配到的文本转换为字段值，无法转换时返回None"""
+        if self.unit == 'text':
+            return raw.strip()
+        if self.unit == 'date':
+            # "30 April 2025" -> "2025.04.30"；不用 strptime（慢一个数量级，且月份名受locale影响）
+            day, month, year = raw.split()
+            try:
+                date = datetime(int(year), MONTHS[month], int(day))
+            except (KeyError, ValueError):
+                return None
+            return f'{date.year}.{date.month:02d}.{date.day:02d}'
+        value = float(raw.replace(',', ''))
+        if sign_word and SIGN_WORDS[sign_word] < 0 and value > 0:
+            value = -value
+        return value
+
+
+class FieldSpec:
+    """把一组字段的全部规则编译成一个组合正则
+
+    组合正则中先排所有字段的第一条规则，再排第二条，依此类推；同一位置上优先级高的规则先尝试。
+    每条规则的第一个字符放在命名分组之外，这样每个分支都以字符开头，正则引擎会先用这些首字符
+    跳过不可能匹配的位置，比逐个位置尝试所有规则快一个数量级。
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.required = [field.name for field in fields if field.required]
+        ordered = sorted(((tier, order, field, rule) for order, field in enumerate(fields)
+                          for tier, rule in enumerate(field.rules)), key=lambda item: item[:2])
+        self.pattern = re.compile('|'.join(f'{rule[1][0]}(?P<r{n}>{rule[1][1:]})'
+                                           for n, (_, _, _, rule) in enumerate(ordered)))
+        # 组名 -> (字段, 优先级, 规则名, 值所在的分组号)
+        self._rules = {f'r{n}': (field, tier, rule[0], self.pattern.groupindex[f'r{n}'] + 1)
+                       for n, (tier, _, field, rule) in enumerate(ordered)}
+
+    def scan(self, text):
+        """扫描一遍文本，返回 {字段名: FieldMatch}；每个字段取优先级最高的规则最先匹配到的值
+
+        所有字段都由第一条规则匹配到后就停止扫描。
+        """
+        best = {}
+        remaining = len(self.fields)
+        for match in self.pattern.finditer(text or ''):
+            field, tier, rule_name, index = self._rules[match.lastgroup]
+            current = best.get(field.name)
+            if current is not None and current[0] <= tier:
+                continue
+            value = field.convert(match.group(index), match.group(index + 1) if field.signed else None)
+            if value is None:
+                continue
+            best[field.name] = (tier, FieldMatch(value, rule_name, match.start(index), match.end(index),
+                                                 match.group()))
+            if tier == 0:
+                remaining -= 1
+                if not remaining:
+                    break
+        return {name: found for name, (_, found) in best.items()}
+
+    def missing(self, matches):
+        """缺少的必需字段"""
+        return [name for name in self.required if name not in matches]
+
+
+# 郊区统计句子，例如:
+#   "... the median value of Houses in Glen Waverley have seen a 4.6% decrease and Units have seen a 2.2% increase."
+#   "The median value for Houses in Glen Waverley is $1,512,000 and Units is $689,500."
+#   "Houses have a median rent of $700 per week and Units have a median rent of $540 per week."
+#   "As at 30 April 2025"
+SUBURB_STATS = FieldSpec([
+    Field('house_increase', [('sentence', r'Houses in [^%\n]*? ' + CHANGE),
+                             ('loose', r'Houses[^%\n]*?' + CHANGE)], signed=True),
+    Field('unit_increase', [('sentence', r'Units have seen a ' + CHANGE),
+                            ('loose', r'Units[^%\n]*?' + CHANGE)], signed=True),
+    Field('house_value', [('sentence', r'Houses in [^$\n]*? is ' + MONEY),
+                          ('loose', r'Houses[^$\n]*?' + MONEY)], unit='money'),
+    Field('unit_value', [('sentence', r'Units is ' + MONEY),
+                         ('loose', r'Units[^$\n]*?' + MONEY)], unit='money'),
+    Field('house_rent', [('sentence', r'Houses have a median rent of ' + MONEY)], unit='money', required=False),
+    Field('unit_rent', [('sentence', r'Units have a median rent of ' + MONEY)], unit='money', required=False),
+    Field('date', [('as_at', r'As at (\d{1,2} [A-Z][a-z]+ \d{4})')], unit='date', required=False),
+])
+
+# property_analyzer 读取的 suburb-statistics 卡片：一个正则扫描一遍片段，按页面顺序得到每个卡片的标签和数值；
+# 数值保留页面上的原文（例如 "$1,512,000"、"-1.3%"），由 report_engine 统一转换
+STAT_ITEM = re.compile(r'<div class="[^"]*\bstat-item\b[^"]*">\s*<div class="[^"]*\blabel\b[^"]*">(.*?)</div>'
+                       r'\s*<div class="[^"]*\bvalue\b[^"]*">(.*?)</div>', re.S)
+TAG = re.compile(r'<[^>]+>')
+
+
+def stat_items(fragment):
+    """逐个产出统计区块中 stat-item 卡片的 (标签, 数值)，按页面顺序；标签或数值为空的跳过"""
+    for match in STAT_ITEM.finditer(fragment or ''):
+        label, value = (html.unescape(TAG.sub('', group)).strip() for group in match.groups())
+        if label and value:
+            yield label, value
+
+
+def print_matches(spec, matches):
+    for field in spec.fields:
+        found = matches.get(field.name)
+        if found is None:
+            print(f"  {field.name}: 未找到{'（必需）' if field.required else ''}")
+        else:
+            print(f"  {field.name}: {found.value}  [{found.rule} @{found.start}] {' '.join(found.text.split())}")
+
+
+def main():
+    from extraction import html_to_text
+
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    for path in sys.argv[1:]:
+        with open(path, 'r', encoding='utf-8') as f:
+            page = f.read()
+        print(f"{path}:")
+        print_matches(SUBURB_STATS, SUBURB_STATS.scan(html_to_text(page)))
+        for label, value in stat_items(page):
+            print(f"  {label}: {value}  [stat_item]")
+
+
+if __name__ == "__main__":
+    main()
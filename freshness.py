@@ -0,0 +1,200 @@
+"""郊区页面的新鲜度判断：用最便宜的信号决定是否需要完整抓取和提取
+
+依次使用三种信号：
+1. 学到的更新时间表：记录每个郊区 "As at" 日期在月末之后多少天才出现在网站上，
+   预计还没更新的郊区不发任何请求；
+2. 条件请求：带上次保存时的 ETag / Last-Modified，304 表示页面没变；
+3. 统计字段的哈希：页面返回了但提取出的统计字段（内嵌结构化数据或统计句子，只扫描一遍页面）
+   与上次保存时相同，就不再写入。
+只有这些信号都表明数据可能变了，才写入结果（HTTP取不到时才启动Chrome）。
+"""
+import calendar
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from field_spec import SUBURB_STATS
+
+DEFAULT_FRESHNESS_DB = 'freshness.db'
+DATE_FORMAT = '%Y.%m.%d'
+# 记住最近几次的更新延迟，取其中最短的作为下次预计更新时间，宁早勿晚
+MAX_LAGS = 6
+MAX_LAG_DAYS = 60
+# 等待写入的验证器和哈希最多保留这么多个URL；取不到数据的郊区不会调用 record_saved，常驻运行时不能无限累积
+MAX_OBSERVED = 10000
+STATS_FIELDS = ('date', 'house_increase', 'unit_increase', 'house_value', 'unit_value', 'house_rent', 'unit_rent')
+
+
+class _Unchanged:
+    def __repr__(self):
+        return 'UNCHANGED'
+
+
+# 抓取引擎在页面没有变化时产出的结果，代替提取出的数据
+UNCHANGED = _Unchanged()
+
+
+def data_digest(data):
+    """提取出的统计字段的哈希（与页面上的其他内容无关）"""
+    fields = {key: data.get(key) for key in STATS_FIELDS}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def stats_digest(text):
+    """页面文本中统计字段（field_spec.SUBURB_STATS）的哈希；缺少必需字段时返回None"""
+    matches = SUBURB_STATS.scan(text)
+    if SUBURB_STATS.missing(matches):
+        return None
+    return data_digest({name: found.value for name, found in matches.items()})
+
+
+def _next_report_date(date_text):
+    """下一期的 "As at" 日期：下个月的最后一天"""
+    date = datetime.strptime(date_text, DATE_FORMAT)
+    year, month = (date.year + 1, 1) if date.month == 12 else (date.year, date.month + 1)
+    return datetime(year, month, calendar.monthrange(year, month)[1])
+
+
+class FreshnessOracle:
+    """每个URL的条件请求头、上次保存时的统计哈希、"As at" 日期和学到的更新延迟
+
+    recheck_hours：预计已经更新但还没看到新数据时，隔多久再检查（每天运行时约一天一次）；
+    max_skip_days：即使预计还没更新，最多隔这么多天也检查一次，防止时间表学错后长期漏掉更新。
+    """
+
+    def __init__(self, path=DEFAULT_FRESHNESS_DB, recheck_hours=20, max_skip_days=7, max_observed=MAX_OBSERVED):
+        self.recheck = timedelta(hours=recheck_hours)
+        self.max_skip = timedelta(days=max_skip_days)
+        # 本次运行中看到但还没保存的验证器和哈希，数据写入结果库后才持久化；超过 max_observed 个时丢弃最早的
+        self.max_observed = max_observed
+        self._observed = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS freshness (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                stats_hash TEXT,
+                report_date TEXT,
+                lags TEXT NOT NULL DEFAULT '[]',
+                checked_at REAL,
+                changed_at REAL,
+                next_check REAL NOT NULL DEFAULT 0
+            );
+        """)
+
+    def _state(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, stats_hash, report_date, lags, next_check FROM freshness WHERE url = ?",
+                (url,)).fetchone()
+        if row is None:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'stats_hash': row[2], 'report_date': row[3],
+                'lags': json.loads(row[4]), 'next_check': row[5]}
+
+    def due(self, url, now=None):
+        """按学到的时间表，这个郊区现在是否值得检查（没有记录的总是需要检查）"""
+        state = self._state(url)
+        return state is None or state['next_check'] <= (now or time.time())
+
+    def next_check_at(self, url):
+        state = self._state(url)
+        return state['next_check'] if state else 0.0
+
+    def conditional_headers(self, url):
+        """上次保存数据时页面的 ETag / Last-Modified，作为条件请求头"""
+        state = self._state(url)
+        headers = {}
+        if state and state['report_date']:
+            if state['etag']:
+                headers['If-None-Match'] = state['etag']
+            if state['last_modified']:
+                headers['If-Modified-Since'] = state['last_modified']
+        return headers
+
+    def observe(self, url, text=None, validators=None, not_modified=False, data=None):
+        """记录一次HTTP响应，返回页面数据是否可能变化（False 时不必提取）
+
+        not_modified 为服务器返回的304；已经提取出 data 时用其统计字段的哈希，
+        否则用页面文本 text（extraction.html_to_text 的结果）中统计字段的哈希。
+        """
+        state = self._state(url)
+        if not_modified:
+            changed = state is None or not state['report_date']
+        else:
+            digest = data_digest(data) if data else stats_digest(text) if text else None
+            changed = digest is None or state is None or digest != state['stats_hash']
+            with self._lock:
+                self._observed.pop(url, None)
+                # 没有变化的页面不会写入，不必等待保存
+                if changed:
+                    self._observed[url] = dict(validators or {}, stats_hash=digest)
+                    while len(self._observed) > self.max_observed:
+                        del self._observed[next(iter(self._observed))]
+        if not changed:
+            self.record_unchanged(url)
+        return changed
+
+    def _schedule(self, report_date, lags, now):
+        """下次检查的时间：预计的下一期出现时间，已经过了就隔 recheck 再看，最多不超过 max_skip"""
+        now_dt = datetime.fromtimestamp(now)
+        next_check = now_dt + self.recheck
+        if report_date and lags:
+            expected = _next_report_date(report_date) + timedelta(days=min(lags))
+            if expected > next_check:
+                next_check = min(expected, now_dt + self.max_skip)
+        return next_check.timestamp()
+
+    def record_unchanged(self, url, now=None):
+        now = now or time.time()
+        state = self._state(url)
+        if state is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE freshness SET checked_at = ?, next_check = ? WHERE url = ?",
+                               (now, self._schedule(state['report_date'], state['lags'], now), url))
+
+    def record_saved(self, url, report_date, now=None):
+        """数据已经写入结果库（或库中已有同一日期的数据）：保存这次响应的验证器和哈希
+
+        这次没有验证器或哈希时（例如由Chrome取得的数据）保留上次保存的，下次仍能发条件请求。
+        report_date 比上次新时，把 月末到第一次看到新数据 的天数记入更新延迟。
+        """
+        now = now or time.time()
+        state = self._state(url) or {'report_date': None, 'lags': [], 'stats_hash': None}
+        with self._lock:
+            observed = self._observed.pop(url, {})
+        lags = state['lags']
+        changed_at = None
+        if report_date != state['report_date']:
+            changed_at = now
+            if state['report_date'] and report_date > state['report_date']:
+                lag = (datetime.fromtimestamp(now) - datetime.strptime(report_date, DATE_FORMAT)).days
+                if 0 <= lag <= MAX_LAG_DAYS:
+                    lags = (lags + [lag])[-MAX_LAGS:]
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO freshness (url, etag, last_modified, stats_hash, report_date, lags, checked_at,
+                                       changed_at, next_check)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    etag = COALESCE(excluded.etag, freshness.etag),
+                    last_modified = COALESCE(excluded.last_modified, freshness.last_modified),
+                    stats_hash = COALESCE(excluded.stats_hash, freshness.stats_hash),
+                    report_date = excluded.report_date,
+                    lags = excluded.lags,
+                    checked_at = excluded.checked_at,
+                    changed_at = COALESCE(excluded.changed_at, freshness.changed_at),
+                    next_check = excluded.next_check
+            """, (url, observed.get('etag'), observed.get('last_modified'), observed.get('stats_hash'),
+                  report_date, json.dumps(lags), now, changed_at, self._schedule(report_date, lags, now)))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,485 +1,682 @@
-import requests
-import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
-import json
-import re
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import argparse
+import signal
+import threading
 import time
-import os
-import random
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from collections import defaultdict
+from functools import partial
 
-# 测试用的郊区列表
-TEST_SUBURBS = [
-    "https://www.onthehouse.com.au/suburb/vic/box-hill-3128",
-    "https://www.onthehouse.com.au/suburb/vic/glen-waverley-3150",
-    "https://www.onthehouse.com.au/suburb/vic/mount-waverley-3149",
-    "https://www.onthehouse.com.au/suburb/vic/burwood-3125",
-    "https://www.onthehouse.com.au/suburb/vic/clayton-south-3169",
-    "https://www.onthehouse.com.au/suburb/vic/springvale-3171",
-    "https://www.onthehouse.com.au/suburb/vic/keysborough-3173",
-    "https://www.onthehouse.com.au/suburb/vic/dandenong-3175",
-    "https://www.onthehouse.com.au/suburb/vic/noble-park-3174",
-    "https://www.onthehouse.com.au/suburb/vic/wheelers-hill-3150",
-    "https://www.onthehouse.com.au/suburb/vic/vermont-south-3133",
-    "https://www.onthehouse.com.au/suburb/vic/doncaster-3108",
-    "https://www.onthehouse.com.au/suburb/vic/frankston-3199",
-    "https://www.onthehouse.com.au/suburb/vic/frankston-south-3199",
-    "https://www.onthehouse.com.au/suburb/vic/berwick-3806",
-    "https://www.onthehouse.com.au/suburb/vic/cranbourne-3977",
-    "https://www.onthehouse.com.au/suburb/vic/officer-3809",
-    "https://www.onthehouse.com.au/suburb/vic/pakenham-3810",
-    "https://www.onthehouse.com.au/suburb/vic/caulfield-3162",
-    "https://www.onthehouse.com.au/suburb/vic/bentleigh-east-3165",
-    "https://www.onthehouse.com.au/suburb/vic/forest-hill-3131",
-    "https://www.onthehouse.com.au/suburb/vic/bayswater-north-3153",
-    "https://www.onthehouse.com.au/suburb/vic/wantirna-south-3152",
-    "https://www.onthehouse.com.au/suburb/vic/wantirna-3152",
-    "https://www.onthehouse.com.au/suburb/vic/surrey-hills-3127",
-    "https://www.onthehouse.com.au/suburb/vic/balwyn-3103",
-    "https://www.onthehouse.com.au/suburb/vic/camberwell-3124",
-    "https://www.onthehouse.com.au/suburb/vic/kew-3101",
-    "https://www.onthehouse.com.au/suburb/vic/toorak-3142",
-    "https://www.onthehouse.com.au/suburb/vic/malvern-3144",
-    "https://www.onthehouse.com.au/suburb/vic/glen-iris-3146",
-    "https://www.onthehouse.com.au/suburb/vic/hawthorn-3122",
-    "https://www.onthehouse.com.au/suburb/vic/canterbury-3126",
-    "https://www.onthehouse.com.au/suburb/vic/brighton-3186"
-]
+# selenium、aiohttp等较重的依赖只在真正需要浏览器或HTTP抓取时才导入
+from extraction import collect_page_sections, extract_from_html, parse_property_text, suburb_name_from_url
+from driver_pool import DriverPool
+from page_cache import PageCache
+from browser_profile import DEFAULT_PROFILE, PROFILES, PageMetricsLog, apply_profile, build_chrome_options, page_metrics
+from result_store import DEFAULT_DB, open_store
+from work_queue import DEFAULT_QUEUE, FAILED, WorkQueue, worker_id
+from suburb_catalog import load_catalog, parse_shard, select_shard
+from pacing import AdaptiveThrottle, StageTimer, is_block_page, wait_for_stats
+from browser_session import attach_driver, chromedriver_service, warm_browser_address
+from metrics import export_run, profiled, roll_records
+from freshness import DEFAULT_FRESHNESS_DB, UNCHANGED, FreshnessOracle
+from pipeline import HttpFetchStage, Pipeline, Stage
+from proxy_pool import ProxyPool, ProxyThrottle, load_proxies
 
-def setup_driver():
-    """设置并返回Chrome WebDriver"""
+# 常驻模式下浏览器的默认回收阈值，以及导出指标、清理缓存的间隔（秒）
+DAEMON_RECYCLE_PAGES = 300
+DAEMON_RECYCLE_RSS_MB = 1500
+HOUSEKEEPING_SECONDS = 3600
+
+def setup_driver(profile=DEFAULT_PROFILE, address=None, timer=None, proxy=None):
+    """设置并返回Chrome WebDriver，profile 见 browser_profile.PROFILES
+
+    传入 address（host:port）时连接已经在运行的Chrome，不再冷启动新浏览器；
+    传入 proxy（代理地址）时新浏览器的所有请求经由这个代理发出。
+    """
+    from selenium import webdriver
+
+    timer = timer or StageTimer()
     try:
-        chrome_options = Options()
-        
-        # 基本设置
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        
-        # 高级反检测设置
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # 随机User-Agent
-        user_agents = [
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3 Safari/605.1.15',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:123.0) Gecko/20100101 Firefox/123.0'
-        ]
-        chrome_options.add_argument(f'--user-agent={random.choice(user_agents)}')
-        
-        # 添加其他headers
-        chrome_options.add_argument('--accept-language=en-US,en;q=0.9')
-        chrome_options.add_argument('--accept=text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8')
-        
-        print("正在初始化Chrome浏览器...")
-        driver = webdriver.Chrome(options=chrome_options)
-        
-        # 执行JavaScript来避免检测
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        driver.execute_script("Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']})")
-        driver.execute_script("Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]})")
+        with timer.stage('', 'driver_startup'):
+            if address:
+                print(f"正在连接 {address} 上的Chrome浏览器...")
+                driver = attach_driver(address, profile)
+            else:
+                chrome_options = build_chrome_options(profile, proxy=proxy)
+                print("正在初始化Chrome浏览器...")
+                # chromedriver路径在本地缓存，不必每次运行都解析版本
+                driver = webdriver.Chrome(service=chromedriver_service(), options=chrome_options)
+            
+            # 执行JavaScript来避免检测
+            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            driver.execute_script("Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']})")
+            driver.execute_script("Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]})")
+            apply_profile(driver, profile)
         
         return driver
     except Exception as e:
         print(f"创建WebDriver时发生错误: {e}")
         return None
 
-def random_sleep():
-    """随机等待一段时间"""
-    base_delay = random.uniform(1, 3)  # 基础延迟8-15秒
-    extra_delay = random.uniform(0, 3)   # 额外随机延迟0-5秒
-    time.sleep(base_delay + extra_delay)
+def _collect_sections_by_xpath(driver):
+    """逐个XPath查找统计、价值和租金文本（旧的多次往返方式）"""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    # 页面已经就绪，选择器不存在时不必再等满30秒
+    wait = WebDriverWait(driver, 5)
+    
+    # 尝试多种选择器
+    selectors = [
+        "//div[contains(text(), 'properties') and contains(text(), 'median value')]",
+        "//p[contains(text(), 'properties') and contains(text(), 'median value')]",
+        "//*[contains(text(), 'properties') and contains(text(), 'median value')]"
+    ]
+    
+    stats_text = None
+    for selector in selectors:
+        try:
+            element = wait.until(EC.presence_of_element_located((By.XPATH, selector)))
+            stats_text = element.text
+            if stats_text:
+                break
+        except TimeoutException:
+            continue
+    
+    if not stats_text:
+        return None
+    
+    # 尝试从同一段文本中提取价值和租金信息
+    value_text = wait.until(EC.presence_of_element_located(
+        (By.XPATH, "//*[contains(text(), 'median value') and contains(text(), '$')]"))).text
+    rent_text = wait.until(EC.presence_of_element_located(
+        (By.XPATH, "//*[contains(text(), 'median rent')]"))).text
+    
+    return {
+        'stats_text': stats_text,
+        'value_text': value_text,
+        'rent_text': rent_text,
+        'date_text': None,
+        # 完整页面文本只在需要备用提取时才读取
+        'full_text': lambda: driver.find_element(By.TAG_NAME, "body").text
+    }
+
+def get_property_data(url, driver, throttle=None, timer=None, extract_mode='script', cache=None,
+                      profile=DEFAULT_PROFILE, page_log=None):
+    """获取单个郊区的房产数据
+
+    extract_mode 为 script 时，在浏览器内一次脚本调用取回全部文本；为 xpath 时逐个选择器查找。
+    传入 cache 时会保存页面源码，之后可以用 --replay 重新提取。
+    传入 page_log（PageMetricsLog）时记录页面的传输字节数和加载时间。
+    """
+    from selenium.common.exceptions import TimeoutException
 
-def get_property_data(url, driver):
-    """获取单个郊区的房产数据"""
-    suburb_name = url.split('/')[-1].replace('-', ' ').title()
+    suburb_name = suburb_name_from_url(url)
+    timer = timer or StageTimer()
     print(f"\n正在获取 {suburb_name} 的数据...")
     
+    def record(outcome):
+        timer.count('page_outcomes', backend='chrome', outcome=outcome)
+        if throttle:
+            throttle.record(outcome)
+    
     try:
-        driver.get(url)
-        random_sleep()
-        
-        # 随机滚动页面
-        for _ in range(3):
-            driver.execute_script(f"window.scrollTo(0, {random.randint(100, 500)})")
-            random_sleep()
-        
-        wait = WebDriverWait(driver, 30)
+        if throttle:
+            with timer.stage(suburb_name, 'throttle'):
+                throttle.wait()
+        with timer.stage(suburb_name, 'navigate'):
+            driver.get(url)
         
+        # 统计句子一出现在DOM中就开始提取，不再固定等待
+        print("等待页面加载...")
         try:
-            # 等待页面加载完成并提取文本
-            print("等待页面加载...")
-            
-            # 尝试多种选择器
-            selectors = [
-                "//div[contains(text(), 'properties') and contains(text(), 'median value')]",
-                "//p[contains(text(), 'properties') and contains(text(), 'median value')]",
-                "//*[contains(text(), 'properties') and contains(text(), 'median value')]"
-            ]
-            
-            stats_text = None
-            for selector in selectors:
-                try:
-                    element = wait.until(EC.presence_of_element_located((By.XPATH, selector)))
-                    stats_text = element.text
-                    if stats_text:
-                        break
-                except:
-                    continue
-            
-            if not stats_text:
-                print("无法找到统计数据")
-                return None
-                
-            print(f"找到统计文本: {stats_text}")
-            
-            # 提取数据，同时处理increase和decrease
-            house_change_match = re.search(r'Houses in [^%]+ ([-\d.]+)% (?:increase|decrease)', stats_text)
-            unit_change_match = re.search(r'Units have seen a ([-\d.]+)% (?:increase|decrease)', stats_text)
-            
-            # 分别检查house和unit是increase还是decrease
-            house_increase = 0
-            unit_increase = 0
-            
-            if house_change_match:
-                # 提取house部分的文本来判断是increase还是decrease
-                house_text = re.search(r'Houses[^,]+(?:increase|decrease)', stats_text)
-                house_value = float(house_change_match.group(1))
-                
-                # 如果是decrease且数值为正，则变为负数
-                # 如果数值已经是负数，则保持不变
-                if house_text and 'decrease' in house_text.group() and house_value > 0:
-                    house_increase = -house_value
-                else:
-                    house_increase = house_value
-                    
-            if unit_change_match:
-                # 提取unit部分的文本来判断是increase还是decrease
-                unit_text = re.search(r'Units[^,]+(?:increase|decrease)', stats_text)
-                unit_value = float(unit_change_match.group(1))
-                
-                # 如果是decrease且数值为正，则变为负数
-                # 如果数值已经是负数，则保持不变
-                if unit_text and 'decrease' in unit_text.group() and unit_value > 0:
-                    unit_increase = -unit_value
-                else:
-                    unit_increase = unit_value
-            
-            # 尝试从同一段文本中提取价值信息
-            value_text = wait.until(EC.presence_of_element_located(
-                (By.XPATH, "//*[contains(text(), 'median value') and contains(text(), '$')]"))).text
-            print(f"找到价值文本: {value_text}")
-            
-            house_value_match = re.search(r'Houses in [^\$]+\$([\d,]+)', value_text)
-            unit_value_match = re.search(r'Units is \$([\d,]+)', value_text)
-            
-            if not all([house_change_match, unit_change_match, house_value_match, unit_value_match]):
-                print("无法从页面提取完整数据，尝试备用提取方法...")
-                
-                # 获取完整页面文本
-                full_text = driver.find_element(By.TAG_NAME, "body").text
-                print("页面完整文本：")
-                print(full_text)
-                
-                # 重新尝试匹配，使用更宽松的模式
-                house_change_match = house_change_match or re.search(r'Houses[^%]+([-\d.]+)% (?:increase|decrease)', full_text)
-                unit_change_match = unit_change_match or re.search(r'Units[^%]+([-\d.]+)% (?:increase|decrease)', full_text)
-                house_value_match = house_value_match or re.search(r'Houses[^\$]+\$([\d,]+)', full_text)
-                unit_value_match = unit_value_match or re.search(r'Units[^\$]+\$([\d,]+)', full_text)
-                
-                # 再次检查decrease情况（如果之前没有匹配到）
-                if house_change_match and house_increase == 0:
-                    house_text = re.search(r'Houses[^,]+(?:increase|decrease)', full_text)
-                    house_value = float(house_change_match.group(1))
-                    
-                    if house_text and 'decrease' in house_text.group() and house_value > 0:
-                        house_increase = -house_value
-                    else:
-                        house_increase = house_value
-                        
-                if unit_change_match and unit_increase == 0:
-                    unit_text = re.search(r'Units[^,]+(?:increase|decrease)', full_text)
-                    unit_value = float(unit_change_match.group(1))
-                    
-                    if unit_text and 'decrease' in unit_text.group() and unit_value > 0:
-                        unit_increase = -unit_value
-                    else:
-                        unit_increase = unit_value
-                
-                if not all([house_change_match, unit_change_match, house_value_match, unit_value_match]):
-                    print("备用提取方法也失败了")
-                    return None
-            
-            # 提取日期信息
-            date_match = re.search(r'As at (\d+ \w+ \d+)', stats_text)
-            if not date_match:
-                # 尝试从完整页面文本中查找
-                full_text = driver.find_element(By.TAG_NAME, "body").text
-                date_match = re.search(r'As at (\d+ \w+ \d+)', full_text)
-            
-            if date_match:
-                # 解析日期，例如 "30 April 2025"
-                report_date = datetime.strptime(date_match.group(1), '%d %B %Y').strftime('%Y.%m.%d')
-                print(f"从网页提取到日期: {date_match.group(1)} -> {report_date}")
-            else:
-                # 使用当前月份减1作为日期
-                current_date = datetime.now()
-                if current_date.month == 1:
-                    # 如果是1月，则变为去年12月
-                    last_month_date = current_date.replace(year=current_date.year - 1, month=12)
+            with timer.stage(suburb_name, 'ready'):
+                if extract_mode == 'script':
+                    sections = collect_page_sections(driver, timeout=30, suburb_name=suburb_name)
                 else:
-                    last_month_date = current_date.replace(month=current_date.month - 1)
-                report_date = last_month_date.strftime('%Y.%m.%d')
-                print(f"未找到日期信息，使用计算的日期: {report_date}")
-            
-            # 提取并转换数据，移除逗号
-            house_value = float(house_value_match.group(1).replace(',', ''))
-            unit_value = float(unit_value_match.group(1).replace(',', ''))
-            
-            # 提取租金信息
-            rent_text = wait.until(EC.presence_of_element_located(
-                (By.XPATH, "//*[contains(text(), 'median rent')]"))).text
-            print(f"找到租金文本: {rent_text}")
-            
-            house_rent_match = re.search(r'Houses have a median rent of \$([\d,]+)', rent_text)
-            unit_rent_match = re.search(r'Units have a median rent of \$([\d,]+)', rent_text)
-            
-            if not all([house_rent_match, unit_rent_match]):
-                print("无法从页面提取租金数据，尝试备用提取方法...")
-                house_rent_match = re.search(r'Houses have a median rent of \$([\d,]+)', full_text)
-                unit_rent_match = re.search(r'Units have a median rent of \$([\d,]+)', full_text)
-            
-            # 提取并转换数据，移除逗号
-            house_rent = float(house_rent_match.group(1).replace(',', '')) if house_rent_match else None
-            unit_rent = float(unit_rent_match.group(1).replace(',', '')) if unit_rent_match else None
-            
-            # 计算租金回报率
-            house_yield = f"{(house_rent * 52 / house_value * 100):.2f}%" if house_rent else "-"
-            unit_yield = f"{(unit_rent * 52 / unit_value * 100):.2f}%" if unit_rent else "-"
-            
-            return {
-                'suburb': suburb_name,
-                'date': report_date,
-                'house_increase': house_increase,
-                'unit_increase': unit_increase,
-                'house_value': house_value,
-                'unit_value': unit_value,
-                'house_rent': house_rent,
-                'unit_rent': unit_rent,
-                'house_yield': house_yield,
-                'unit_yield': unit_yield
-            }
-            
+                    wait_for_stats(driver, timeout=30)
+                    sections = _collect_sections_by_xpath(driver)
         except TimeoutException:
-            print(f"等待页面元素超时")
+            blocked = is_block_page(driver.page_source)
+            print("页面疑似被限流或封禁" if blocked else "等待统计数据超时")
+            record('blocked' if blocked else 'timeout')
             return None
-        except Exception as e:
-            print(f"处理数据时发生错误: {str(e)}")
+        
+        if page_log is not None:
+            metrics = page_metrics(driver, profile)
+            page_log.record(suburb_name, metrics)
+            print(f"页面流量 {(metrics.get('bytes') or 0) / 1024:.0f} KB，"
+                  f"DOM加载 {metrics.get('dom_content_loaded_ms') or 0:.0f} ms")
+        
+        if not sections:
+            print("无法找到统计数据")
+            record('error')
             return None
+        
+        # 页面内嵌的结构化数据已经在浏览器脚本返回时解析好，没有时才解析统计句子
+        data = sections.get('embedded')
+        if data:
+            print(f"从页面内嵌数据（{data['source']}）读取到统计")
+        else:
+            print(f"找到统计文本: {sections['stats_text']}")
+            print(f"找到价值文本: {sections['value_text']}")
+            print(f"找到租金文本: {sections['rent_text']}")
+            
+            provenance = {}
+            with timer.stage(suburb_name, 'extract'):
+                data = parse_property_text(suburb_name, sections['stats_text'], sections['value_text'],
+                                           sections['rent_text'], sections['full_text'], sections['date_text'],
+                                           provenance)
+            for name, found in provenance.items():
+                timer.count('field_rule', field=name, rule=found.rule)
+        if data:
+            timer.count('extraction_source', source=data['source'])
+        if cache:
+            with timer.stage(suburb_name, 'cache'):
+                cache.put(url, driver.page_source)
+        record('ok' if data else 'error')
+        return data
             
     except Exception as e:
         print(f"访问网页时发生错误: {str(e)}")
+        record('error')
         return None
 
-def save_results(data, filename='suburb_analysis.md', append_mode=False):
-    """保存分析结果为Markdown格式，支持追加模式"""
-    if not data:
-        print("没有数据可以保存")
-        return
-        
-    # 如果是第一次写入，创建文件头
-    if not append_mode or not os.path.exists(filename):
-        mode = 'w'
-        write_header = True
+def print_results(data):
+    """打印单个郊区的分析结果"""
+    print("\n分析结果:")
+    print(f"\n{data['suburb']}:")
+    print(f"house中位价值: ${data['house_value']:,.2f}")
+    print(f"house5年涨幅: {data['house_increase']}%")
+    if data['house_rent']:
+        print(f"house周租金: ${data['house_rent']:.2f}")
+        print(f"house租金回报率: {data['house_yield']}")
+    print(f"unit中位价值: ${data['unit_value']:,.2f}")
+    print(f"unit5年涨幅: {data['unit_increase']}%")
+    if data['unit_rent']:
+        print(f"unit周租金: ${data['unit_rent']:.2f}")
+        print(f"unit租金回报率: {data['unit_yield']}")
+
+def replay_from_cache(cache, urls, handle_result, timer):
+    """不访问网络，用缓存中最新的页面重新提取所有郊区的数据"""
+    print("正在从页面缓存重放提取...")
+    replayed = set()
+    for url, fetched_at, html in cache.latest(urls):
+        suburb_name = suburb_name_from_url(url)
+        replayed.add(url)
+        with timer.stage(suburb_name, 'extract'):
+            data = extract_from_html(html, suburb_name)
+        if data:
+            timer.count('extraction_source', source=data['source'])
+            handle_result(url, data)
+        else:
+            print(f"无法从缓存页面提取 {suburb_name} 的数据")
+    for url in urls:
+        if url not in replayed:
+            print(f"{suburb_name_from_url(url)} 没有有效的缓存页面")
+
+def expected_report_date():
+    """预先计算预期的日期（上个月的最后一天）"""
+    current_date = datetime.now()
+    if current_date.month == 1:
+        # 如果是1月，则变为去年12月
+        last_month = current_date.replace(year=current_date.year - 1, month=12, day=31)
     else:
-        mode = 'a'
-        write_header = False
-        
-    with open(filename, mode, encoding='utf-8') as f:
-        if write_header:
-            f.write("# 墨尔本房产市场分析报告\n\n")
-            f.write(f"数据更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write("| 日期 | 地区 | 类型 | 价格 | 近五年涨幅 | 周租金 | 租金回报率 |\n")
-            f.write("|------|------|------|------|------------|--------|------------|\n")
-        
-        # 写入数据行
-        if isinstance(data, list):
-            suburb_data_list = data
+        # 获取上个月的第一天，再计算上个月的最后一天
+        first_day = current_date.replace(month=current_date.month - 1, day=1)
+        last_month = first_day.replace(month=first_day.month + 1) - timedelta(days=1)
+    return last_month.strftime('%Y.%m.%d')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='批量抓取墨尔本郊区房产数据')
+    parser.add_argument('--backend', choices=['auto', 'http', 'selenium'], default='auto',
+                        help='抓取后端：auto 先用HTTP，取不到统计数据时再用Chrome')
+    parser.add_argument('--concurrency', type=int, default=8, help='HTTP并发请求数')
+    parser.add_argument('--rate', type=float, default=2.0, help='每个主机每秒最多请求数')
+    parser.add_argument('--browsers', type=int, default=2, help='并行Chrome浏览器数量')
+    parser.add_argument('--browser-profile', choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help='full（默认）: 与普通浏览器一致，有界面；lean: 无头、eager加载并屏蔽图片/字体/地图/统计脚本')
+    parser.add_argument('--extract-mode', choices=['script', 'xpath'], default='script',
+                        help='Chrome提取方式：script 一次脚本调用取回全部文本，xpath 逐个选择器查找')
+    parser.add_argument('--catalog', help='郊区目录CSV（由 suburb_catalog.py build 生成），默认使用 suburbs.py')
+    parser.add_argument('--shard', help='只抓取目录中的一个分片，格式 index/count，例如 3/16')
+    parser.add_argument('--queue', default=DEFAULT_QUEUE, help='工作队列数据库文件')
+    parser.add_argument('--batch', help='工作队列批次名，默认为当前月份，例如 2025-05')
+    parser.add_argument('--claim-size', type=int, default=20, help='每次从队列领取的郊区数量')
+    parser.add_argument('--max-attempts', type=int, default=5, help='每个郊区最多尝试次数')
+    parser.add_argument('--db', default=DEFAULT_DB, help='结果数据库文件')
+    parser.add_argument('--output', default='suburb_analysis.md', help='由数据库生成的Markdown表格')
+    parser.add_argument('--replay', action='store_true', help='不访问网络，用缓存页面重新提取数据')
+    parser.add_argument('--no-cache', action='store_true', help='不保存抓取到的页面')
+    parser.add_argument('--attach', metavar='HOST:PORT',
+                        help='连接已经在运行的Chrome（远程调试端口），只使用一个浏览器')
+    parser.add_argument('--keep-browser', action='store_true',
+                        help='使用常驻Chrome（本机9222端口），没有时启动一个，运行结束后不关闭')
+    parser.add_argument('--metrics-dir', help='把各阶段耗时和计数导出为 JSON Lines 和 Prometheus 文本格式')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='剖析本次运行（有 pyinstrument 时采样，否则用 cProfile），结果写到 PATH')
+    parser.add_argument('--freshness-db', default=DEFAULT_FRESHNESS_DB,
+                        help='记录每个郊区页面的验证器、统计哈希和更新时间表，没有变化的郊区不再完整抓取')
+    parser.add_argument('--no-freshness', action='store_true',
+                        help='不做新鲜度判断，缺少预期日期数据的郊区都完整抓取')
+    parser.add_argument('--parse-workers', type=int, default=2, help='解析页面的线程数')
+    parser.add_argument('--parse-queue', type=int, default=16,
+                        help='等待解析的页面最多有多少个，超过时暂停下载（背压）')
+    parser.add_argument('--persist-batch', type=int, default=20, help='结果库每次事务写入的郊区数量')
+    parser.add_argument('--status-interval', type=float, default=30, help='每隔多少秒打印一次流水线队列深度')
+    parser.add_argument('--proxies', metavar='FILE_OR_LIST',
+                        help='代理列表文件（每行一个）或逗号分隔的代理地址；设置后HTTP和Chrome都经由代理访问，'
+                             '--rate 改为每个代理每秒的请求数')
+    parser.add_argument('--browser-rate', type=float, default=0.5,
+                        help='Chrome每秒请求数的初始值，之后根据页面响应自适应调整')
+    parser.add_argument('--recycle-pages', type=int,
+                        help=f'每个Chrome打开这么多页面后换新浏览器（常驻模式默认 {DAEMON_RECYCLE_PAGES}）')
+    parser.add_argument('--recycle-rss-mb', type=int,
+                        help=f'chromedriver和Chrome进程树的内存超过这么多MB时换新浏览器（常驻模式默认 {DAEMON_RECYCLE_RSS_MB}）')
+    parser.add_argument('--daemon', action='store_true',
+                        help='常驻运行：浏览器和HTTP抓取保持运行，按每个郊区的 "As at" 日期和学到的更新时间表刷新，'
+                             '新结果随时发布；收到 SIGTERM/Ctrl+C 时处理完手头的郊区后退出')
+    parser.add_argument('--tick', type=float, default=60, help='常驻模式下每隔多少秒检查一次有没有郊区到了刷新时间')
+    parser.add_argument('--publish-interval', type=float, default=60,
+                        help='常驻模式下有新结果时，最多每隔多少秒重新生成一次表格')
+    parser.add_argument('--publish-json', metavar='PATH', help='同时把每个郊区最新一期的数据写成JSON文件，供前端直接读取')
+    args = parser.parse_args()
+    if args.daemon:
+        args.recycle_pages = args.recycle_pages or DAEMON_RECYCLE_PAGES
+        args.recycle_rss_mb = args.recycle_rss_mb or DAEMON_RECYCLE_RSS_MB
+    return args
+
+def load_target_urls(args):
+    """按 --catalog 和 --shard 确定本次要抓取的郊区URL"""
+    entries = load_catalog(args.catalog)
+    if args.shard:
+        index, count = parse_shard(args.shard)
+        entries = select_shard(entries, index, count)
+        print(f"分片 {index}/{count}: 负责 {len(entries)} 个郊区")
+    return [entry['url'] for entry in entries]
+
+def build_pipeline(args, store, timer, cache, oracle, handle_result, counts, page_log, browsers, proxies=None):
+    """抓取 → 解析 → Chrome回退 → 写入 四个阶段，结果以 (事件, url) 报告给主线程
+
+    事件为 completed（已写入结果库）、deferred（网站还没更新）、failed 和 fallback（转交Chrome）。
+    browsers 中保存按需创建的 DriverPool 和限速器，供运行结束时汇总。
+    传入 proxies（proxy_pool.ProxyPool）时每个浏览器启动时绑定一个代理，按该代理限速，代理被隔离后换新浏览器。
+    """
+    use_http = args.backend in ('auto', 'http')
+    use_chrome = args.backend in ('auto', 'selenium')
+    if use_http:
+        from crawl_engine import extract_page
+        limit = f"{len(proxies)} 个代理，每个代理" if proxies else "每个主机"
+        print(f"使用HTTP并发抓取（并发 {args.concurrency}，{limit}每秒 {args.rate} 个请求，"
+              f"{args.parse_workers} 个解析线程）")
+    browsers_lock = threading.Lock()
+    unflushed = []
+    
+    def driver_pool():
+        with browsers_lock:
+            if 'pool' not in browsers:
+                # 所有浏览器共享同一个自适应限速器
+                browsers['throttle'] = AdaptiveThrottle(rate=args.browser_rate, max_rate=args.browser_rate * 2)
+                # 单个浏览器崩溃或卡死只会被替换，不会让整轮抓取从头开始
+                address = warm_browser_address(args.attach, args.keep_browser, args.browser_profile)
+                if address and args.browsers > 1:
+                    print("连接常驻Chrome时只使用一个浏览器")
+                if address and proxies:
+                    print("常驻Chrome的代理在启动时已经确定，Chrome请求不经由代理池")
+                if address and args.daemon:
+                    print("回收浏览器只会断开与常驻Chrome的连接，不会释放它的内存")
+                recycle = {'max_pages': args.recycle_pages, 'max_rss_mb': args.recycle_rss_mb}
+                if proxies and not address:
+                    browsers['pool'] = DriverPool(proxied_driver, size=args.browsers,
+                                                  check=lambda driver: not proxies.is_quarantined(driver.proxy),
+                                                  **recycle)
+                else:
+                    factory = partial(setup_driver, args.browser_profile, address=address, timer=timer)
+                    browsers['pool'] = DriverPool(factory, size=1 if address else args.browsers, **recycle)
+            return browsers['pool']
+    
+    def proxied_driver():
+        proxy = proxies.choose()
+        if proxy.has_credentials:
+            print(f"Chrome不支持在 --proxy-server 中使用用户名密码，代理 {proxy.label} 需要改用IP白名单认证")
+        driver = setup_driver(args.browser_profile, timer=timer, proxy=proxy.server)
+        if driver is not None:
+            driver.proxy = proxy
+        return driver
+    
+    def fallback(url):
+        if chrome is None:
+            pipeline.emit('failed', url)
+            return
+        timer.count('fallbacks', backend='chrome')
+        pipeline.emit('fallback', url)
+        chrome.put(url)
+    
+    def parse(item):
+        url, html, validators = item
+        if html is UNCHANGED:
+            persist.put((url, UNCHANGED))
+            return
+        data = extract_page(url, html, validators, timer, oracle) if html else None
+        if data:
+            persist.put((url, data))
         else:
-            suburb_data_list = [data]
-            
-        for suburb_data in suburb_data_list:
-            suburb = suburb_data['suburb']
-            # 写入house数据
-            house_rent = f"${suburb_data['house_rent']:.0f}" if suburb_data['house_rent'] else "-"
-            f.write(f"| {suburb_data['date']} | {suburb} | house | ${suburb_data['house_value']:,.0f} | {suburb_data['house_increase']}% | {house_rent} | {suburb_data['house_yield']} |\n")
-            # 写入unit数据
-            unit_rent = f"${suburb_data['unit_rent']:.0f}" if suburb_data['unit_rent'] else "-"
-            f.write(f"| {suburb_data['date']} | {suburb} | unit | ${suburb_data['unit_value']:,.0f} | {suburb_data['unit_increase']}% | {unit_rent} | {suburb_data['unit_yield']} |\n")
+            fallback(url)
+    
+    def browse(url):
+        with driver_pool().lease() as driver:
+            # 绑定了代理的浏览器按这个代理限速，与HTTP抓取共用它的请求配额和健康状态
+            proxy = getattr(driver, 'proxy', None)
+            throttle = ProxyThrottle(proxies, proxy) if proxy else browsers['throttle']
+            data = get_property_data(url, driver, throttle=throttle, timer=timer,
+                                     extract_mode=args.extract_mode, cache=cache,
+                                     profile=args.browser_profile, page_log=page_log)
+        if data:
+            persist.put((url, data))
+        else:
+            pipeline.emit('failed', url)
     
-    print(f"\n数据已保存到 {filename}")
+    def flush():
+        # 早于预期日期的数据也会进入缓冲区（郊区稍后再检查），空闲时一起写入
+        if not unflushed and not store.pending:
+            return
+        with timer.stage('', 'store_flush'):
+            store.flush()
+        for url in unflushed:
+            pipeline.emit('completed', url)
+        unflushed.clear()
     
-    # 打印分析结果
-    print("\n分析结果:")
-    for suburb_data in suburb_data_list:
-        print(f"\n{suburb_data['suburb']}:")
-        print(f"house中位价值: ${suburb_data['house_value']:,.2f}")
-        print(f"house5年涨幅: {suburb_data['house_increase']}%")
-        if suburb_data['house_rent']:
-            print(f"house周租金: ${suburb_data['house_rent']:.2f}")
-            print(f"house租金回报率: {suburb_data['house_yield']}")
-        print(f"unit中位价值: ${suburb_data['unit_value']:,.2f}")
-        print(f"unit5年涨幅: {suburb_data['unit_increase']}%")
-        if suburb_data['unit_rent']:
-            print(f"unit周租金: ${suburb_data['unit_rent']:.2f}")
-            print(f"unit租金回报率: {suburb_data['unit_yield']}")
+    def save(item):
+        url, data = item
+        if data is UNCHANGED:
+            print(f"{suburb_name_from_url(url)} 的页面没有变化，跳过")
+            counts['unchanged'] += 1
+            timer.count('suburbs_unchanged')
+            pipeline.emit('deferred', url)
+        elif handle_result(url, data):
+            unflushed.append(url)
+            if len(unflushed) >= store.batch_size:
+                flush()
+        else:
+            pipeline.emit('deferred', url)
+    
+    def failed(item, error):
+        pipeline.emit('failed', item if isinstance(item, str) else item[0])
+    
+    store.batch_size = args.persist_batch
+    persist = Stage('persist', save, workers=1, capacity=4 * args.persist_batch, timer=timer,
+                    on_error=failed, on_idle=flush, idle_seconds=0.2)
+    # Chrome阶段的任务只是URL，不限长度；流水线中的郊区总数由主线程的 window 限制
+    chrome = Stage('chrome', browse, workers=args.browsers, capacity=0, timer=timer,
+                   on_error=failed) if use_chrome else None
+    parser = Stage('parse', parse, workers=args.parse_workers, capacity=args.parse_queue, timer=timer,
+                   on_error=failed) if use_http else None
+    fetcher = HttpFetchStage('fetch', lambda url, html, validators: parser.put((url, html, validators)),
+                             concurrency=args.concurrency, rate=args.rate, capacity=2 * args.concurrency,
+                             timer=timer, freshness=oracle, cache=cache, on_error=failed,
+                             proxies=proxies) if use_http else None
+    pipeline = Pipeline([stage for stage in (fetcher, parser, chrome, persist) if stage], timer)
+    pipeline.submit = (fetcher or chrome).put
+    return pipeline
 
-def read_existing_data(filename='suburb_analysis.md'):
-    """读取现有的 Markdown 文件并返回已存在的日期和区域组合"""
-    existing_data = set()
-    if not os.path.exists(filename):
-        return existing_data
-        
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            
-        # 跳过表头
-        data_lines = [line for line in lines if '|' in line][2:]  # 跳过标题行和分隔行
-        
-        for line in data_lines:
-            parts = [part.strip() for part in line.split('|')[1:-1]]  # 去掉首尾的 |
-            if len(parts) >= 2:  # 确保有足够的数据
-                date = parts[0].strip()
-                suburb = parts[1].strip()
-                # 添加日期和地区的组合
-                existing_data.add((date, suburb))
-                
-        return existing_data
-    except Exception as e:
-        print(f"读取现有数据时发生错误: {str(e)}")
-        return set()
+def publish_results(store, args, timer):
+    """把已经写入结果库的数据发布出去：刷新同比排名，重新生成Markdown表格（和JSON快照）"""
+    with timer.stage('', 'publish'):
+        store.refresh_trend_ranks()
+        store.render_markdown(args.output)
+        if args.publish_json:
+            store.render_json(args.publish_json)
 
-def main():
-    print("正在开始多郊区房产数据分析...")
+def crawl_suburbs(args, store, timer=None):
+    """抓取缺少数据的郊区并写入结果库；阶段耗时和计数记录在 timer 中
+
+    常驻模式（--daemon）下领取完当前到期的郊区后不退出，每隔 --tick 秒再领取一次：
+    新鲜度记录按 "As at" 日期和学到的更新延迟安排每个郊区的下次检查时间，月份变化时换到新批次。
+    """
+    urls = load_target_urls(args)
+    print(f"已有数据的记录数量: {store.count()}")
+    counts_by_date = store.suburb_counts_by_date()
+    if counts_by_date:
+        print("\n已有数据分布:")
+        for date, suburb_count in counts_by_date.items():
+            print(f"  {date}: {suburb_count} 个郊区")
+    
+    total_suburbs = len(urls)
+    timer = timer or StageTimer()
+    expected_date = expected_report_date()
+    counts = {'success': 0, 'skipped': 0, 'unchanged': 0}
+    oracle = None if args.no_freshness or args.replay else FreshnessOracle(args.freshness_db)
+    
+    def handle_result(url, data, overwrite=False):
+        """保存一个郊区的数据；返回False表示网站还没有更新到预期日期，本批次稍后需要再检查"""
+        suburb_name = suburb_name_from_url(url)
+        if oracle:
+            oracle.record_saved(url, data['date'])
+        # 再次检查实际日期（以防网页上的日期与预期不同）
+        if not overwrite and store.has(data['date'], suburb_name):
+            print(f"\n{suburb_name} 在 {data['date']} 的数据已存在，跳过")
+            counts['skipped'] += 1
+            timer.count('suburbs_skipped')
+            return data['date'] >= expected_date
+        # 数据先进入批量写入缓冲区，攒够一批后在一个事务里写入
+        store.add(data)
+        counts['success'] += 1
+        timer.count('suburbs_saved')
+        print_results(data)
+        print(f"成功保存 {suburb_name} 的数据")
+        # 常驻模式下数据早于预期日期的郊区保存后仍按时间表再检查，网站更新后本月内就能取到新数据
+        return data['date'] >= expected_date if args.daemon else True
+    
+    if args.daemon and oracle is None:
+        print("常驻模式按新鲜度记录安排刷新时间，不能与 --no-freshness 或 --replay 同时使用")
+        return
+    
+    cache = None if args.no_cache else PageCache()
+    if args.replay:
+        if cache is None:
+            print("--replay 需要页面缓存，不能与 --no-cache 同时使用")
+            return
+        # 重放用于修复解析结果，已有的同日期数据会被覆盖
+        replay_from_cache(cache, urls, lambda url, data: handle_result(url, data, overwrite=True), timer)
+        print(f"\n重放完成: 更新了 {counts['success']} 个郊区")
+        timer.print_summary()
+        return
+    
+    # 每个URL在队列中都有状态，重复运行只会处理未完成或待重试的郊区
+    queue = WorkQueue(args.queue, max_attempts=args.max_attempts)
+    batch = args.batch or datetime.now().strftime('%Y-%m')
+    owner = worker_id()
+    added = queue.enqueue(batch, urls)
+    print(f"\n工作队列批次 {batch}: 新加入 {added} 个郊区，当前状态 {queue.stats(batch)}")
     
-    # 读取现有数据
-    existing_data = read_existing_data()
-    print(f"已有数据的记录数量: {len(existing_data)}")
-    if existing_data:
-        # 按日期分组显示
-        data_by_date = defaultdict(list)
-        for date, suburb in existing_data:
-            data_by_date[date].append(suburb)
+    page_log = PageMetricsLog()
+    browsers = {}
+    # 多个出口IP各自限速，总速率随代理数量增加
+    proxies = ProxyPool(load_proxies(args.proxies), rate=args.rate) if args.proxies else None
+    pipeline = build_pipeline(args, store, timer, cache, oracle, handle_result, counts, page_log, browsers,
+                              proxies)
+    window = args.claim_size + 2 * args.concurrency
+    
+    stop = threading.Event()
+    if args.daemon:
+        def request_stop(signum, frame):
+            print("\n收到退出信号，处理完流水线中的郊区后退出...")
+            stop.set()
         
-        print("\n已有数据分布:")
-        for date in sorted(data_by_date.keys()):
-            suburbs = data_by_date[date]
-            # 只显示唯一的郊区名（去重）
-            unique_suburbs = sorted(set(suburbs))
-            print(f"  {date}: {len(unique_suburbs)} 个郊区")
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, request_stop)
     
-    driver = None
-    retry_count = 0
-    max_retries = 3
+    def housekeeping():
+        """常驻模式下定期导出指标并清空逐条记录、清理过期缓存，内存和磁盘占用不随运行时间增长"""
+        roll_records(timer, args.metrics_dir)
+        if cache:
+            cache.evict()
+        pool = browsers.get('pool')
+        recycled = f"，回收浏览器 {pool.recycled} 次，替换 {pool.replaced} 次" if pool else ''
+        print(f"\n常驻运行: 批次 {batch} {queue.stats(batch)}，累计保存 {counts['success']} 个郊区{recycled}")
     
-    while retry_count < max_retries:
-        try:
-            driver = setup_driver()
-            if not driver:
-                print("无法初始化Chrome浏览器")
-                return
-            
-            total_suburbs = len(TEST_SUBURBS)
-            skipped_count = 0
-            success_count = 0
-            
-            print(f"\n开始分析 {total_suburbs} 个郊区的数据...")
-            for i, url in enumerate(TEST_SUBURBS, 1):
-                try:
-                    suburb_name = url.split('/')[-1].replace('-', ' ').title()
-                    
-                    print(f"\n处理进度: {i}/{total_suburbs}")
-                    
-                    # 预先计算预期的日期（上个月的最后一天）
-                    current_date = datetime.now()
-                    if current_date.month == 1:
-                        # 如果是1月，则变为去年12月
-                        last_month = current_date.replace(year=current_date.year - 1, month=12, day=31)
-                    else:
-                        # 获取上个月的最后一天
-                        last_month = current_date.replace(month=current_date.month - 1, day=1)
-                        # 计算上个月的最后一天
-                        if last_month.month == 12:
-                            next_month = last_month.replace(year=last_month.year + 1, month=1)
-                        else:
-                            next_month = last_month.replace(month=last_month.month + 1)
-                        last_day_of_last_month = next_month - timedelta(days=1)
-                        last_month = last_day_of_last_month
-                    
-                    expected_date = last_month.strftime('%Y.%m.%d')
-                    
-                    # 预先检查数据是否已存在
-                    check_tuple = (expected_date, suburb_name)
-                    
-                    if check_tuple in existing_data:
+    pipeline.start()
+    try:
+        # 主线程只负责领取郊区和更新队列状态；流水线中的郊区少于 window 个时就领取下一批，
+        # 抓取阶段不会因为一批郊区的最后几个（例如正在用Chrome回退）而空闲
+        in_flight = 0
+        exhausted = False
+        published = store.written
+        last_claim = last_status = last_publish = last_housekeeping = time.monotonic()
+        while True:
+            if args.daemon and not stop.is_set():
+                month = datetime.now().strftime('%Y-%m')
+                if not args.batch and month != batch:
+                    # 月份变了：等流水线中上个批次的郊区处理完，再换到新批次
+                    exhausted = True
+                    if not in_flight:
+                        batch = month
+                        expected_date = expected_report_date()
+                        added = queue.enqueue(batch, urls)
+                        print(f"\n进入工作队列批次 {batch}（预期日期 {expected_date}）: 新加入 {added} 个郊区")
+                        exhausted = False
+                elif exhausted and time.monotonic() - last_claim >= args.tick:
+                    exhausted = False
+            while not exhausted and not stop.is_set() and in_flight < window:
+                claimed = queue.claim(batch, owner, limit=args.claim_size)
+                if not claimed:
+                    exhausted = True
+                    last_claim = time.monotonic()
+                    break
+                
+                # 预先检查数据是否已存在，只抓取缺失的郊区
+                completed = []
+                deferred = []
+                pending = []
+                for url in claimed:
+                    suburb_name = suburb_name_from_url(url)
+                    if store.has(expected_date, suburb_name):
                         print(f"{suburb_name} 在 {expected_date} 的数据已存在，跳过")
-                        skipped_count += 1
-                        continue
-                    
-                    # 如果数据不存在，才访问网页
-                    data = get_property_data(url, driver)
-                    if data:
-                        # 再次检查实际日期（以防网页上的日期与预期不同）
-                        actual_check_tuple = (data['date'], suburb_name)
-                        
-                        if actual_check_tuple in existing_data:
-                            print(f"\n{suburb_name} 在 {data['date']} 的数据已存在，跳过")
-                            skipped_count += 1
-                        else:
-                            # 立即保存单个区域的数据
-                            save_results(data, append_mode=(success_count > 0 or len(existing_data) > 0))
-                            success_count += 1
-                            print(f"成功保存 {suburb_name} 的数据")
+                        counts['skipped'] += 1
+                        timer.count('suburbs_skipped')
+                        completed.append(url)
+                    elif oracle and not oracle.due(url):
+                        # 网站还没更新的郊区：本批次内到预计更新时间再领取
+                        counts['unchanged'] += 1
+                        timer.count('suburbs_not_due')
+                        deferred.append(url)
                     else:
-                        print(f"无法获取 {suburb_name} 的数据")
-                    random_sleep()  # 在请求之间随机等待
-                except Exception as e:
-                    print(f"处理 {url} 时发生错误: {str(e)}")
-                    print("继续处理下一个郊区...")
-                    continue
-            
-            print(f"\n任务完成:")
-            print(f"成功分析了 {success_count}/{total_suburbs} 个郊区的数据")
-            print(f"跳过了 {skipped_count} 个已有数据的郊区")
-            print(f"md文件内容直接复制到前端ai，让他更新到page中")
-            break  # 如果成功完成，跳出重试循环
+                        pending.append(url)
+                queue.complete(batch, completed)
+                if deferred:
+                    queue.defer(batch, [(url, oracle.next_check_at(url)) for url in deferred])
+                
+                print(f"\n领取了 {len(claimed)} 个郊区，其中 {len(pending)} 个需要抓取...")
+                for url in pending:
+                    # 抓取阶段的队列满时在这里阻塞，不会一次领取过多郊区
+                    pipeline.submit(url)
+                    in_flight += 1
+            if not in_flight and (stop.is_set() or exhausted and not args.daemon):
+                break
             
-        except Exception as e:
-            retry_count += 1
-            print(f"\n发生错误: {str(e)}")
-            if retry_count < max_retries:
-                print(f"将在10秒后进行第 {retry_count + 1} 次重试...")
-                time.sleep(10)
-            else:
-                print("达到最大重试次数，程序退出")
-        finally:
-            if driver:
-                try:
-                    driver.quit()
-                except:
-                    pass
+            completed = []
+            deferred = []
+            for event, url in pipeline.events(timeout=1.0):
+                if event == 'fallback':
+                    # 交给Chrome的郊区需要更长时间，延长租约
+                    queue.extend(batch, [url], owner)
+                    continue
+                in_flight -= 1
+                if event == 'completed':
+                    completed.append(url)
+                elif event == 'deferred':
+                    deferred.append(url)
+                else:
+                    status = queue.fail(batch, url, '无法获取统计数据')
+                    timer.count('suburbs_failed' if status == FAILED else 'retries_scheduled')
+                    note = '已达最大尝试次数，放弃' if status == FAILED else '稍后重试'
+                    print(f"无法获取 {suburb_name_from_url(url)} 的数据，{note}")
+            # 'completed' 只在数据写入结果库之后才会报告，崩溃时不会丢数据
+            queue.complete(batch, completed)
+            if deferred:
+                if oracle:
+                    queue.defer(batch, [(url, oracle.next_check_at(url)) for url in deferred])
+                else:
+                    queue.complete(batch, deferred)
+            if args.daemon:
+                # 新结果写入结果库后随时发布，但最多每 --publish-interval 秒重新生成一次表格
+                now = time.monotonic()
+                written = store.written
+                if written > published and now - last_publish >= args.publish_interval:
+                    publish_results(store, args, timer)
+                    print(f"\n已发布 {written - published} 行新数据到 {args.output}")
+                    published = written
+                    last_publish = now
+                if now - last_housekeeping >= HOUSEKEEPING_SECONDS:
+                    housekeeping()
+                    last_housekeeping = now
+            if time.monotonic() - last_status >= args.status_interval:
+                print(f"\n流水线队列: {pipeline.status_line()}，处理中 {in_flight} 个郊区")
+                last_status = time.monotonic()
+    finally:
+        pipeline.close()
+        pipeline.print_summary()
+        pool = browsers.get('pool')
+        if pool:
+            pool.close()
+            timer.count('drivers_replaced', pool.replaced)
+            timer.count('drivers_recycled', pool.recycled)
+            if pool.replaced:
+                print(f"共替换了 {pool.replaced} 个无响应的浏览器")
+            if pool.recycled:
+                print(f"共回收了 {pool.recycled} 个打开页面过多或内存过大的浏览器")
+            throttle = browsers['throttle']
+            if throttle.controller.outcomes:
+                print(f"Chrome请求速率最终为每秒 {throttle.rate:.2f} 个，请求结果: {dict(throttle.controller.outcomes)}")
+            page_log.print_summary()
+        if proxies:
+            proxies.print_summary()
+            proxies.record_metrics(timer)
+    
+    if oracle:
+        oracle.close()
+    
+    print(f"\n工作队列批次 {batch} 状态: {queue.stats(batch)}")
+    retry_in = queue.next_retry_in(batch)
+    if retry_in is not None:
+        print(f"还有郊区在等待重试，最早 {retry_in / 60:.0f} 分钟后可以重新运行")
+    queue.close()
+    
+    if cache:
+        removed = cache.evict()
+        if removed:
+            print(f"清理了 {removed} 个过期的缓存页面")
+        cache.close()
+    
+    print("\n任务完成:")
+    print(f"成功分析了 {counts['success']}/{total_suburbs} 个郊区的数据")
+    print(f"跳过了 {counts['skipped']} 个已有数据的郊区")
+    if counts['unchanged']:
+        print(f"{counts['unchanged']} 个郊区的网站数据还没有更新（按时间表或页面没有变化判断），未完整抓取")
+    timer.print_summary()
+
+def main():
+    args = parse_args()
+    print("正在开始多郊区房产数据分析...")
+    
+    # 打开结果库，已有数据的检查都是索引查询
+    store = open_store(args.db, args.output)
+    timer = StageTimer()
+    try:
+        with profiled(args.profile):
+            crawl_suburbs(args, store, timer)
+    finally:
+        # 即使中途出错，缓冲区里的数据也会写入，并重新生成表格
+        with timer.stage('', 'render_markdown'):
+            store.close()
+            store.render_markdown(args.output)
+            if args.publish_json:
+                store.render_json(args.publish_json)
+        print(f"\n数据已保存到 {args.db}，表格已生成到 {args.output}")
+        print("md文件内容直接复制到前端ai，让他更新到page中")
+        if args.metrics_dir:
+            jsonl_path, prom_path = export_run(timer, args.metrics_dir)
+            print(f"运行指标已保存到 {jsonl_path} 和 {prom_path}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
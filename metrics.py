@@ -0,0 +1,189 @@
+"""抓取运行的指标导出：把 StageTimer 的阶段耗时和计数器写成 JSON Lines 和 Prometheus 文本格式
+
+JSON Lines 每个阶段一行，便于事后逐个郊区排查；Prometheus 文件可以交给 node_exporter 的
+textfile collector 采集，用来在定时任务超时前发现网站变慢。
+"""
+import json
+import os
+import socket
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+METRIC_PREFIX = 'suburb_scraper'
+# 阶段耗时直方图的分桶（秒）：从毫秒级的正则提取到几十秒的页面等待
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def new_run_id():
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{socket.gethostname()}-{os.getpid()}"
+
+
+def _write_atomic(path, text):
+    """先写临时文件再替换，采集程序不会读到写了一半的文件"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _counter_items(timer):
+    with timer._lock:
+        return sorted(timer.counters.items())
+
+
+def _gauge_items(timer):
+    with timer._lock:
+        return sorted(timer.gauges.items())
+
+
+def jsonl_lines(timer, run_id):
+    """每个阶段一行 span，每个计数器一行 counter，最后一行是整次运行的汇总"""
+    with timer._lock:
+        records = list(timer.records)
+    for suburb, stage, elapsed, started_at, ok in records:
+        yield json.dumps({'type': 'span', 'run_id': run_id, 'suburb': suburb, 'stage': stage,
+                          'start': round(started_at, 3), 'duration_s': round(elapsed, 6), 'ok': ok},
+                         ensure_ascii=False)
+    for (name, labels), value in _counter_items(timer):
+        yield json.dumps({'type': 'counter', 'run_id': run_id, 'name': name, 'labels': dict(labels),
+                          'value': value}, ensure_ascii=False)
+    for (name, labels), value in _gauge_items(timer):
+        yield json.dumps({'type': 'gauge', 'run_id': run_id, 'name': name, 'labels': dict(labels),
+                          'value': value}, ensure_ascii=False)
+    yield json.dumps({'type': 'run', 'run_id': run_id, 'start': round(timer.started_at, 3),
+                      'duration_s': round(time.time() - timer.started_at, 3),
+                      'stages': timer.summary()}, ensure_ascii=False)
+
+
+def write_jsonl(timer, path, run_id=None):
+    _write_atomic(path, ''.join(line + '\n' for line in jsonl_lines(timer, run_id or new_run_id())))
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels) + '}'
+
+
+def prometheus_text(timer, prefix=METRIC_PREFIX):
+    """Prometheus 文本格式：阶段耗时直方图、各计数器和瞬时值，以及本次运行的开始时间和总耗时"""
+    with timer._lock:
+        records = list(timer.records)
+    lines = []
+
+    histogram = f'{prefix}_stage_seconds'
+    lines.append(f'# HELP {histogram} 每个郊区各阶段的耗时')
+    lines.append(f'# TYPE {histogram} histogram')
+    by_stage = defaultdict(list)
+    for _, stage, elapsed, _, _ in records:
+        by_stage[stage].append(elapsed)
+    for stage, values in sorted(by_stage.items()):
+        for bucket in STAGE_BUCKETS:
+            count = sum(1 for value in values if value <= bucket)
+            lines.append(f'{histogram}_bucket{_label_text([("stage", stage), ("le", bucket)])} {count}')
+        lines.append(f'{histogram}_bucket{_label_text([("stage", stage), ("le", "+Inf")])} {len(values)}')
+        lines.append(f'{histogram}_sum{_label_text([("stage", stage)])} {sum(values):.6f}')
+        lines.append(f'{histogram}_count{_label_text([("stage", stage)])} {len(values)}')
+
+    failed = f'{prefix}_stage_failures_total'
+    lines.append(f'# HELP {failed} 因异常结束的阶段次数')
+    lines.append(f'# TYPE {failed} counter')
+    failures = defaultdict(int)
+    for _, stage, _, _, ok in records:
+        failures[stage] += 0 if ok else 1
+    for stage, count in sorted(failures.items()):
+        lines.append(f'{failed}{_label_text([("stage", stage)])} {count}')
+
+    counters = defaultdict(list)
+    for (name, labels), value in _counter_items(timer):
+        counters[name].append((labels, value))
+    for name, items in sorted(counters.items()):
+        metric = f'{prefix}_{name}_total'
+        lines.append(f'# TYPE {metric} counter')
+        for labels, value in items:
+            lines.append(f'{metric}{_label_text(labels)} {value}')
+
+    gauges = defaultdict(list)
+    for (name, labels), value in _gauge_items(timer):
+        gauges[name].append((labels, value))
+    for name, items in sorted(gauges.items()):
+        metric = f'{prefix}_{name}'
+        lines.append(f'# TYPE {metric} gauge')
+        for labels, value in items:
+            lines.append(f'{metric}{_label_text(labels)} {value}')
+
+    lines.append(f'# TYPE {prefix}_run_start_timestamp_seconds gauge')
+    lines.append(f'{prefix}_run_start_timestamp_seconds {timer.started_at:.3f}')
+    lines.append(f'# TYPE {prefix}_run_duration_seconds gauge')
+    lines.append(f'{prefix}_run_duration_seconds {time.time() - timer.started_at:.3f}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(timer, path, prefix=METRIC_PREFIX):
+    _write_atomic(path, prometheus_text(timer, prefix))
+
+
+def export_run(timer, metrics_dir, run_id=None, prefix=METRIC_PREFIX):
+    """写出 <metrics_dir>/<run_id>.jsonl 和 <metrics_dir>/<prefix>.prom，返回两个路径"""
+    run_id = run_id or new_run_id()
+    jsonl_path = os.path.join(metrics_dir, f'{run_id}.jsonl')
+    prom_path = os.path.join(metrics_dir, f'{prefix}.prom')
+    write_jsonl(timer, jsonl_path, run_id)
+    write_prometheus(timer, prom_path, prefix)
+    return jsonl_path, prom_path
+
+
+def roll_records(timer, metrics_dir=None):
+    """常驻运行时定期调用：指定了 metrics_dir 时先导出，然后总是清空逐条阶段记录（计数器和仪表保持累计）
+
+    返回导出的两个路径，没有导出时返回None。
+    """
+    paths = export_run(timer, metrics_dir) if metrics_dir else None
+    timer.clear_records()
+    return paths
+
+
+@contextmanager
+def profiled(path=None):
+    """可选的性能剖析：安装了 pyinstrument 时用它采样（开销小），否则用 cProfile
+
+    path 为None时不做任何事；结果写到 path（pyinstrument 为文本报告，cProfile 为 .prof 文件，
+    可以用 python -m pstats 或 snakeviz 查看）。
+    """
+    if not path:
+        yield
+        return
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            _write_atomic(path, profiler.output_text(unicode=True, color=False))
+            print(f"采样剖析结果已保存到 {path}")
+        return
+
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"cProfile结果已保存到 {path}（python -m pstats {path}）")
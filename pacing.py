@@ -0,0 +1,152 @@
+"""请求节奏控制：页面就绪检测、AIMD自适应限速和分阶段计时"""
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# 反爬/限流页面的常见特征
+BLOCK_PAGE_PATTERN = re.compile(
+    r'access denied|too many requests|unusual traffic|captcha|are you a robot|'
+    r'request blocked|rate limit|attention required',
+    re.IGNORECASE)
+
+# 统计句子出现在DOM中即视为页面就绪
+STATS_READY_SCRIPT = """
+var body = document.body;
+if (!body) { return false; }
+var text = body.innerText || '';
+return text.indexOf('properties') !== -1 && text.indexOf('median value') !== -1;
+"""
+
+
+def is_block_page(text):
+    """页面是否是封禁或限流提示页"""
+    return bool(text) and BLOCK_PAGE_PATTERN.search(text[:20000]) is not None
+
+
+def wait_for_stats(driver, timeout=30, poll_frequency=0.2):
+    """等待统计句子出现在DOM中，出现后立即返回"""
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(
+        lambda d: d.execute_script(STATS_READY_SCRIPT))
+
+
+class AimdController:
+    """AIMD速率控制：请求正常时线性提速，超时/出错/被封时成倍降速"""
+
+    def __init__(self, rate, min_rate=0.05, max_rate=None, increase=0.05, decrease=0.5):
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.min_rate = min(min_rate, self.max_rate)
+        self.rate = min(rate, self.max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.outcomes = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, outcome):
+        """记录一次请求结果：ok、timeout、error 或 blocked"""
+        with self._lock:
+            self.outcomes[outcome] += 1
+            if outcome == 'ok':
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            else:
+                # 被封比普通错误更严重，多降一次
+                factor = self.decrease ** 2 if outcome == 'blocked' else self.decrease
+                self.rate = max(self.min_rate, self.rate * factor)
+
+
+class AdaptiveThrottle:
+    """按AIMD控制的速率安排请求间隔，多个工作线程共享"""
+
+    def __init__(self, rate=0.5, min_rate=0.05, max_rate=None, jitter=0.2):
+        self.controller = AimdController(rate, min_rate=min_rate, max_rate=max_rate)
+        self.jitter = jitter
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.controller.rate
+
+    def wait(self):
+        """等待到下一个允许发起请求的时间点"""
+        with self._lock:
+            interval = 1 / self.controller.rate
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def record(self, outcome):
+        self.controller.record(outcome)
+
+
+class StageTimer:
+    """记录每个郊区各阶段（导航、等待、提取……）的耗时，以及成功、超时、回退等计数
+
+    records 中每项为 (suburb, stage, elapsed, started_at, ok)；与单个郊区无关的阶段（启动浏览器、
+    写入结果库）suburb 为空字符串。导出见 metrics.py。
+    """
+
+    def __init__(self):
+        self.records = []
+        self.counters = defaultdict(int)
+        self.gauges = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, suburb, name):
+        started_at = time.time()
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.records.append((suburb, name, elapsed, started_at, ok))
+
+    def count(self, name, amount=1, **labels):
+        """计数器加 amount，labels 用于区分后端、结果类型等"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += amount
+
+    def gauge(self, name, value, **labels):
+        """记录一个瞬时值（例如流水线队列的最大深度），同名同标签的值会被覆盖"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = value
+
+    def clear_records(self):
+        """清空逐个郊区的阶段记录（常驻运行时定期调用，内存不随运行时间增长）；计数器保持累计"""
+        with self._lock:
+            self.records = []
+
+    def for_suburb(self, suburb):
+        return [(name, elapsed) for s, name, elapsed, _, _ in self.records if s == suburb]
+
+    def summary(self):
+        """各阶段的次数、总耗时和平均耗时"""
+        totals = defaultdict(lambda: [0, 0.0])
+        with self._lock:
+            for _, name, elapsed, _, _ in self.records:
+                totals[name][0] += 1
+                totals[name][1] += elapsed
+        return {name: {'count': count, 'total': total, 'avg': total / count}
+                for name, (count, total) in totals.items()}
+
+    def print_summary(self):
+        summary = self.summary()
+        if not summary:
+            return
+        print("\n各阶段耗时:")
+        for name, item in summary.items():
+            print(f"  {name}: {item['count']} 次，共 {item['total']:.2f}s，平均 {item['avg']:.2f}s")
@@ -0,0 +1,126 @@
+"""按内容寻址的压缩页面缓存：同样的页面只存一份，索引记录URL和抓取时间"""
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_DIR = '.page_cache'
+
+
+class PageCache:
+    def __init__(self, root=DEFAULT_CACHE_DIR, ttl_days=60, max_bytes=512 * 1024 * 1024):
+        self.root = root
+        self.ttl = ttl_days * 86400
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, 'blobs'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, 'index.sqlite3'), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_pages_url ON pages (url, fetched_at);
+            CREATE INDEX IF NOT EXISTS idx_pages_hash ON pages (content_hash);
+        """)
+
+    def _blob_path(self, content_hash):
+        return os.path.join(self.root, 'blobs', content_hash[:2], content_hash + '.html.gz')
+
+    def put(self, url, html, fetched_at=None):
+        """保存页面，返回内容哈希；内容相同的页面只写一次文件"""
+        data = html.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再改名，进程中途退出也不会留下半个文件
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO pages (url, fetched_at, content_hash, size) VALUES (?, ?, ?, ?)",
+                (url, fetched_at or time.time(), content_hash, size))
+        return content_hash
+
+    def path_for(self, content_hash):
+        return self._blob_path(content_hash)
+
+    def _read(self, content_hash):
+        try:
+            with gzip.open(self._blob_path(content_hash), 'rb') as f:
+                return f.read().decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def get(self, url, max_age=None):
+        """返回URL在有效期内最新的一份页面，没有时返回None"""
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM pages WHERE url = ? AND fetched_at >= ? "
+                "ORDER BY fetched_at DESC LIMIT 1",
+                (url, time.time() - max_age)).fetchone()
+        return self._read(row[0]) if row else None
+
+    def latest(self, urls=None):
+        """按URL产出有效期内最新的 (url, fetched_at, html)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, MAX(fetched_at), content_hash FROM pages WHERE fetched_at >= ? GROUP BY url",
+                (time.time() - self.ttl,)).fetchall()
+        wanted = set(urls) if urls is not None else None
+        for url, fetched_at, content_hash in rows:
+            if wanted is not None and url not in wanted:
+                continue
+            html = self._read(content_hash)
+            if html is not None:
+                yield url, fetched_at, html
+
+    def total_bytes(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT content_hash, size FROM pages)").fetchone()
+        return row[0]
+
+    def evict(self):
+        """删除过期记录；总大小超过上限时从最旧的记录开始删除。返回删除的文件数"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - self.ttl,))
+            total = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT content_hash, size FROM pages)").fetchone()[0]
+            if total > self.max_bytes:
+                rows = self._conn.execute(
+                    "SELECT rowid, content_hash, size FROM pages ORDER BY fetched_at").fetchall()
+                remaining = {}
+                for _, content_hash, _ in rows:
+                    remaining[content_hash] = remaining.get(content_hash, 0) + 1
+                for rowid, content_hash, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    self._conn.execute("DELETE FROM pages WHERE rowid = ?", (rowid,))
+                    remaining[content_hash] -= 1
+                    if remaining[content_hash] == 0:
+                        total -= size
+            referenced = {row[0] for row in self._conn.execute("SELECT DISTINCT content_hash FROM pages")}
+
+        removed = 0
+        blobs_dir = os.path.join(self.root, 'blobs')
+        for prefix in os.listdir(blobs_dir):
+            prefix_dir = os.path.join(blobs_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if name.endswith('.html.gz') and name[:-len('.html.gz')] not in referenced:
+                    os.remove(os.path.join(prefix_dir, name))
+                    removed += 1
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,262 @@
+"""分阶段的抓取流水线：HTTP抓取 → 解析 → （Chrome回退）→ 写入，阶段之间用有界队列连接
+
+每个阶段有自己的并发数。下游处理不过来时队列写满，上游的 put 阻塞（背压），慢的磁盘或解析
+不会让下载好的页面在内存中无限堆积。HTTP抓取阶段在自己的线程里运行 asyncio 事件循环，只负责
+按限速下载；解析在单独的线程中进行，不占用事件循环。
+
+各阶段的处理数量、忙碌时间、上游被阻塞的时间和队列最大深度在关闭时记录到 StageTimer，
+随运行指标导出；status_line() 给出当前的队列深度，运行中定期打印便于调整各阶段的并发数。
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pacing import StageTimer
+
+_STOP = object()
+
+
+class Stage:
+    """流水线的一个阶段：workers 个线程从容量为 capacity 的队列中取任务，交给 handler(item) 处理
+
+    capacity 为0时队列不限长度（只适合URL这样很小的任务）。handler 抛出异常时调用 on_error(item, e)，
+    保证每个任务都有结果。传入 on_idle 时，队列空闲 idle_seconds 秒后在工作线程中调用一次
+    （例如把攒了一部分的写入缓冲区写入磁盘）。
+    """
+
+    def __init__(self, name, handler, workers=1, capacity=32, timer=None, on_error=None,
+                 on_idle=None, idle_seconds=1.0):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.capacity = capacity
+        self.timer = timer or StageTimer()
+        self.on_error = on_error
+        self.on_idle = on_idle
+        self.idle_seconds = idle_seconds
+        self.queue = queue.Queue(maxsize=capacity)
+        self.processed = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.max_depth = 0
+        self.started_at = None
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'{self.name}-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, item):
+        """放入一个任务；队列已满时阻塞，直到下游腾出空间"""
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            start = time.perf_counter()
+            self.queue.put(item)
+            with self._lock:
+                self.blocked += time.perf_counter() - start
+        self._observe_depth()
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def _observe_depth(self):
+        depth = self.depth()
+        if depth > self.max_depth:
+            with self._lock:
+                self.max_depth = max(self.max_depth, depth)
+
+    def _get(self):
+        if self.on_idle is None:
+            return self.queue.get()
+        while True:
+            try:
+                return self.queue.get(timeout=self.idle_seconds)
+            except queue.Empty:
+                self.on_idle()
+
+    def _run(self):
+        while True:
+            item = self._get()
+            if item is _STOP:
+                break
+            start = time.perf_counter()
+            try:
+                self.handler(item)
+            except Exception as e:
+                print(f"流水线阶段 {self.name} 处理时出错: {str(e)}")
+                if self.on_error:
+                    self.on_error(item, e)
+            finally:
+                with self._lock:
+                    self.busy += time.perf_counter() - start
+                    self.processed += 1
+
+    def close(self):
+        """处理完队列中剩余的任务后结束所有线程，并把本阶段的统计记入 timer"""
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        if self.on_idle:
+            self.on_idle()
+        self._threads = []
+        self.record_metrics()
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        with self._lock:
+            return {'stage': self.name, 'workers': self.workers, 'processed': self.processed,
+                    'per_min': self.processed / elapsed * 60 if elapsed else 0.0,
+                    'utilization': self.busy / (elapsed * self.workers) if elapsed else 0.0,
+                    'blocked_s': self.blocked, 'max_depth': self.max_depth, 'capacity': self.capacity}
+
+    def record_metrics(self):
+        stats = self.stats()
+        self.timer.count('pipeline_items', stats['processed'], stage=self.name)
+        self.timer.count('pipeline_blocked_seconds', round(stats['blocked_s'], 3), stage=self.name)
+        self.timer.gauge('pipeline_utilization', round(stats['utilization'], 3), stage=self.name)
+        self.timer.gauge('pipeline_queue_max_depth', stats['max_depth'], stage=self.name)
+        self.timer.gauge('pipeline_queue_capacity', self.capacity, stage=self.name)
+
+
+class HttpFetchStage(Stage):
+    """HTTP抓取阶段：独立线程中的事件循环，concurrency 个协程按主机限速下载页面
+
+    handler(url, html, validators) 在线程池中调用，下游队列满时只阻塞当前协程；
+    所有协程都被阻塞时下载自然停止，正在内存中的页面最多为 capacity + concurrency 个。
+    传入 proxies（proxy_pool.ProxyPool）时经由代理下载，按每个代理的速率限速。
+    """
+
+    def __init__(self, name, handler, concurrency=8, rate=2.0, capacity=32, timeout=15, timer=None,
+                 freshness=None, cache=None, on_error=None, proxies=None):
+        super().__init__(name, handler, workers=concurrency, capacity=capacity, timer=timer, on_error=on_error)
+        self.rate = rate
+        self.timeout = timeout
+        self.freshness = freshness
+        self.cache = cache
+        self.proxies = proxies
+        self._slots = threading.BoundedSemaphore(capacity)
+        self._ready = threading.Event()
+        self._loop = None
+        self._pending = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        thread = threading.Thread(target=lambda: asyncio.run(self._main()), name=self.name, daemon=True)
+        thread.start()
+        self._threads = [thread]
+        self._ready.wait()
+
+    def put(self, item):
+        if not self._slots.acquire(blocking=False):
+            start = time.perf_counter()
+            self._slots.acquire()
+            with self._lock:
+                self.blocked += time.perf_counter() - start
+        self._loop.call_soon_threadsafe(self._pending.put_nowait, item)
+        self._observe_depth()
+
+    def depth(self):
+        return self._pending.qsize() if self._pending else 0
+
+    async def _main(self):
+        from crawl_engine import HostRateLimiter, open_session
+
+        self._loop = asyncio.get_running_loop()
+        # 每个协程都可能在交给下游时阻塞一个线程，线程数与并发数相同
+        self._loop.set_default_executor(ThreadPoolExecutor(max_workers=self.workers,
+                                                           thread_name_prefix=f'{self.name}-handoff'))
+        self._pending = asyncio.Queue()
+        self._ready.set()
+        limiter = HostRateLimiter(self.rate)
+        async with open_session(self.workers) as session:
+            await asyncio.gather(*(self._worker(session, limiter) for _ in range(self.workers)))
+
+    async def _worker(self, session, limiter):
+        from crawl_engine import fetch_page
+
+        loop = asyncio.get_running_loop()
+        while True:
+            url = await self._pending.get()
+            self._slots.release()
+            if url is _STOP:
+                break
+            start = time.perf_counter()
+            try:
+                html, validators = await fetch_page(session, limiter, url, self.timeout, self.timer,
+                                                    self.freshness, self.cache, self.proxies)
+            except Exception as e:
+                print(f"流水线阶段 {self.name} 处理时出错: {str(e)}")
+                html, validators = None, {}
+            with self._lock:
+                self.busy += time.perf_counter() - start
+                self.processed += 1
+            try:
+                await loop.run_in_executor(None, self.handler, url, html, validators)
+            except Exception as e:
+                print(f"流水线阶段 {self.name} 处理时出错: {str(e)}")
+                if self.on_error:
+                    self.on_error(url, e)
+
+    def close(self):
+        for _ in range(self.workers):
+            self.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.record_metrics()
+
+
+class Pipeline:
+    """按顺序排列的阶段，以及各阶段向主线程报告结果的事件队列
+
+    事件队列不限长度：主线程在 put 上被背压阻塞时，各阶段仍然可以报告结果，不会互相等待。
+    """
+
+    def __init__(self, stages, timer=None):
+        self.stages = stages
+        self.timer = timer or StageTimer()
+        self._events = queue.Queue()
+
+    def start(self):
+        for stage in reversed(self.stages):
+            stage.start()
+
+    def emit(self, event, url):
+        self._events.put((event, url))
+
+    def events(self, timeout=1.0):
+        """等待最多 timeout 秒，返回目前为止所有的 (事件, url)"""
+        try:
+            items = [self._events.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                items.append(self._events.get_nowait())
+            except queue.Empty:
+                return items
+
+    def close(self):
+        """从上游到下游依次关闭，每个阶段都处理完剩余任务后再关闭下一个"""
+        for stage in self.stages:
+            stage.close()
+
+    def status_line(self):
+        return '，'.join(f"{stage.name} {stage.depth()}/{stage.capacity or '∞'}" for stage in self.stages)
+
+    def print_summary(self):
+        print("\n流水线各阶段:")
+        for stage in self.stages:
+            stats = stage.stats()
+            print(f"  {stats['stage']}: {stats['workers']} 个并发，处理 {stats['processed']} 个"
+                  f"（每分钟 {stats['per_min']:.1f} 个），忙碌 {stats['utilization'] * 100:.0f}%，"
+                  f"队列最深 {stats['max_depth']}/{stats['capacity'] or '∞'}，"
+                  f"上游因队列已满等待 {stats['blocked_s']:.1f}s")
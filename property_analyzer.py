@@ -1,27 +1,62 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-import pandas as pd
-import time
-from tqdm import tqdm
+# selenium、pandas等较重的依赖在用到的方法里才导入，只生成报告时不必加载浏览器相关模块
 from suburbs import SUBURBS
-import json
-from datetime import datetime
 import platform
+import argparse
+from driver_pool import DriverPool
+from pacing import AdaptiveThrottle, StageTimer, is_block_page
+from browser_profile import DEFAULT_PROFILE, PROFILES, PageMetricsLog, apply_profile, build_chrome_options, page_metrics
+from browser_session import attach_driver, chromedriver_service, warm_browser_address
+from metrics import export_run, profiled
+from field_spec import stat_items
+from concurrent.futures import ThreadPoolExecutor
+
+# 只取回统计区块的HTML（几百字节），区块还没出现时返回null
+STATS_FRAGMENT_SCRIPT = """
+var el = document.querySelector('.suburb-statistics');
+return el ? el.outerHTML : null;
+"""
 
 class PropertyAnalyzer:
-    def __init__(self):
-        self.setup_driver()
+    def __init__(self, workers=1, browser_profile=DEFAULT_PROFILE, attach=None, keep_browser=False, parse_workers=1):
+        self.workers = max(1, workers)
+        self.browser_profile = browser_profile
+        # 有常驻Chrome可连接时直接连接，省去启动浏览器的时间；连接模式只用一个浏览器
+        self.browser_address = warm_browser_address(attach, keep_browser, browser_profile)
+        if self.browser_address and self.workers > 1:
+            print("连接常驻Chrome时只使用一个浏览器")
+            self.workers = 1
+        # 所有浏览器共享同一个自适应限速器，页面正常时提速，超时或被封时降速
+        self.throttle = AdaptiveThrottle(rate=0.5, max_rate=1.0)
+        self.timer = StageTimer()
+        self.page_log = PageMetricsLog()
+        # 统计片段在单独的线程中解析，浏览器线程取回片段后立即打开下一个页面
+        self.parse_pool = ThreadPoolExecutor(max_workers=max(1, parse_workers), thread_name_prefix='parser')
+        self.driver = None
+        self.pool = None
+        if self.workers > 1:
+            # 多个浏览器并行时由DriverPool按需创建和替换
+            self.pool = DriverPool(self.create_driver, size=self.workers)
+        else:
+            self.setup_driver()
         self.data = []
 
     def setup_driver(self):
-        options = webdriver.ChromeOptions()
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
+        self.driver = self.create_driver()
+
+    def create_driver(self):
+        with self.timer.stage('', 'driver_startup'):
+            return self._start_driver()
+
+    def _start_driver(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+
+        if self.browser_address:
+            driver = attach_driver(self.browser_address, self.browser_profile)
+            apply_profile(driver, self.browser_profile)
+            return driver
+
+        options = build_chrome_options(self.browser_profile)
         
         # 根据系统类型选择合适的ChromeDriver
         system = platform.system()
@@ -31,137 +66,186 @@ class PropertyAnalyzer:
             if arch == "arm64":
                 options.binary_location = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
             service = Service()
-            self.driver = webdriver.Chrome(service=service, options=options)
         else:
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=options)
+            # 解析过的chromedriver路径缓存在本地，之后的运行不再联网检查版本
+            service = chromedriver_service()
+        driver = webdriver.Chrome(service=service, options=options)
+        apply_profile(driver, self.browser_profile)
+        return driver
+
+    def load_stats_fragment(self, url, driver=None):
+        """在浏览器线程中打开页面，统计区块一出现就只取回它的HTML片段，返回 (郊区名, 片段)
+
+        不读取 driver.page_source：序列化整个DOM并传回几百KB的文本，比取回一个区块慢得多。
+        """
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
 
-    def extract_property_data(self, url):
+        driver = driver or self.driver
+        suburb_name = url.split('/')[-1].replace('-', ' ').title()
         try:
-            self.driver.get(url)
-            time.sleep(2)
+            with self.timer.stage(suburb_name, 'throttle'):
+                self.throttle.wait()
+            with self.timer.stage(suburb_name, 'navigate'):
+                driver.get(url)
             
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "suburb-statistics"))
-            )
+            # 轮询同一段脚本，统计区块出现的那一次调用就带回它的 outerHTML，不再固定等待
+            try:
+                with self.timer.stage(suburb_name, 'ready'):
+                    fragment = WebDriverWait(driver, 10, poll_frequency=0.2).until(
+                        lambda d: d.execute_script(STATS_FRAGMENT_SCRIPT))
+            except TimeoutException:
+                outcome = 'blocked' if is_block_page(driver.page_source) else 'timeout'
+                self.throttle.record(outcome)
+                self.timer.count('page_outcomes', backend='chrome', outcome=outcome)
+                raise
 
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            suburb_name = url.split('/')[-1].replace('-', ' ').title()
-            
-            stats = {'suburb': suburb_name}
-            stats_container = soup.find('div', class_='suburb-statistics')
-            
-            if stats_container:
-                all_stats = stats_container.find_all('div', class_='stat-item')
-                for stat in all_stats:
-                    label = stat.find('div', class_='label')
-                    value = stat.find('div', class_='value')
-                    if label and value:
-                        label_text = label.text.strip()
-                        value_text = value.text.strip()
-                        stats[label_text] = value_text
-
-            # 打印当前suburb的信息
-            print(f"\n获取到 {suburb_name} 的数据:")
-            for key, value in stats.items():
-                if key != 'suburb':
-                    print(f"- {key}: {value}")
-
-            return stats
+            self.page_log.record(suburb_name, page_metrics(driver, self.browser_profile))
+            self.throttle.record('ok')
+            self.timer.count('page_outcomes', backend='chrome', outcome='ok')
+            return suburb_name, fragment
+        except TimeoutException:
+            print(f"等待 {url} 的统计数据超时")
+            return None
         except Exception as e:
             print(f"处理 {url} 时出错: {str(e)}")
+            self.throttle.record('error')
+            self.timer.count('page_outcomes', backend='chrome', outcome='error')
             return None
 
-    def analyze_suburbs(self, urls):
-        for url in tqdm(urls, desc="分析郊区"):
-            data = self.extract_property_data(url)
+    def parse_stats_fragment(self, suburb_name, fragment):
+        """解析统计区块片段（在解析线程中运行）：扫描一遍片段，按页面顺序保留每个卡片的标签和数值"""
+        stats = {'suburb': suburb_name}
+        with self.timer.stage(suburb_name, 'extract'):
+            for label, value in stat_items(fragment):
+                stats[label] = value
+                self.timer.count('field_rule', field=label, rule='stat_item')
+
+        # 打印当前suburb的信息
+        print(f"\n获取到 {suburb_name} 的数据:")
+        for key, value in stats.items():
+            if key != 'suburb':
+                print(f"- {key}: {value}")
+        return stats
+
+    def submit(self, url, driver=None):
+        """打开页面并把片段交给解析线程池，浏览器随即可以打开下一个页面；返回 Future，页面失败时返回None"""
+        loaded = self.load_stats_fragment(url, driver)
+        return self.parse_pool.submit(self.parse_stats_fragment, *loaded) if loaded else None
+
+    def extract_property_data(self, url, driver=None):
+        """同步获取单个郊区的统计（打开页面后在当前线程解析）"""
+        loaded = self.load_stats_fragment(url, driver)
+        return self.parse_stats_fragment(*loaded) if loaded else None
+
+    def _collect(self, futures):
+        for future in futures:
+            try:
+                data = future.result()
+            except Exception as e:
+                print(f"解析统计数据时出错: {str(e)}")
+                continue
             if data:
                 self.data.append(data)
-            time.sleep(1)
+                self.timer.count('suburbs_saved')
 
-    def save_results(self, filename='property_analysis.csv'):
+    def analyze_suburbs(self, urls):
+        from tqdm import tqdm
+
+        if self.pool:
+            self._analyze_suburbs_parallel(urls)
+            return
+        futures = []
+        for url in tqdm(urls, desc="分析郊区"):
+            future = self.submit(url)
+            if future:
+                futures.append(future)
+        self._collect(futures)
+        self.timer.print_summary()
+        self.page_log.print_summary()
+
+    def _analyze_suburbs_parallel(self, urls):
+        from tqdm import tqdm
+
+        futures = []
+        with tqdm(total=len(urls), desc=f"分析郊区（{self.workers}个浏览器）") as progress:
+            for url, future in self.pool.map(urls, self.submit):
+                if future:
+                    futures.append(future)
+                progress.update(1)
+        self._collect(futures)
+        self.timer.count('drivers_replaced', self.pool.replaced)
+        if self.pool.replaced:
+            print(f"共替换了 {self.pool.replaced} 个无响应的浏览器")
+        self.timer.print_summary()
+        self.page_log.print_summary()
+
+    def save_results(self, filename='property_analysis.csv', top_n=None, page=None, page_size=None):
         if not self.data:
             print("没有数据可以保存")
             return
-            
+        import pandas as pd
+
         df = pd.DataFrame(self.data)
         
         # 保存CSV
-        df.to_csv(filename, index=False, encoding='utf-8-sig')
+        with self.timer.stage('', 'write_csv'):
+            df.to_csv(filename, index=False, encoding='utf-8-sig')
         print(f"\n数据已保存到 {filename}")
         
         # 生成Markdown报告
-        self.generate_markdown_report(df)
+        with self.timer.stage('', 'write_report'):
+            self.generate_markdown_report(df, top_n=top_n, page=page, page_size=page_size)
         
         # 生成JSON数据
-        self.save_json_data(df)
+        with self.timer.stage('', 'write_json'):
+            self.save_json_data(df)
 
-    def generate_markdown_report(self, df):
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        with open('property_report.md', 'w', encoding='utf-8') as f:
-            # 写入标题和更新时间
-            f.write(f"# 墨尔本房产市场分析报告\n\n")
-            f.write(f"*更新时间：{current_time}*\n\n")
-            
-            # 总体统计
-            f.write("## 总体统计\n\n")
-            f.write(f"- 分析郊区数量：{len(df)}\n\n")
-            
-            # 中位数房价排名
-            f.write("## 房价排名 (中位数)\n\n")
-            f.write("| 排名 | 郊区 | 中位价格 | 年度涨幅 | 租金回报率 |\n")
-            f.write("|------|------|----------|----------|------------|\n")
-            
-            # 按中位数房价排序
-            price_sorted = df.sort_values(by='中位价格', ascending=False)
-            for idx, row in price_sorted.iterrows():
-                f.write(f"| {idx + 1} | {row['suburb']} | {row.get('中位价格', 'N/A')} | {row.get('年度涨幅', 'N/A')} | {row.get('租金回报率', 'N/A')} |\n")
-            
-            f.write("\n## 投资回报率排名\n\n")
-            f.write("| 排名 | 郊区 | 租金回报率 | 中位价格 | 年度涨幅 |\n")
-            f.write("|------|------|------------|----------|----------|\n")
-            
-            # 按租金回报率排序
-            yield_sorted = df.sort_values(by='租金回报率', ascending=False)
-            for idx, row in yield_sorted.iterrows():
-                f.write(f"| {idx + 1} | {row['suburb']} | {row.get('租金回报率', 'N/A')} | {row.get('中位价格', 'N/A')} | {row.get('年度涨幅', 'N/A')} |\n")
-            
-            f.write("\n## 年度涨幅排名\n\n")
-            f.write("| 排名 | 郊区 | 年度涨幅 | 中位价格 | 租金回报率 |\n")
-            f.write("|------|------|----------|----------|------------|\n")
-            
-            # 按年度涨幅排序
-            growth_sorted = df.sort_values(by='年度涨幅', ascending=False)
-            for idx, row in growth_sorted.iterrows():
-                f.write(f"| {idx + 1} | {row['suburb']} | {row.get('年度涨幅', 'N/A')} | {row.get('中位价格', 'N/A')} | {row.get('租金回报率', 'N/A')} |\n")
-        
-        print(f"\nMarkdown报告已保存到 property_report.md")
+    def generate_markdown_report(self, df, top_n=None, page=None, page_size=None):
+        from report_engine import render_markdown_report
+        render_markdown_report(df, 'property_report.md', top_n=top_n, page=page, page_size=page_size)
 
     def save_json_data(self, df):
-        # 转换为JSON格式
-        json_data = {
-            'update_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'total_suburbs': len(df),
-            'suburbs_data': df.to_dict('records')
-        }
-        
-        with open('property_data.json', 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, ensure_ascii=False, indent=2)
-        
-        print(f"JSON数据已保存到 property_data.json")
+        from report_engine import write_json_report
+        write_json_report(df, 'property_data.json')
 
     def close(self):
-        self.driver.quit()
+        self.parse_pool.shutdown(wait=True)
+        if self.driver:
+            self.driver.quit()
+        if self.pool:
+            self.pool.close()
 
 def main():
-    analyzer = PropertyAnalyzer()
-    try:
-        print(f"开始分析 {len(SUBURBS)} 个郊区...")
-        analyzer.analyze_suburbs(SUBURBS)
-        analyzer.save_results()
-    finally:
-        analyzer.close()
+    parser = argparse.ArgumentParser(description='分析郊区房产数据')
+    parser.add_argument('--workers', type=int, default=1, help='并行Chrome浏览器数量')
+    parser.add_argument('--browser-profile', choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help='full（默认）: 与普通浏览器一致，有界面；lean: 无头、eager加载并屏蔽图片/字体/地图/统计脚本')
+    parser.add_argument('--attach', metavar='HOST:PORT', help='连接已经在运行的Chrome（远程调试端口）')
+    parser.add_argument('--keep-browser', action='store_true',
+                        help='使用常驻Chrome（本机9222端口），没有时启动一个，运行结束后不关闭')
+    parser.add_argument('--top', type=int, help='每个排名只输出前N个郊区')
+    parser.add_argument('--page', type=int, help='分页输出排名时的页码（从1开始）')
+    parser.add_argument('--page-size', type=int, help='分页输出排名时每页的郊区数量')
+    parser.add_argument('--parse-workers', type=int, default=1, help='解析统计区块的线程数')
+    parser.add_argument('--metrics-dir', help='把各阶段耗时和计数导出为 JSON Lines 和 Prometheus 文本格式')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='剖析本次运行（有 pyinstrument 时采样，否则用 cProfile），结果写到 PATH')
+    args = parser.parse_args()
+
+    with profiled(args.profile):
+        analyzer = PropertyAnalyzer(workers=args.workers, browser_profile=args.browser_profile,
+                                    attach=args.attach, keep_browser=args.keep_browser,
+                                    parse_workers=args.parse_workers)
+        try:
+            print(f"开始分析 {len(SUBURBS)} 个郊区...")
+            analyzer.analyze_suburbs(SUBURBS)
+            analyzer.save_results(top_n=args.top, page=args.page, page_size=args.page_size)
+        finally:
+            analyzer.close()
+            if args.metrics_dir:
+                jsonl_path, prom_path = export_run(analyzer.timer, args.metrics_dir)
+                print(f"运行指标已保存到 {jsonl_path} 和 {prom_path}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
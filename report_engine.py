@@ -0,0 +1,116 @@
+"""房产分析报告渲染：一次向量化计算全部排名，分块流式写出表格和JSON"""
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# (标题, 排序字段, 表格列)
+RANKINGS = [
+    ('房价排名 (中位数)', '中位价格', ['中位价格', '年度涨幅', '租金回报率']),
+    ('投资回报率排名', '租金回报率', ['租金回报率', '中位价格', '年度涨幅']),
+    ('年度涨幅排名', '年度涨幅', ['年度涨幅', '中位价格', '租金回报率']),
+]
+
+DISPLAY_COLUMNS = ['suburb', '中位价格', '年度涨幅', '租金回报率']
+
+
+def to_numeric(series):
+    """把 "$1,234,000"、"5.2%" 这样的文本一次性转换为数值，无法解析的记为NaN"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    cleaned = series.astype(str).str.replace(r'[$,%\s]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def compute_rankings(df):
+    """一次argsort同时得到三个排名（降序，缺失值排在最后），返回 {排序字段: 行号数组}"""
+    keys = [key for _, key, _ in RANKINGS]
+    matrix = np.column_stack([
+        to_numeric(df[key]).to_numpy() if key in df.columns else np.full(len(df), np.nan)
+        for key in keys
+    ]) if len(df) else np.empty((0, len(keys)))
+    matrix = np.where(np.isnan(matrix), np.inf, -matrix)
+    order = np.argsort(matrix, axis=0, kind='stable')
+    return {key: order[:, i] for i, key in enumerate(keys)}
+
+
+def _display_values(df):
+    """每列转成字符串数组，缺失列和缺失值显示为 N/A"""
+    values = {}
+    for column in DISPLAY_COLUMNS:
+        if column in df.columns:
+            values[column] = df[column].astype(object).where(df[column].notna(), 'N/A').astype(str).to_numpy()
+        else:
+            values[column] = np.full(len(df), 'N/A', dtype=object)
+    return values
+
+
+def page_slice(total, top_n=None, page=None, page_size=None):
+    """根据 top_n 或分页参数计算要输出的排名区间 [start, stop)"""
+    start, stop = 0, total
+    if page_size:
+        start = (max(1, page or 1) - 1) * page_size
+        stop = start + page_size
+    if top_n is not None:
+        stop = min(stop, top_n)
+    return min(start, total), min(stop, total)
+
+
+def write_ranking_table(f, values, order, columns, start, stop, chunk_size=1000):
+    """按块写出一个排名表格，每块拼接成一个字符串写入一次"""
+    f.write("| 排名 | 郊区 | " + " | ".join(columns) + " |\n")
+    f.write("|------|------|" + "|".join('-' * (len(c) * 2 + 2) for c in columns) + "|\n")
+    for chunk_start in range(start, stop, chunk_size):
+        rows = order[chunk_start:min(stop, chunk_start + chunk_size)]
+        cells = [values['suburb'][rows]] + [values[c][rows] for c in columns]
+        f.write(''.join(
+            f"| {rank} | " + " | ".join(row) + " |\n"
+            for rank, row in enumerate(zip(*cells), chunk_start + 1)
+        ))
+
+
+def render_markdown_report(df, filename='property_report.md', top_n=None, page=None, page_size=None,
+                           chunk_size=1000):
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rankings = compute_rankings(df)
+    values = _display_values(df)
+    start, stop = page_slice(len(df), top_n, page, page_size)
+
+    with open(filename, 'w', encoding='utf-8') as f:
+        # 写入标题和更新时间
+        f.write("# 墨尔本房产市场分析报告\n\n")
+        f.write(f"*更新时间：{current_time}*\n\n")
+
+        # 总体统计
+        f.write("## 总体统计\n\n")
+        f.write(f"- 分析郊区数量：{len(df)}\n")
+        if stop - start < len(df):
+            f.write(f"- 本页显示排名：{start + 1}-{stop}\n")
+        f.write("\n")
+
+        for i, (title, key, columns) in enumerate(RANKINGS):
+            if i:
+                f.write("\n")
+            f.write(f"## {title}\n\n")
+            write_ranking_table(f, values, rankings[key], columns, start, stop, chunk_size)
+
+    print(f"\nMarkdown报告已保存到 {filename}")
+
+
+def write_json_report(df, filename='property_data.json', chunk_size=1000):
+    """流式写出JSON：每次只把一块记录转换成字典"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("{\n")
+        f.write(f'  "update_time": {json.dumps(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))},\n')
+        f.write(f'  "total_suburbs": {len(df)},\n')
+        f.write('  "suburbs_data": [')
+        first = True
+        for chunk_start in range(0, len(df), chunk_size):
+            records = df.iloc[chunk_start:chunk_start + chunk_size].to_dict('records')
+            f.write(('\n' if first else ',\n') + ',\n'.join(
+                '    ' + json.dumps(record, ensure_ascii=False) for record in records))
+            first = False
+        f.write("\n  ]\n}\n" if not first else "]\n}\n")
+
+    print(f"JSON数据已保存到 {filename}")
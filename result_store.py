@@ -0,0 +1,300 @@
+"""郊区房产数据的SQLite存储：(日期, 郊区, 类型) 唯一，Markdown表格由它渲染生成
+
+每次写入同时在同一个事务里增量更新 timeseries 的 trends 汇总表。
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+DEFAULT_DB = 'suburb_analysis.db'
+PROPERTY_TYPES = ('house', 'unit')
+
+MARKDOWN_HEADER = (
+    "| 日期 | 地区 | 类型 | 价格 | 近五年涨幅 | 周租金 | 租金回报率 |\n"
+    "|------|------|------|------|------------|--------|------------|\n"
+)
+
+
+def _parse_money(text):
+    text = text.strip().lstrip('$').replace(',', '')
+    return float(text) if text and text != '-' else None
+
+
+def _parse_percent(text):
+    text = text.strip().rstrip('%')
+    return float(text) if text and text != '-' else None
+
+
+def record_rows(data):
+    """把一条郊区数据拆成 house 和 unit 两行"""
+    rows = []
+    for property_type in PROPERTY_TYPES:
+        value = data.get(f'{property_type}_value')
+        if value is None:
+            continue
+        rent = data.get(f'{property_type}_rent')
+        rows.append((
+            data['date'], data['suburb'], property_type, value,
+            data.get(f'{property_type}_increase'), rent,
+            rent * 52 / value * 100 if rent and value else None,
+        ))
+    return rows
+
+
+def markdown_row(row):
+    """把 rows() 返回的一行格式化为Markdown表格行"""
+    date, suburb, property_type, value, change, rent, rental_yield = row
+    value_text = f"${value:,.0f}" if value is not None else "-"
+    change_text = f"{change}%" if change is not None else "-"
+    rent_text = f"${rent:.0f}" if rent else "-"
+    yield_text = f"{rental_yield:.2f}%" if rental_yield is not None else "-"
+    return f"| {date} | {suburb} | {property_type} | {value_text} | {change_text} | {rent_text} | {yield_text} |\n"
+
+
+class ResultStore:
+    def __init__(self, path=DEFAULT_DB, batch_size=20):
+        self.path = path
+        self.batch_size = batch_size
+        # 本次打开以来写入的行数（常驻模式据此判断有没有新结果需要发布）
+        self.written = 0
+        self._pending = []
+        self._pending_keys = set()
+        # 本次写入涉及的快照日期，close() 时统一重算这些日期的排名
+        self._dirty_dates = set()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL模式下写入中途崩溃不会损坏已有数据，读取也不会被写入阻塞
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                date TEXT NOT NULL,
+                suburb TEXT NOT NULL,
+                property_type TEXT NOT NULL,
+                median_value REAL,
+                five_year_change REAL,
+                weekly_rent REAL,
+                rental_yield REAL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_results_key ON results (date, suburb, property_type);
+            CREATE INDEX IF NOT EXISTS idx_results_suburb ON results (suburb, date);
+        """)
+        import timeseries
+        timeseries.ensure_schema(self._conn)
+        # 启用时间序列汇总之前已有的数据库：第一次打开时全量生成一次
+        if (self._conn.execute("SELECT 1 FROM trends LIMIT 1").fetchone() is None
+                and self._conn.execute("SELECT 1 FROM results LIMIT 1").fetchone() is not None):
+            self.rebuild_trends()
+
+    def has(self, date, suburb):
+        """(日期, 郊区) 是否已经存在，包括还没写入的缓冲数据"""
+        if (date, suburb) in self._pending_keys:
+            return True
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM results WHERE date = ? AND suburb = ? LIMIT 1", (date, suburb)).fetchone()
+        return row is not None
+
+    def upsert_many(self, records):
+        """在一个事务里写入多条郊区数据，已存在的 (日期, 郊区, 类型) 会被更新"""
+        import timeseries
+
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = [row + (now,) for data in records for row in record_rows(data)]
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO results (date, suburb, property_type, median_value, five_year_change,
+                                     weekly_rent, rental_yield, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (date, suburb, property_type) DO UPDATE SET
+                    median_value = excluded.median_value,
+                    five_year_change = excluded.five_year_change,
+                    weekly_rent = excluded.weekly_rent,
+                    rental_yield = excluded.rental_yield,
+                    updated_at = excluded.updated_at
+            """, rows)
+            self._dirty_dates |= timeseries.apply_rows(self._conn, [row[:3] for row in rows])
+            self.written += len(rows)
+        return len(rows)
+
+    @property
+    def pending(self):
+        """缓冲区中还没写入的郊区数量"""
+        return len(self._pending)
+
+    def add(self, data):
+        """缓冲一条郊区数据，攒够 batch_size 条后批量写入"""
+        self._pending.append(data)
+        self._pending_keys.add((data['date'], data['suburb']))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return 0
+        written = self.upsert_many(self._pending)
+        self._pending = []
+        self._pending_keys = set()
+        return written
+
+    def suburb_counts_by_date(self):
+        """每个日期已有多少个郊区的数据"""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT date, COUNT(DISTINCT suburb) FROM results GROUP BY date ORDER BY date").fetchall())
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def rows(self, date=None, suburb=None):
+        """按日期、郊区、类型顺序逐行读取；使用独立的只读连接，不阻塞写入
+
+        date 只返回该日期的数据，suburb 按名称模糊匹配（不区分大小写）。
+        """
+        conditions, params = [], []
+        if date:
+            conditions.append("date = ?")
+            params.append(date)
+        if suburb:
+            conditions.append("suburb LIKE ?")
+            params.append(f"%{suburb}%")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(f"""
+                SELECT date, suburb, property_type, median_value, five_year_change, weekly_rent, rental_yield
+                FROM results {where} ORDER BY date, suburb, property_type
+            """, params)
+            while True:
+                chunk = cursor.fetchmany(1000)
+                if not chunk:
+                    break
+                yield from chunk
+        finally:
+            conn.close()
+
+    def import_markdown(self, filename):
+        """从旧的 suburb_analysis.md 导入历史数据，返回导入的行数"""
+        if not os.path.exists(filename):
+            return 0
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = []
+        with open(filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = [part.strip() for part in line.split('|')[1:-1]]
+                if len(parts) < 7 or parts[2] not in PROPERTY_TYPES:
+                    continue
+                date, suburb, property_type, value, change, rent, rental_yield = parts[:7]
+                try:
+                    rows.append((date, suburb, property_type, _parse_money(value), _parse_percent(change),
+                                 _parse_money(rent), _parse_percent(rental_yield), now))
+                except ValueError:
+                    print(f"跳过无法解析的行: {line.strip()}")
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT OR IGNORE INTO results (date, suburb, property_type, median_value, five_year_change,
+                                               weekly_rent, rental_yield, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+        if rows:
+            self.rebuild_trends()
+        return len(rows)
+
+    def rebuild_trends(self):
+        """由 results 全量重建时间序列汇总，返回行数"""
+        import timeseries
+
+        with self._lock, self._conn:
+            return timeseries.rebuild(self._conn)
+
+    def refresh_trend_ranks(self):
+        """重算本次写入涉及的快照日期的同比排名和排名变化"""
+        import timeseries
+
+        if not self._dirty_dates:
+            return
+        # 在锁内取走待重算的日期，其他线程同时写入的新日期留到下一次
+        with self._lock, self._conn:
+            dates, self._dirty_dates = self._dirty_dates, set()
+            timeseries.refresh_ranks(self._conn, dates)
+
+    def render_markdown(self, filename='suburb_analysis.md'):
+        """把全部数据渲染成Markdown表格，先写临时文件再替换，中途失败不会破坏旧文件"""
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            f.write("# 墨尔本房产市场分析报告\n\n")
+            f.write(f"数据更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+            f.write(MARKDOWN_HEADER)
+            for row in self.rows():
+                f.write(markdown_row(row))
+        os.replace(tmp_filename, filename)
+
+    def render_json(self, filename='suburb_latest.json'):
+        """每个郊区最新一期的数据写成JSON列表（供前端直接读取），同样先写临时文件再替换"""
+        latest = {}
+        for date, suburb, property_type, value, change, rent, rental_yield in self.rows():
+            # 按日期升序读取，较新的一期覆盖较旧的
+            entry = latest.get(suburb)
+            if entry is None or entry['date'] != date:
+                entry = latest[suburb] = {'suburb': suburb, 'date': date}
+            entry[property_type] = {'median_value': value, 'five_year_change': change, 'weekly_rent': rent,
+                                    'rental_yield': rental_yield}
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump([latest[suburb] for suburb in sorted(latest)], f, ensure_ascii=False, indent=2)
+        os.replace(tmp_filename, filename)
+
+    def close(self):
+        self.flush()
+        self.refresh_trend_ranks()
+        with self._lock:
+            self._conn.close()
+
+
+def open_store(path=DEFAULT_DB, markdown_file='suburb_analysis.md'):
+    """打开结果库；第一次使用时自动导入旧的Markdown数据"""
+    store = ResultStore(path)
+    if store.count() == 0 and os.path.exists(markdown_file):
+        imported = store.import_markdown(markdown_file)
+        print(f"从 {markdown_file} 导入了 {imported} 行历史数据")
+    return store
+
+
+def merge_stores(target, sources, markdown_file=None):
+    """把各分片的结果库合并到 target，同一行以较新的 updated_at 为准；返回合并的行数"""
+    store = ResultStore(target)
+    merged = 0
+    try:
+        for source in sources:
+            with store._lock, store._conn:
+                store._conn.execute("ATTACH DATABASE ? AS shard", (source,))
+                try:
+                    cursor = store._conn.execute("""
+                        INSERT INTO results (date, suburb, property_type, median_value, five_year_change,
+                                             weekly_rent, rental_yield, updated_at)
+                        SELECT date, suburb, property_type, median_value, five_year_change,
+                               weekly_rent, rental_yield, updated_at
+                        FROM shard.results WHERE true
+                        ON CONFLICT (date, suburb, property_type) DO UPDATE SET
+                            median_value = excluded.median_value,
+                            five_year_change = excluded.five_year_change,
+                            weekly_rent = excluded.weekly_rent,
+                            rental_yield = excluded.rental_yield,
+                            updated_at = excluded.updated_at
+                        WHERE excluded.updated_at > results.updated_at
+                    """)
+                    merged += cursor.rowcount
+                finally:
+                    store._conn.commit()
+                    store._conn.execute("DETACH DATABASE shard")
+        if merged:
+            store.rebuild_trends()
+    finally:
+        store.close()
+    if markdown_file:
+        store.render_markdown(markdown_file)
+    return merged
@@ -0,0 +1,253 @@
+"""成交历史：分块读取大型CSV/JSON成交记录，整理成按 (郊区, 日期) 排序的列式数组，
+用二分查找和累计和一次算出所有郊区的多时间窗口均价和涨幅
+
+用法: python sales_history.py sales.csv [more.jsonl ...] --by-type --output sales_stats.csv
+"""
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+
+# 各种数据源中常见的列名 -> 标准列名
+COLUMN_ALIASES = {
+    'date': 'date', 'sold_date': 'date', 'sale_date': 'date', 'contract_date': 'date', 'settlement_date': 'date',
+    'price': 'price', 'sold_price': 'price', 'sale_price': 'price', 'purchase_price': 'price',
+    'suburb': 'suburb', 'locality': 'suburb', 'suburb_name': 'suburb',
+    'type': 'type', 'property_type': 'type', 'dwelling_type': 'type',
+}
+
+# (名称, 天数)；均价为窗口 [截止时间-天数, 截止时间] 内所有成交的平均价格
+WINDOWS = [('1y', 365), ('5y', 365 * 5), ('10y', 365 * 10)]
+CURRENT_WINDOW_DAYS = 30
+ALL_SUBURBS = '全部'
+
+# 组编码和日期合成一个整数键：日期加偏移后非负，1970年以前的成交也不会与上一组重叠
+_DAY_OFFSET = 1 << 19
+_GROUP_STRIDE = 1 << 20
+
+
+def _normalize_columns(chunk):
+    renamed = {}
+    for column in chunk.columns:
+        key = str(column).strip().lower().replace(' ', '_')
+        if key in COLUMN_ALIASES and COLUMN_ALIASES[key] not in renamed.values():
+            renamed[column] = COLUMN_ALIASES[key]
+    chunk = chunk.rename(columns=renamed)
+    missing = {'date', 'price'} - set(chunk.columns)
+    if missing:
+        raise ValueError(f"成交记录缺少必需的列: {', '.join(sorted(missing))}")
+    return chunk
+
+
+def _iter_chunks(path, chunksize):
+    """按块读取成交记录：CSV（可为.gz）和 JSON Lines 流式读取，普通JSON数组只能整体读取"""
+    import pandas as pd
+
+    lower = path.lower()
+    if lower.endswith(('.jsonl', '.jsonl.gz', '.ndjson')):
+        yield from pd.read_json(path, lines=True, chunksize=chunksize)
+    elif lower.endswith(('.json', '.json.gz')):
+        frame = pd.read_json(path)
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start:start + chunksize]
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False)
+
+
+def _parse_prices(column):
+    """价格转为数值；只对直接转换失败的值去掉 $ 和千分位逗号后再试一次"""
+    import pandas as pd
+
+    prices = pd.to_numeric(column, errors='coerce')
+    retry = prices.isna() & column.notna()
+    if column.dtype == object and retry.any():
+        cleaned = column[retry].astype(str).str.replace(r'[$,\s]', '', regex=True)
+        prices[retry] = pd.to_numeric(cleaned, errors='coerce')
+    return prices
+
+
+class _Vocabulary:
+    """把郊区名/房产类型映射为连续的整数编码，跨块保持一致"""
+
+    def __init__(self):
+        self.names = []
+        self.codes = {}
+
+    def encode(self, values):
+        import pandas as pd
+
+        # 每块只对不同的取值做清理和字典查找；缺失值（编码-1）映射到末尾的空字符串
+        categorical = pd.Categorical(values)
+        names = [str(name).strip() for name in categorical.categories]
+        if (categorical.codes < 0).any():
+            names.append('')
+        mapping = np.array([self.codes.setdefault(name, len(self.codes)) for name in names], dtype=np.int32)
+        self.names = list(self.codes)
+        return mapping[categorical.codes]
+
+
+class SalesHistory:
+    """列式成交记录：days（自1970-01-01的天数）、prices、suburb_codes、type_codes，按 (郊区, 日期) 排序"""
+
+    def __init__(self, days, prices, suburb_codes, type_codes, suburbs, types):
+        order = np.lexsort((days, suburb_codes))
+        self.days = days[order]
+        self.prices = prices[order]
+        self.suburb_codes = suburb_codes[order]
+        self.type_codes = type_codes[order]
+        self.suburbs = suburbs
+        self.types = types
+        self._grouped = {}
+
+    def __len__(self):
+        return len(self.prices)
+
+    @classmethod
+    def from_chunks(cls, chunks, dayfirst=False):
+        """由 DataFrame 块构建；每块只保留四列定长数组，原始文本用完即释放
+
+        dayfirst 为True时按 日/月/年 解析日期（澳洲常见格式）。
+        """
+        import pandas as pd
+
+        suburb_vocab, type_vocab = _Vocabulary(), _Vocabulary()
+        parts = {'days': [], 'prices': [], 'suburbs': [], 'types': []}
+        for chunk in chunks:
+            chunk = _normalize_columns(chunk)
+            dates = pd.to_datetime(chunk['date'], errors='coerce', dayfirst=dayfirst)
+            prices = _parse_prices(chunk['price'])
+            valid = (dates.notna() & prices.notna()).to_numpy()
+            if not valid.any():
+                continue
+            parts['days'].append(dates.to_numpy()[valid].astype('datetime64[D]').astype(np.int32))
+            parts['prices'].append(prices.to_numpy(dtype=np.float64)[valid])
+            suburbs = chunk['suburb'] if 'suburb' in chunk.columns else pd.Series(ALL_SUBURBS, index=chunk.index)
+            parts['suburbs'].append(suburb_vocab.encode(suburbs.to_numpy()[valid]))
+            types = chunk['type'] if 'type' in chunk.columns else pd.Series('', index=chunk.index)
+            parts['types'].append(type_vocab.encode(types.to_numpy()[valid]))
+
+        def concat(arrays, dtype):
+            return np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+
+        return cls(concat(parts['days'], np.int32), concat(parts['prices'], np.float64),
+                   concat(parts['suburbs'], np.int32), concat(parts['types'], np.int32),
+                   suburb_vocab.names, type_vocab.names)
+
+    @classmethod
+    def from_files(cls, paths, chunksize=500_000, dayfirst=False):
+        return cls.from_chunks((chunk for path in paths for chunk in _iter_chunks(path, chunksize)), dayfirst)
+
+    @classmethod
+    def from_frame(cls, df, chunksize=500_000):
+        return cls.from_chunks(df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+
+    def _groups(self, by_type):
+        """各组编码、合成键、组内按日期排序后的 days，以及价格的前缀和；结果会被缓存"""
+        if by_type not in self._grouped:
+            if by_type:
+                groups = self.suburb_codes.astype(np.int64) * len(self.types) + self.type_codes
+                order = np.lexsort((self.days, groups))
+                groups, days, prices = groups[order], self.days[order], self.prices[order]
+            else:
+                groups, days, prices = self.suburb_codes.astype(np.int64), self.days, self.prices
+            # 组编码和日期合成一个单调递增的键，所有组的区间边界可以一次 searchsorted 得到
+            keys = groups * _GROUP_STRIDE + days.astype(np.int64) + _DAY_OFFSET
+            prefix = np.concatenate([[0.0], np.cumsum(prices)])
+            self._grouped[by_type] = (np.unique(groups), keys, days, prefix)
+        return self._grouped[by_type]
+
+    def _group_labels(self, unique_groups, by_type):
+        if by_type:
+            width = len(self.types)
+            return [self.suburbs[g // width] for g in unique_groups], [self.types[g % width] for g in unique_groups]
+        return [self.suburbs[g] for g in unique_groups], None
+
+    def window_stats(self, end_date=None, windows=WINDOWS, by_type=False,
+                     current_days=CURRENT_WINDOW_DAYS):
+        """所有郊区（by_type 时为郊区×类型）在各时间窗口的成交数、均价、窗口内最早成交日期和涨幅
+
+        涨幅 = (最近 current_days 天的均价 - 窗口均价) / 窗口均价 * 100。end_date 可以是日期或时间，
+        默认为当前时间；与 analyze_prices 原来用 datetime 比较的边界相同：成交日期按当天0点计，
+        截止时间不是0点时，正好 天数 天前的那一天不在窗口内。唯一的区别是最近 current_days 天
+        也以截止时间为上限，晚于截止时间的成交不计入（原来的当前均价不设上限）。
+        """
+        import pandas as pd
+
+        end = end_date or datetime.now()
+        end_day = int(np.datetime64(end, 'D').astype(np.int64))
+        after_midnight = int(isinstance(end, datetime) and end != datetime(end.year, end.month, end.day))
+        unique_groups, keys, days, prefix = self._groups(by_type)
+        suburbs, types = self._group_labels(unique_groups, by_type)
+        columns = {'suburb': suburbs}
+        if by_type:
+            columns['type'] = types
+        base = unique_groups * _GROUP_STRIDE + _DAY_OFFSET
+        hi = np.searchsorted(keys, base + end_day, side='right')
+
+        def window(days_back):
+            lo = np.searchsorted(keys, base + end_day - days_back + after_midnight, side='left')
+            count = hi - lo
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(count > 0, (prefix[hi] - prefix[lo]) / np.maximum(count, 1), np.nan)
+            # 组内按日期排序，区间第一条就是窗口内最早的成交
+            first = days[np.minimum(lo, len(days) - 1)] if len(days) else np.zeros(len(lo), dtype=np.int32)
+            first_date = pd.to_datetime(first.astype('datetime64[D]')).where(count > 0)
+            return count, mean, first_date
+
+        current_count, current_avg, _ = window(current_days)
+        columns['current_count'] = current_count
+        columns['current_avg'] = current_avg
+        for name, days_back in windows:
+            count, mean, first_date = window(days_back)
+            columns[f'count_{name}'] = count
+            columns[f'avg_{name}'] = mean
+            columns[f'since_{name}'] = first_date
+            with np.errstate(invalid='ignore', divide='ignore'):
+                columns[f'growth_{name}'] = (current_avg - mean) / mean * 100
+        return pd.DataFrame(columns)
+
+    def type_summary(self):
+        """各房产类型的成交数和平均价格（全部郊区、全部时间）"""
+        import pandas as pd
+
+        counts = np.bincount(self.type_codes, minlength=len(self.types))
+        sums = np.bincount(self.type_codes, weights=self.prices, minlength=len(self.types))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.round(sums / counts, 2)
+        return pd.DataFrame({'mean': means, 'count': counts}, index=pd.Index(self.types, name='type'))
+
+    def date_range(self):
+        if not len(self):
+            return None, None
+        return (np.datetime64(int(self.days.min()), 'D'), np.datetime64(int(self.days.max()), 'D'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分块读取成交历史并计算各郊区的多时间窗口均价和涨幅')
+    parser.add_argument('paths', nargs='+', help='CSV（可为.gz）、JSON Lines 或 JSON 文件')
+    parser.add_argument('--end-date', help='截止日期（YYYY-MM-DD），默认今天')
+    parser.add_argument('--by-type', action='store_true', help='按郊区和房产类型分别统计')
+    parser.add_argument('--dayfirst', action='store_true', help='日期为 日/月/年 格式')
+    parser.add_argument('--chunksize', type=int, default=500_000, help='每块读取的行数')
+    parser.add_argument('--output', default='sales_stats.csv', help='统计结果CSV')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    history = SalesHistory.from_files(args.paths, chunksize=args.chunksize, dayfirst=args.dayfirst)
+    loaded = time.perf_counter()
+    first, last = history.date_range()
+    print(f"读取了 {len(history):,} 条成交记录（{len(history.suburbs)} 个郊区，{first} 至 {last}），"
+          f"耗时 {loaded - start:.2f}s")
+
+    end_date = datetime.strptime(args.end_date, '%Y-%m-%d').date() if args.end_date else None
+    stats = history.window_stats(end_date, by_type=args.by_type)
+    stats.to_csv(args.output, index=False, encoding='utf-8-sig')
+    print(f"统计了 {len(stats)} 组，耗时 {time.perf_counter() - loaded:.2f}s，结果已保存到 {args.output}")
+    if history.types != ['']:
+        print("\n各类型房产的平均价格:")
+        print(history.type_summary())
+
+
+if __name__ == "__main__":
+    main()
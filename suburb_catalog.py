@@ -0,0 +1,183 @@
+"""郊区目录：从sitemap或URL模板文件加载全国郊区，确定性地分片给多个进程/机器抓取"""
+import argparse
+import csv
+import gzip
+import os
+import re
+import xml.etree.ElementTree as ET
+import zlib
+
+from suburbs import SUBURBS
+
+URL_TEMPLATE = "https://www.onthehouse.com.au/suburb/{state}/{slug}-{postcode}"
+CATALOG_FIELDS = ['url', 'state', 'slug', 'name', 'postcode']
+STATES = {'act', 'nsw', 'nt', 'qld', 'sa', 'tas', 'vic', 'wa'}
+
+SUBURB_URL_PATTERN = re.compile(r'/suburb/(?P<state>[a-z]+)/(?P<slug>[a-z0-9-]+?)-(?P<postcode>\d{4})/?$')
+
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def parse_suburb_url(url):
+    """解析郊区URL，返回 url/state/slug/name/postcode；不是郊区页面时返回None"""
+    url = url.strip()
+    match = SUBURB_URL_PATTERN.search(url)
+    if not match or match.group('state') not in STATES:
+        return None
+    slug = match.group('slug')
+    return {
+        'url': url.rstrip('/'),
+        'state': match.group('state'),
+        'slug': slug,
+        'name': slug.replace('-', ' ').title(),
+        'postcode': match.group('postcode'),
+    }
+
+
+def _read_text(source):
+    """读取本地文件（支持.gz）或远程URL的内容"""
+    if re.match(r'https?://', source):
+        import requests
+        response = requests.get(source, timeout=30)
+        response.raise_for_status()
+        data = response.content
+    else:
+        with open(source, 'rb') as f:
+            data = f.read()
+    if data[:2] == b'\x1f\x8b':
+        data = gzip.decompress(data)
+    return data
+
+
+def load_sitemap(source):
+    """从sitemap（或sitemap索引）中读取所有郊区页面"""
+    root = ET.fromstring(_read_text(source))
+    namespace = root.tag.split('}')[0] + '}' if root.tag.startswith('{') else ''
+    entries = []
+    if root.tag == f'{namespace}sitemapindex':
+        for loc in root.iter(f'{namespace}loc'):
+            child = loc.text.strip()
+            # 索引里的相对路径以索引文件所在目录为准
+            if not re.match(r'https?://', child) and not os.path.isabs(child) and not re.match(r'https?://', source):
+                child = os.path.join(os.path.dirname(source), child)
+            entries.extend(load_sitemap(child))
+        return entries
+    for loc in root.iter(f'{namespace}loc'):
+        entry = parse_suburb_url(loc.text or '')
+        if entry:
+            entries.append(entry)
+    return entries
+
+
+def load_template_file(path, template=URL_TEMPLATE):
+    """读取郊区列表文件：每行是完整URL，或 "州,郊区名,邮编"；#开头的行是注释"""
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if '://' in line:
+                entry = parse_suburb_url(line)
+            else:
+                parts = [part.strip() for part in line.split(',')]
+                entry = None
+                if len(parts) == 3:
+                    state, name, postcode = parts
+                    entry = parse_suburb_url(template.format(state=state.lower(), slug=slugify(name),
+                                                             postcode=postcode))
+            if entry:
+                entries.append(entry)
+            else:
+                print(f"{path} 第 {line_no} 行无法解析: {line}")
+    return entries
+
+
+def dedupe(entries):
+    """按URL去重并排序，保证同样的输入总是得到同样的目录"""
+    return sorted({entry['url']: entry for entry in entries}.values(), key=lambda e: e['url'])
+
+
+def save_catalog(entries, path='suburb_catalog.csv'):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CATALOG_FIELDS)
+        writer.writeheader()
+        writer.writerows(dedupe(entries))
+
+
+def load_catalog(path=None):
+    """读取目录文件；不传路径时使用 suburbs.py 中的默认郊区列表"""
+    if path is None:
+        return dedupe(filter(None, (parse_suburb_url(url) for url in SUBURBS)))
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def parse_shard(text):
+    """解析 "3/16" 形式的分片参数，返回 (index, count)，index 从0开始"""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', text or '')
+    if not match:
+        raise ValueError(f"分片格式应为 index/count，例如 3/16: {text}")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"分片编号必须在 0 到 {count - 1} 之间: {text}")
+    return index, count
+
+
+def shard_of(url, count):
+    """URL所属的分片；只取决于URL本身，目录增删郊区不会让其他郊区换分片"""
+    return zlib.crc32(url.encode('utf-8')) % count
+
+
+def select_shard(entries, index, count):
+    return [entry for entry in entries if shard_of(entry['url'], count) == index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='郊区目录管理')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='从sitemap或郊区列表文件生成目录')
+    build.add_argument('--sitemap', action='append', default=[], help='sitemap文件或URL，可重复')
+    build.add_argument('--template-file', action='append', default=[], help='郊区列表文件，可重复')
+    build.add_argument('--output', default='suburb_catalog.csv')
+
+    shards = subparsers.add_parser('shards', help='查看目录分片后每片的郊区数量')
+    shards.add_argument('--catalog', default='suburb_catalog.csv')
+    shards.add_argument('--count', type=int, required=True)
+
+    merge = subparsers.add_parser('merge', help='合并各分片的结果数据库')
+    merge.add_argument('target', help='合并后的数据库')
+    merge.add_argument('sources', nargs='+', help='各分片的数据库')
+    merge.add_argument('--output', default='suburb_analysis.md', help='合并后生成的Markdown表格')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        entries = []
+        for source in args.sitemap:
+            entries.extend(load_sitemap(source))
+        for source in args.template_file:
+            entries.extend(load_template_file(source))
+        if not args.sitemap and not args.template_file:
+            entries = load_catalog()
+        entries = dedupe(entries)
+        save_catalog(entries, args.output)
+        by_state = {}
+        for entry in entries:
+            by_state[entry['state']] = by_state.get(entry['state'], 0) + 1
+        print(f"目录已保存到 {args.output}，共 {len(entries)} 个郊区: {by_state}")
+    elif args.command == 'shards':
+        entries = load_catalog(args.catalog)
+        for index in range(args.count):
+            print(f"分片 {index}/{args.count}: {len(select_shard(entries, index, args.count))} 个郊区")
+    elif args.command == 'merge':
+        from result_store import merge_stores
+        merged = merge_stores(args.target, args.sources, markdown_file=args.output)
+        print(f"合并了 {merged} 行数据到 {args.target}，表格已生成到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
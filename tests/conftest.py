@@ -0,0 +1,22 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 各模块都在仓库根目录下，与 benchmarks/ 中的脚本一样把根目录加入导入路径；
+# benchmarks/ 也加入，测试可以直接使用语料页面和本地替身服务器
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+@pytest.fixture(scope='session')
+def scraper():
+    """main-multi_suburb_scraper.py（文件名带连字符，不能直接import）"""
+    spec = importlib.util.spec_from_file_location('multi_suburb_scraper',
+                                                  os.path.join(ROOT, 'main-multi_suburb_scraper.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
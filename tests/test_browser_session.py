@@ -0,0 +1,133 @@
+"""browser_session：缓存的chromedriver路径、常驻浏览器地址的选择和进程树内存（不启动Chrome、不访问网络）"""
+import json
+import os
+import subprocess
+import sys
+import time
+import types
+
+import pytest
+
+import browser_session
+from browser_session import driver_rss, process_tree_rss, resolve_chromedriver, warm_browser_address
+
+
+class FakeManager:
+    """代替 webdriver_manager 的 ChromeDriverManager，记录被调用的次数"""
+    installs = 0
+    path = None
+
+    def install(self):
+        FakeManager.installs += 1
+        if FakeManager.path is None:
+            raise ConnectionError('offline')
+        open(FakeManager.path, 'w').close()
+        return FakeManager.path
+
+
+@pytest.fixture
+def manager(monkeypatch, tmp_path):
+    FakeManager.installs = 0
+    FakeManager.path = str(tmp_path / 'resolved-chromedriver')
+    monkeypatch.setitem(sys.modules, 'webdriver_manager.chrome', types.SimpleNamespace(ChromeDriverManager=FakeManager))
+    monkeypatch.setattr(browser_session, 'find_chrome_binary', lambda: None)
+    return FakeManager
+
+
+def write_cache(path, driver, resolved_at):
+    driver.write_text('')
+    path.write_text(json.dumps({'path': str(driver), 'browser_mtime': None, 'resolved_at': resolved_at}))
+
+
+def test_fresh_cache_skips_resolution(manager, tmp_path):
+    cache_file, driver = tmp_path / 'chromedriver.json', tmp_path / 'cached-chromedriver'
+    write_cache(cache_file, driver, time.time())
+    assert resolve_chromedriver(str(cache_file)) == str(driver)
+    assert manager.installs == 0
+
+
+def test_stale_cache_is_resolved_again_and_rewritten(manager, tmp_path):
+    cache_file, driver = tmp_path / 'chromedriver.json', tmp_path / 'cached-chromedriver'
+    write_cache(cache_file, driver, time.time() - 31 * 86400)
+    assert resolve_chromedriver(str(cache_file)) == manager.path
+    assert manager.installs == 1
+    assert json.loads(cache_file.read_text())['path'] == manager.path
+    # 新写入的缓存在下一次启动时直接使用
+    assert resolve_chromedriver(str(cache_file)) == manager.path
+    assert manager.installs == 1
+
+
+def test_offline_resolution_falls_back_to_the_old_cache(manager, tmp_path):
+    manager.path = None
+    cache_file, driver = tmp_path / 'chromedriver.json', tmp_path / 'cached-chromedriver'
+    write_cache(cache_file, driver, time.time() - 31 * 86400)
+    assert resolve_chromedriver(str(cache_file)) == str(driver)
+    assert manager.installs == 1
+
+
+@pytest.fixture
+def debuggers(monkeypatch):
+    """假装在这些地址上有可以连接的Chrome，并记录启动常驻Chrome的请求"""
+    alive, launched = set(), []
+    monkeypatch.setattr(browser_session, 'debugger_alive', lambda address, timeout=0.5: address in alive)
+    monkeypatch.setattr(browser_session, 'launch_persistent_chrome',
+                        lambda port, **options: launched.append((port, options)) or f'127.0.0.1:{port}')
+    return alive, launched
+
+
+def test_warm_browser_address(debuggers):
+    alive, launched = debuggers
+    alive.add('10.0.0.5:9222')
+    assert warm_browser_address(attach='10.0.0.5:9222') == '10.0.0.5:9222'
+    # 指定的地址连不上时按原方式启动新浏览器，不会改为启动常驻Chrome
+    assert warm_browser_address(attach='10.0.0.6:9222', keep_browser=True) is None
+    assert warm_browser_address() is None
+    alive.add('127.0.0.1:9222')
+    assert warm_browser_address(keep_browser=True) == '127.0.0.1:9222'
+    assert launched == []
+    assert warm_browser_address(keep_browser=True, port=9333) == '127.0.0.1:9333'
+    assert [port for port, _ in launched] == [9333]
+
+
+def test_warm_browser_defaults_to_the_default_profile(debuggers):
+    _, launched = debuggers
+    # 默认配置与直接启动的浏览器一致：有界面、加载图片
+    warm_browser_address(keep_browser=True, port=9444)
+    [(port, options)] = launched
+    assert port == 9444
+    assert options['headless'] is False
+    assert '--blink-settings=imagesEnabled=false' not in options['extra_args']
+
+
+@pytest.fixture
+def child():
+    # 子进程占用约50MB，进程树的内存应当明显多于父进程本身
+    process = subprocess.Popen([sys.executable, '-c',
+                                'import sys, time; data = bytearray(50 * 1024 * 1024); sys.stdout.write("ready\\n"); '
+                                'sys.stdout.flush(); time.sleep(30)'], stdout=subprocess.PIPE)
+    process.stdout.readline()
+    yield process
+    process.kill()
+    process.wait()
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc'), reason='/proc 回退只在Linux上可用')
+def test_proc_fallback_counts_children(monkeypatch, child):
+    monkeypatch.setitem(sys.modules, 'psutil', None)
+    own = process_tree_rss(child.pid)
+    tree = process_tree_rss(os.getpid())
+    assert own > 40 * 1024 * 1024
+    assert tree >= own
+    assert process_tree_rss(2 ** 22 + 1) is None
+
+
+def test_psutil_counts_children(child):
+    pytest.importorskip('psutil')
+    assert process_tree_rss(os.getpid()) > 40 * 1024 * 1024
+
+
+def test_driver_without_service_process():
+    class Attached:
+        service = None
+
+    assert driver_rss(Attached()) is None
@@ -0,0 +1,54 @@
+"""charts：绘图前的汇总（月度分位数、价格密度网格）与直接用 pandas 计算的结果一致"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from charts import comparison_chart_jobs, monthly_quantiles, price_density, render_chart, suburb_chart_jobs
+from sales_history import SalesHistory
+
+
+@pytest.fixture(scope='module')
+def sales():
+    rng = np.random.default_rng(3)
+    count = 3000
+    return pd.DataFrame({
+        'date': pd.Timestamp('2022-01-01') + pd.to_timedelta(rng.integers(0, 900, count), unit='D'),
+        'price': rng.lognormal(13.5, 0.4, count).round(-3),
+        'suburb': rng.choice(['Box Hill', 'Doncaster', 'Glen Waverley', 'Carlton'], count),
+    })
+
+
+def test_monthly_quantiles_match_pandas(sales):
+    history = SalesHistory.from_frame(sales)
+    quantiles = monthly_quantiles(history)
+    assert len(quantiles) == 4
+    grouped = sales.groupby(['suburb', sales['date'].dt.to_period('M')])['price']
+    for code, (months, counts, p25, p50, p75) in quantiles.items():
+        expected = grouped.quantile([0.25, 0.5, 0.75]).unstack().loc[history.suburbs[code]]
+        assert [str(month) for month in months] == [str(period) for period in expected.index]
+        assert counts.tolist() == grouped.size().loc[history.suburbs[code]].tolist()
+        np.testing.assert_allclose(p25, expected[0.25])
+        np.testing.assert_allclose(p50, expected[0.5])
+        np.testing.assert_allclose(p75, expected[0.75])
+
+
+def test_price_density_counts_every_sale(sales):
+    history = SalesHistory.from_frame(sales)
+    grid, month_edges, price_edges = price_density(history.days, history.prices, bins=20)
+    assert grid.shape == (20, len(month_edges) - 1)
+    # 超出 1%~99% 分位的价格计入两端的区间，总数不变
+    assert grid.sum() == len(sales)
+    assert str(month_edges[0]) == '2022-01'
+    assert price_edges[0] == pytest.approx(np.percentile(sales['price'], 1))
+
+
+def test_chart_jobs(sales, tmp_path):
+    history = SalesHistory.from_frame(sales)
+    jobs = suburb_chart_jobs(history, str(tmp_path), suburbs=['box hill', 'Carlton'])
+    assert sorted(job['path'] for job in jobs) == [str(tmp_path / 'box_hill.png'), str(tmp_path / 'carlton.png')]
+    compare = comparison_chart_jobs(history, [['Box Hill', 'Doncaster', 'Glen Waverley', 'Nowhere']], str(tmp_path),
+                                    size=2)
+    assert [[name for name, *_ in job['series']] for job in compare] == [['Box Hill', 'Doncaster'],
+                                                                         ['Glen Waverley']]
+    render_chart(jobs[0])
+    assert (tmp_path / 'box_hill.png').stat().st_size > 0
@@ -0,0 +1,70 @@
+"""cli：子命令分发，以及不抓取时不加载 selenium、pandas 等重量级依赖"""
+import os
+import subprocess
+import sys
+import types
+
+import pytest
+
+import cli
+from result_store import ResultStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['selenium', 'pandas', 'numpy', 'matplotlib', 'bs4', 'webdriver_manager', 'aiohttp', 'requests']
+
+
+@pytest.mark.parametrize('code', ['import cli; cli.build_parser()', 'import result_store',
+                                  'import cli; cli.load_crawler()', 'import property_analyzer',
+                                  'import house_price_scraper'])
+def test_entry_points_do_not_import_heavy_modules(code):
+    probe = f"import sys\n{code}\nprint(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    output = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == ''
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """把各脚本的 main() 换成记录 sys.argv 的假函数"""
+    calls = []
+
+    def fake_main(name):
+        return lambda: calls.append((name, sys.argv[1:]))
+
+    monkeypatch.setattr(cli, 'load_crawler', lambda: types.SimpleNamespace(main=fake_main('crawler')))
+    monkeypatch.setitem(sys.modules, 'property_analyzer', types.SimpleNamespace(main=fake_main('analyzer')))
+    return calls
+
+
+def test_script_commands_pass_their_arguments_through(calls):
+    argv = sys.argv
+    cli.main(['crawl', '--backend', 'http', '--limit', '5'])
+    cli.main(['replay', '--no-freshness'])
+    cli.main(['analyze', '--top', '10'])
+    assert calls == [('crawler', ['--backend', 'http', '--limit', '5']),
+                     ('crawler', ['--replay', '--no-freshness']),
+                     ('analyzer', ['--top', '10'])]
+    assert sys.argv is argv
+
+
+def test_unknown_arguments_are_rejected(capsys):
+    with pytest.raises(SystemExit):
+        cli.main(['list', '--backend', 'http'])
+
+
+def test_list_reads_the_result_store(tmp_path, capsys):
+    path = str(tmp_path / 'results.db')
+    store = ResultStore(path)
+    store.upsert_many([{'date': '2025.04.30', 'suburb': name, 'house_value': 1_000_000.0, 'house_increase': 5.0,
+                        'house_rent': 700.0} for name in ('Box Hill', 'Glen Waverley')])
+    store.close()
+    cli.main(['list', '--db', path, '--suburb', 'glen'])
+    output = capsys.readouterr().out
+    assert '| 2025.04.30 | Glen Waverley | house | $1,000,000 | 5.0% | $700 | 3.64% |' in output
+    assert 'Box Hill' not in output
+    assert '共 1 行（数据库共 2 行）' in output
+
+
+def test_report_without_a_database(tmp_path, capsys):
+    cli.main(['report', '--db', str(tmp_path / 'missing.db'), '--output', str(tmp_path / 'out.md')])
+    assert '不存在' in capsys.readouterr().out
+    assert not (tmp_path / 'out.md').exists()
@@ -0,0 +1,20 @@
+"""benchmarks/fixtures 中的每个语料页面都解析出预期结果（与基准测试 parse 模式的检查相同）"""
+import pytest
+
+from corpus import check_result, load_corpus, render_page
+from extraction import extract_from_html
+
+CORPUS = load_corpus()
+
+
+@pytest.mark.parametrize('case', sorted(CORPUS))
+def test_fixture_page_matches_expected(case):
+    item = CORPUS[case]
+    assert check_result(case, extract_from_html(item['html'], item['suburb']), item['expected']) == []
+
+
+def test_rendered_page_keeps_the_stats():
+    html = render_page(CORPUS['increase_both']['html'], 'Box Hill', '3128')
+    data = extract_from_html(html, 'Box Hill 3128')
+    assert 'Glen Waverley' not in html
+    assert check_result('increase_both', data, CORPUS['increase_both']['expected']) == []
@@ -0,0 +1,65 @@
+"""crawl_engine：令牌桶、按主机限速的请求间隔和AIMD自适应降速"""
+import asyncio
+import time
+
+import pytest
+
+from crawl_engine import HostRateLimiter, TokenBucket
+
+
+def elapsed(coro):
+    start = time.monotonic()
+    asyncio.run(coro)
+    return time.monotonic() - start
+
+
+def test_token_bucket_spaces_requests_after_burst():
+    bucket = TokenBucket(20, burst=2)
+
+    async def run():
+        for _ in range(6):
+            await bucket.acquire()
+
+    # 前2个请求用掉突发额度，之后每个请求间隔 1/20 秒
+    assert 0.18 <= elapsed(run()) < 0.5
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_host_limiter_keeps_a_bucket_per_host():
+    limiter = HostRateLimiter(10)
+    urls = [f'https://{host}.example/suburb/{i}' for host in ('a', 'b') for i in range(3)]
+
+    async def run():
+        await asyncio.gather(*(limiter.acquire(url) for url in urls))
+
+    # 两个主机各自限速，同时进行：每个主机3个请求需要约0.2秒，而不是6个请求的0.5秒
+    assert 0.18 <= elapsed(run()) < 0.4
+    assert set(limiter.buckets) == {'a.example', 'b.example'}
+    assert limiter.bucket_for('https://a.example/other') is limiter.buckets['a.example']
+
+
+def test_host_limiter_adapts_each_host_separately():
+    limiter = HostRateLimiter(20)
+    blocked, healthy = 'https://a.example/x', 'https://b.example/x'
+    limiter.record(blocked, 'blocked')
+    assert limiter.bucket_for(blocked).rate == pytest.approx(5)
+    assert limiter.bucket_for(healthy).rate == pytest.approx(20)
+
+    async def run():
+        for _ in range(3):
+            await limiter.acquire(blocked)
+
+    # 被封后降到每秒5个请求，后两个请求各等0.2秒
+    assert 0.38 <= elapsed(run()) < 0.7
+    limiter.record(blocked, 'ok')
+    assert limiter.bucket_for(blocked).rate == pytest.approx(5.05)
+
+
+def test_fixed_rate_limiter_ignores_outcomes():
+    limiter = HostRateLimiter(4, adaptive=False)
+    limiter.record('https://a.example/x', 'blocked')
+    assert limiter.bucket_for('https://a.example/x').rate == 4
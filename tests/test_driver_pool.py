@@ -0,0 +1,111 @@
+"""driver_pool.DriverPool 的租用、健康检查、替换和回收（用假的浏览器对象，不需要Chrome）"""
+import threading
+
+from driver_pool import DriverPool
+
+
+class FakeDriver:
+    """hung 为True时 execute_script 一直阻塞，直到 quit()"""
+
+    def __init__(self, hung=False):
+        self.hung = hung
+        self.quit_called = threading.Event()
+
+    def execute_script(self, script):
+        if self.hung:
+            self.quit_called.wait()
+            raise RuntimeError('browser closed')
+        return 1
+
+    def quit(self):
+        self.quit_called.set()
+
+
+def make_pool(drivers, **options):
+    created = iter(drivers)
+    return DriverPool(lambda: next(created), **options)
+
+
+def test_hung_browser_is_replaced():
+    hung, fresh = FakeDriver(hung=True), FakeDriver()
+    pool = make_pool([hung, fresh], size=1, health_timeout=0.2)
+    with pool.lease() as driver:
+        assert driver is hung
+    with pool.lease() as driver:
+        assert driver is fresh
+    assert pool.replaced == 1
+    assert hung.quit_called.wait(1)
+    pool.close()
+
+
+def test_map_runs_every_url_on_at_most_size_browsers():
+    drivers = [FakeDriver() for _ in range(3)]
+    pool = make_pool(drivers, size=2)
+
+    def scrape(url, driver):
+        if url == 'bad':
+            raise ValueError(url)
+        return url, driver
+
+    results = dict(pool.map(['a', 'b', 'bad', 'c', 'd'], scrape))
+    assert results.pop('bad') is None
+    assert {url for url, _ in results.values()} == {'a', 'b', 'c', 'd'}
+    assert {driver for _, driver in results.values()} <= set(drivers[:2])
+    pool.close()
+    assert all(driver.quit_called.is_set() for driver in drivers[:2])
+
+
+def test_check_hook_replaces_rejected_browser():
+    drivers = [FakeDriver() for _ in range(2)]
+    rejected = set()
+    pool = make_pool(drivers, size=1, check=lambda driver: driver not in rejected)
+    with pool.lease() as driver:
+        assert driver is drivers[0]
+    rejected.add(drivers[0])
+    with pool.lease() as driver:
+        assert driver is drivers[1]
+    assert pool.replaced == 1
+    pool.close()
+
+
+def test_browser_recycled_after_max_pages():
+    drivers = [FakeDriver() for _ in range(2)]
+    pool = make_pool(drivers, size=1, max_pages=2)
+    leased = []
+    for _ in range(3):
+        with pool.lease() as driver:
+            leased.append(driver)
+    # 第三次租用时已打开2个页面，回收后换成新的浏览器
+    assert leased == [drivers[0], drivers[0], drivers[1]]
+    assert (pool.recycled, pool.replaced) == (1, 0)
+    assert drivers[0].quit_called.wait(1)
+    pool.close()
+
+
+def test_browser_recycled_over_rss_budget(monkeypatch):
+    import browser_session
+
+    drivers = [FakeDriver() for _ in range(2)]
+    rss = {drivers[0]: 900 * 1024 * 1024, drivers[1]: 300 * 1024 * 1024}
+    monkeypatch.setattr(browser_session, 'driver_rss', rss.get)
+    pool = make_pool(drivers, size=1, max_rss_mb=500)
+    leased = []
+    for _ in range(3):
+        with pool.lease() as driver:
+            leased.append(driver)
+    assert leased == [drivers[0], drivers[1], drivers[1]]
+    assert pool.recycled == 1
+    pool.close()
+
+
+def test_hung_browsers_do_not_starve_later_checks():
+    hung = [FakeDriver(hung=True) for _ in range(3)]
+    healthy = FakeDriver()
+    pool = make_pool([healthy], size=1, health_timeout=0.2)
+    for driver in hung:
+        assert not pool.is_healthy(driver)
+    # 之前卡死的检查不占用后面的检查，健康的浏览器仍然在限定时间内通过
+    assert pool.is_healthy(healthy)
+    for driver in hung:
+        driver.quit()
+    pool.close()
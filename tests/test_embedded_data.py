@@ -0,0 +1,36 @@
+"""embedded_data 从内嵌JSON提取数据、在页面文本中查找 "As at" 日期，以及每条结果记录的数据来源"""
+import json
+
+import pytest
+
+from corpus import load_corpus
+from embedded_data import extract_embedded
+from extraction import _fallback_report_date, extract_from_html
+
+PAYLOAD = {'props': {'house': {'medianValue': 1512000, 'fiveYearGrowth': -4.6},
+                     'unit': {'medianValue': 689500, 'fiveYearGrowth': 2.2}}}
+
+
+def page(as_at):
+    return (f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(PAYLOAD)}</script>'
+            f'<p>As at {as_at}</p>')
+
+
+@pytest.mark.parametrize('as_at, expected', [('30 April 2025', '2025.04.30'), ('5 Sep 2025', '2025.09.05')])
+def test_as_at_date_from_page_text(as_at, expected):
+    record = extract_embedded(page(as_at), 'Glen Waverley')
+    assert record['date'] == expected
+    assert record['house_value'] == 1512000
+    assert record['source'] == 'next_data'
+
+
+def test_unrecognized_as_at_date_falls_back():
+    record = extract_embedded(page('5 Sept 2025'), 'Glen Waverley')
+    assert record['date'] == _fallback_report_date()
+
+
+@pytest.mark.parametrize('case, source', [('next_data_only', 'next_data'), ('initial_state', 'state'),
+                                          ('increase_both', 'text')])
+def test_fixture_pages_record_their_source(case, source):
+    item = load_corpus()[case]
+    assert extract_from_html(item['html'], item['suburb'])['source'] == source
@@ -0,0 +1,32 @@
+"""field_spec 的组合规则扫描和统计卡片读取"""
+from field_spec import SUBURB_STATS, stat_items
+
+TEXT = ("Over the last 5 years the median value of Houses in Glen Waverley have seen a 4.6% decrease "
+        "and Units have seen a 2.2% increase.\n"
+        "The median value for Houses in Glen Waverley is $1,512,000 and Units is $689,500.\n"
+        "As at 30 April 2025")
+
+FRAGMENT = ('<div class="suburb-statistics">'
+            '<div class="stat-item"><div class="label">中位价格</div><div class="value">$1,685,000</div></div>'
+            '<div class="stat-item"><div class="label">Days on market</div><div class="value">28</div></div>'
+            '<div class="stat-item"><div class="label">年度涨幅</div><div class="value">4.2%</div></div>'
+            '<div class="stat-item"><div class="label">Clearance rate</div><div class="value"></div></div>'
+            '</div>')
+
+
+def test_suburb_stats_single_pass():
+    matches = SUBURB_STATS.scan(TEXT)
+    assert matches['house_increase'].value == -4.6
+    assert matches['unit_increase'].value == 2.2
+    assert matches['house_value'].value == 1512000
+    assert matches['date'].value == '2025.04.30'
+    assert SUBURB_STATS.missing(matches) == []
+    assert {found.rule for found in matches.values()} == {'sentence', 'as_at'}
+
+
+def test_missing_required_fields():
+    assert SUBURB_STATS.missing(SUBURB_STATS.scan('no statistics here')) == SUBURB_STATS.required
+
+
+def test_stat_items_keep_every_card():
+    assert list(stat_items(FRAGMENT)) == [('中位价格', '$1,685,000'), ('Days on market', '28'), ('年度涨幅', '4.2%')]
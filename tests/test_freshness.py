@@ -0,0 +1,89 @@
+"""freshness.FreshnessOracle：条件请求头、统计哈希和按学到的更新延迟安排下次检查"""
+from datetime import datetime
+
+import pytest
+
+from freshness import FreshnessOracle
+
+URL = 'https://www.onthehouse.com.au/suburb/vic/glen-waverley-3150'
+DATA = {'date': '2025.04.30', 'house_increase': -4.6, 'unit_increase': 2.2, 'house_value': 1512000.0,
+        'unit_value': 689500.0, 'house_rent': 700.0, 'unit_rent': 540.0}
+
+
+@pytest.fixture
+def oracle(tmp_path):
+    oracle = FreshnessOracle(str(tmp_path / 'freshness.db'), recheck_hours=20, max_skip_days=7)
+    yield oracle
+    oracle.close()
+
+
+def ts(*args):
+    return datetime(*args).timestamp()
+
+
+def test_unknown_url_is_due_and_changed(oracle):
+    assert oracle.due(URL)
+    assert oracle.conditional_headers(URL) == {}
+    assert oracle.observe(URL, validators={'etag': '"a"'}, data=DATA)
+
+
+def test_saved_validators_become_conditional_headers(oracle):
+    oracle.observe(URL, validators={'etag': '"a"', 'last_modified': 'Wed, 30 Apr 2025 00:00:00 GMT'}, data=DATA)
+    oracle.record_saved(URL, DATA['date'])
+    assert oracle.conditional_headers(URL) == {'If-None-Match': '"a"',
+                                               'If-Modified-Since': 'Wed, 30 Apr 2025 00:00:00 GMT'}
+    assert not oracle.observe(URL, not_modified=True)
+
+
+def test_save_without_validators_keeps_the_previous_ones(oracle):
+    oracle.observe(URL, validators={'etag': '"a"', 'last_modified': 'Wed, 30 Apr 2025 00:00:00 GMT'}, data=DATA)
+    oracle.record_saved(URL, DATA['date'])
+    # 下一期的数据由Chrome取得，没有经过 observe
+    oracle.record_saved(URL, '2025.05.31')
+    assert oracle.conditional_headers(URL) == {'If-None-Match': '"a"',
+                                               'If-Modified-Since': 'Wed, 30 Apr 2025 00:00:00 GMT'}
+    assert oracle._state(URL)['report_date'] == '2025.05.31'
+    oracle.observe(URL, validators={'etag': '"b"'}, data=dict(DATA, date='2025.05.31', house_value=1520000.0))
+    oracle.record_saved(URL, '2025.05.31')
+    assert oracle.conditional_headers(URL)['If-None-Match'] == '"b"'
+
+
+def test_same_stats_are_unchanged_and_rescheduled(oracle):
+    now = ts(2025, 5, 12, 9)
+    oracle.observe(URL, data=DATA)
+    oracle.record_saved(URL, DATA['date'], now=now)
+    assert not oracle.due(URL, now=now + 3600)
+    assert oracle.due(URL, now=now + 20 * 3600)
+    assert not oracle.observe(URL, data=dict(DATA))
+    assert oracle.observe(URL, data=dict(DATA, house_value=1520000.0))
+
+
+def test_learned_lag_schedules_the_next_report(oracle):
+    oracle.observe(URL, data=DATA)
+    oracle.record_saved(URL, '2025.04.30', now=ts(2025, 5, 12, 9))
+    # 5月的数据在月末之后10天出现，记入更新延迟；下一期预计在6月30日之后10天
+    oracle.observe(URL, data=dict(DATA, date='2025.05.31'))
+    oracle.record_saved(URL, '2025.05.31', now=ts(2025, 6, 10, 9))
+    assert oracle._state(URL)['lags'] == [10]
+    # 预计的更新时间超过 max_skip_days 时，最多隔7天检查一次
+    assert oracle.next_check_at(URL) == ts(2025, 6, 17, 9)
+    oracle.record_unchanged(URL, now=ts(2025, 7, 5, 9))
+    assert oracle.next_check_at(URL) == ts(2025, 7, 10)
+    # 预计的更新时间已经过了，隔 recheck_hours 再看
+    oracle.record_unchanged(URL, now=ts(2025, 7, 11, 9))
+    assert oracle.next_check_at(URL) == ts(2025, 7, 12, 5)
+
+
+def test_pending_validators_are_bounded(tmp_path):
+    oracle = FreshnessOracle(str(tmp_path / 'freshness.db'), max_observed=3)
+    urls = [f'{URL}-{i}' for i in range(5)]
+    for url in urls:
+        oracle.observe(url, validators={'etag': f'"{url}"'}, data=DATA)
+    # 取不到数据、不会保存的郊区只保留最近的几个
+    assert list(oracle._observed) == urls[2:]
+    oracle.record_saved(urls[4], DATA['date'])
+    assert oracle.conditional_headers(urls[4]) == {'If-None-Match': f'"{urls[4]}"'}
+    # 没有变化的页面不会写入，也不必等待保存
+    assert not oracle.observe(urls[4], data=DATA)
+    assert list(oracle._observed) == urls[2:4]
+    oracle.close()
@@ -0,0 +1,85 @@
+"""metrics：StageTimer 导出的 JSON Lines 和 Prometheus 文本格式"""
+import json
+import re
+
+from metrics import export_run, jsonl_lines, prometheus_text, roll_records
+from pacing import StageTimer
+
+# Prometheus 文本格式的样本行：指标名、可选的标签和数值
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-z_]+="(?:[^"\\]|\\.)*"(,[a-z_]+="(?:[^"\\]|\\.)*")*\})? \S+$')
+
+
+def make_timer():
+    timer = StageTimer()
+    timer.records.extend([
+        ('Box Hill 3128', 'fetch', 0.3, 1_700_000_000.0, True),
+        ('Box Hill 3128', 'extract', 0.004, 1_700_000_000.3, True),
+        ('Glen Waverley 3150', 'fetch', 12.0, 1_700_000_001.0, False),
+    ])
+    timer.count('page_outcomes', backend='http', outcome='ok')
+    timer.count('page_outcomes', 2, backend='http', outcome='blocked')
+    timer.count('fallbacks', suburb='Say "hi"\\')
+    return timer
+
+
+def test_jsonl_has_spans_counters_and_a_run_summary():
+    lines = [json.loads(line) for line in jsonl_lines(make_timer(), 'run-1')]
+    assert [line['type'] for line in lines] == ['span'] * 3 + ['counter'] * 3 + ['run']
+    assert lines[0] == {'type': 'span', 'run_id': 'run-1', 'suburb': 'Box Hill 3128', 'stage': 'fetch',
+                        'start': 1_700_000_000.0, 'duration_s': 0.3, 'ok': True}
+    assert lines[4] == {'type': 'counter', 'run_id': 'run-1', 'name': 'page_outcomes',
+                        'labels': {'backend': 'http', 'outcome': 'blocked'}, 'value': 2}
+    assert lines[-1]['stages']['fetch'] == {'count': 2, 'total': 12.3, 'avg': 6.15}
+
+
+def test_prometheus_text():
+    text = prometheus_text(make_timer())
+    lines = text.splitlines()
+    assert '# TYPE suburb_scraper_stage_seconds histogram' in lines
+    assert 'suburb_scraper_stage_seconds_bucket{stage="fetch",le="0.5"} 1' in lines
+    assert 'suburb_scraper_stage_seconds_bucket{stage="fetch",le="+Inf"} 2' in lines
+    assert 'suburb_scraper_stage_seconds_sum{stage="fetch"} 12.300000' in lines
+    assert 'suburb_scraper_stage_seconds_count{stage="fetch"} 2' in lines
+    assert 'suburb_scraper_stage_failures_total{stage="fetch"} 1' in lines
+    assert 'suburb_scraper_stage_failures_total{stage="extract"} 0' in lines
+    assert 'suburb_scraper_page_outcomes_total{backend="http",outcome="blocked"} 2' in lines
+    assert 'suburb_scraper_fallbacks_total{suburb="Say \\"hi\\"\\\\"} 1' in lines
+    for line in lines:
+        assert line.startswith('# ') or SAMPLE_LINE.match(line), line
+
+
+def test_export_run_writes_both_files(tmp_path):
+    jsonl_path, prom_path = export_run(make_timer(), str(tmp_path / 'metrics'), run_id='run-1')
+    assert jsonl_path == str(tmp_path / 'metrics' / 'run-1.jsonl')
+    assert prom_path == str(tmp_path / 'metrics' / 'suburb_scraper.prom')
+    with open(jsonl_path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 7
+    with open(prom_path, encoding='utf-8') as f:
+        assert f.read().endswith('\n')
+    assert sorted(path.name for path in (tmp_path / 'metrics').iterdir()) == ['run-1.jsonl', 'suburb_scraper.prom']
+
+
+def test_gauges_are_exported():
+    timer = make_timer()
+    timer.gauge('pipeline_queue_max_depth', 3, stage='parse')
+    assert 'suburb_scraper_pipeline_queue_max_depth{stage="parse"} 3' in prometheus_text(timer).splitlines()
+    gauges = [json.loads(line) for line in jsonl_lines(timer, 'run-1') if '"gauge"' in line]
+    assert gauges == [{'type': 'gauge', 'run_id': 'run-1', 'name': 'pipeline_queue_max_depth',
+                       'labels': {'stage': 'parse'}, 'value': 3}]
+
+
+def test_roll_records_without_metrics_dir_still_clears(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    timer = make_timer()
+    assert roll_records(timer) is None
+    assert timer.records == []
+    assert timer.counters[('page_outcomes', (('backend', 'http'), ('outcome', 'blocked')))] == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_roll_records_exports_before_clearing(tmp_path):
+    timer = make_timer()
+    jsonl_path, _ = roll_records(timer, str(tmp_path))
+    with open(jsonl_path, encoding='utf-8') as f:
+        assert sum('"span"' in line for line in f) == 3
+    assert timer.records == []
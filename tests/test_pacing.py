@@ -0,0 +1,49 @@
+"""pacing：AIMD速率控制、共享的请求间隔和 StageTimer 的记录清理"""
+import time
+
+import pytest
+
+from pacing import AdaptiveThrottle, AimdController, StageTimer, is_block_page
+
+
+def test_aimd_backs_off_and_recovers():
+    controller = AimdController(2.0, min_rate=0.1)
+    controller.record('error')
+    assert controller.rate == pytest.approx(1.0)
+    controller.record('blocked')
+    assert controller.rate == pytest.approx(0.25)
+    for _ in range(100):
+        controller.record('ok')
+    assert controller.rate == pytest.approx(2.0)
+    for _ in range(20):
+        controller.record('timeout')
+    assert controller.rate == pytest.approx(0.1)
+    assert controller.outcomes == {'error': 1, 'blocked': 1, 'ok': 100, 'timeout': 20}
+
+
+def test_throttle_spaces_requests_at_the_controlled_rate():
+    throttle = AdaptiveThrottle(rate=20, jitter=0)
+    start = time.monotonic()
+    for _ in range(5):
+        throttle.wait()
+    assert 0.18 <= time.monotonic() - start < 0.4
+    throttle.record('blocked')
+    assert throttle.rate == pytest.approx(5)
+
+
+def test_block_page_detection():
+    assert is_block_page('<h1>Access Denied</h1><p>Too many requests</p>')
+    assert not is_block_page('The median value for Houses in Box Hill is $1,450,000')
+    assert not is_block_page('')
+
+
+def test_clear_records_keeps_counters():
+    timer = StageTimer()
+    with timer.stage('Box Hill', 'fetch'):
+        pass
+    timer.count('page_outcomes', backend='http', outcome='ok')
+    timer.gauge('pipeline_queue_max_depth', 3, stage='parse')
+    timer.clear_records()
+    assert timer.records == []
+    assert timer.counters[('page_outcomes', (('backend', 'http'), ('outcome', 'ok')))] == 1
+    assert timer.gauges[('pipeline_queue_max_depth', (('stage', 'parse'),))] == 3
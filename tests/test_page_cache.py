@@ -0,0 +1,64 @@
+"""page_cache.PageCache 的保存、读取、过期和按大小淘汰，以及 --replay 从缓存重新提取"""
+import os
+import time
+
+from pacing import StageTimer
+from page_cache import PageCache
+
+URL = 'https://www.onthehouse.com.au/suburb/vic/box-hill-3128'
+PAGE = """<html><body>
+<p>There are 9,120 properties in Box Hill. Over the last 5 years the median value of Houses in Box Hill \
+have seen a 12.5% increase and Units have seen a 3.2% increase.</p>
+<p>The median value for Houses in Box Hill is $1,450,000 and Units is $610,000.</p>
+<p>Houses have a median rent of $650 per week and Units have a median rent of $480 per week.</p>
+<span>As at 30 April 2025</span>
+</body></html>"""
+
+
+def test_same_content_is_stored_once(tmp_path):
+    cache = PageCache(str(tmp_path))
+    first = cache.put(URL, PAGE, fetched_at=time.time() - 10)
+    assert cache.put(URL + '-copy', PAGE) == first
+    assert os.listdir(os.path.dirname(cache.path_for(first))) == [os.path.basename(cache.path_for(first))]
+    assert cache.get(URL) == PAGE
+    assert cache.get(URL, max_age=5) is None
+    assert cache.get('https://www.onthehouse.com.au/suburb/vic/unknown-3000') is None
+    cache.close()
+
+
+def test_latest_copy_wins(tmp_path):
+    cache = PageCache(str(tmp_path))
+    now = time.time()
+    cache.put(URL, 'old page', fetched_at=now - 100)
+    cache.put(URL, 'new page', fetched_at=now - 50)
+    assert cache.get(URL) == 'new page'
+    assert [(url, html) for url, _, html in cache.latest()] == [(URL, 'new page')]
+    cache.close()
+
+
+def test_evict_drops_expired_then_oldest_over_budget(tmp_path):
+    cache = PageCache(str(tmp_path), ttl_days=1)
+    now = time.time()
+    cache.put('https://a.example/expired', 'expired page', fetched_at=now - 2 * 86400)
+    cache.put('https://a.example/old', 'old page', fetched_at=now - 300)
+    cache.put('https://a.example/new', 'new page', fetched_at=now - 100)
+    assert cache.evict() == 1
+    cache.max_bytes = cache.total_bytes() - 1
+    assert cache.evict() == 1
+    assert cache.get('https://a.example/old') is None
+    assert cache.get('https://a.example/new') == 'new page'
+    cache.close()
+
+
+def test_replay_extracts_from_cached_pages(tmp_path, scraper):
+    cache = PageCache(str(tmp_path))
+    cache.put(URL, PAGE)
+    results = []
+    missing = 'https://www.onthehouse.com.au/suburb/vic/glen-waverley-3150'
+    scraper.replay_from_cache(cache, [URL, missing], lambda url, data: results.append((url, data)), StageTimer())
+    assert [url for url, _ in results] == [URL]
+    data = results[0][1]
+    assert (data['suburb'], data['date']) == ('Box Hill 3128', '2025.04.30')
+    assert (data['house_increase'], data['unit_increase']) == (12.5, 3.2)
+    assert (data['house_value'], data['unit_value'], data['unit_rent']) == (1450000.0, 610000.0, 480.0)
+    cache.close()
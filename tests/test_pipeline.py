@@ -0,0 +1,171 @@
+"""pipeline.py：阶段的背压、关闭时处理完剩余任务、错误上报、空闲回调，HTTP抓取阶段，以及HTTP页面不完整时转交Chrome"""
+import sys
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from fake_site import start_site
+from pacing import StageTimer
+from pipeline import HttpFetchStage, Pipeline, Stage
+
+
+def counter(timer, name, stage):
+    return timer.counters[(name, (('stage', stage),))]
+
+
+def test_close_drains_remaining_items():
+    timer = StageTimer()
+    done = []
+    stage = Stage('work', lambda item: (time.sleep(0.001), done.append(item)), workers=3, capacity=4, timer=timer)
+    stage.start()
+    for i in range(30):
+        stage.put(i)
+    stage.close()
+    assert sorted(done) == list(range(30))
+    assert counter(timer, 'pipeline_items', 'work') == 30
+
+
+def test_full_queue_blocks_producer():
+    release = threading.Event()
+    stage = Stage('slow', lambda item: release.wait(), workers=1, capacity=2)
+    stage.start()
+    producer = threading.Thread(target=lambda: [stage.put(i) for i in range(4)])
+    producer.start()
+    # 1个在处理中、2个在队列里，第4个放不进去
+    producer.join(0.3)
+    assert producer.is_alive()
+    assert stage.depth() == 2
+    release.set()
+    producer.join(2)
+    stage.close()
+    stats = stage.stats()
+    assert stats['processed'] == 4
+    assert stats['max_depth'] == 2
+    assert stats['blocked_s'] > 0.2
+
+
+def test_handler_errors_are_reported():
+    errors = []
+
+    def handler(item):
+        if item % 2:
+            raise ValueError(item)
+
+    stage = Stage('check', handler, workers=2, on_error=lambda item, e: errors.append((item, str(e))))
+    stage.start()
+    for i in range(6):
+        stage.put(i)
+    stage.close()
+    assert sorted(errors) == [(1, '1'), (3, '3'), (5, '5')]
+    assert stage.stats()['processed'] == 6
+
+
+def test_idle_callback_runs_while_waiting_and_on_close():
+    flushed = []
+    stage = Stage('persist', lambda item: None, on_idle=lambda: flushed.append(time.monotonic()), idle_seconds=0.05)
+    stage.start()
+    stage.put('a')
+    time.sleep(0.2)
+    assert flushed
+    before = len(flushed)
+    stage.close()
+    assert len(flushed) > before
+
+
+def test_pipeline_closes_upstream_first_and_reports_events():
+    pipeline = None
+
+    def parse(item):
+        persist.put(item * 10)
+
+    def save(item):
+        pipeline.emit('completed', item)
+
+    persist = Stage('persist', save)
+    parser = Stage('parse', parse, workers=2, capacity=2)
+    pipeline = Pipeline([parser, persist])
+    pipeline.start()
+    for i in range(10):
+        parser.put(i)
+    pipeline.close()
+    events = pipeline.events(timeout=0.1)
+    assert sorted(url for _, url in events) == [i * 10 for i in range(10)]
+    assert {event for event, _ in events} == {'completed'}
+    assert pipeline.events(timeout=0.01) == []
+
+
+@pytest.fixture
+def fake_site():
+    pytest.importorskip('aiohttp')
+    server, site, base_url = start_site()
+    yield site, base_url
+    server.shutdown()
+
+
+def test_http_fetch_stage_hands_pages_downstream(fake_site):
+    site, base_url = fake_site
+    urls = [f'{base_url}/suburb/vic/suburb{i}-31{i:02d}' for i in range(12)]
+    pages, errors = {}, []
+
+    def handler(url, html, validators):
+        if url == urls[0]:
+            raise RuntimeError('downstream failed')
+        pages[url] = html
+
+    fetcher = HttpFetchStage('fetch', handler, concurrency=4, rate=1000, capacity=4,
+                             on_error=lambda url, e: errors.append(url))
+    fetcher.start()
+    for url in urls:
+        fetcher.put(url)
+    fetcher.close()
+    assert errors == urls[:1]
+    assert sorted(pages) == sorted(urls[1:])
+    assert all(html and '<html' in html for html in pages.values())
+    assert site.statuses == {200: len(urls)}
+    assert fetcher.stats()['processed'] == len(urls)
+
+
+class FakeBrowser:
+    def execute_script(self, script):
+        return 1
+
+    def quit(self):
+        pass
+
+
+def test_incomplete_http_page_falls_back_to_chrome(scraper, monkeypatch, tmp_path):
+    pytest.importorskip('aiohttp')
+    from result_store import ResultStore
+
+    # 只有Units数据的页面HTTP解析不出结果，转交Chrome后由 get_property_data 取得数据
+    server, site, base_url = start_site(case='unit_only')
+    url = f'{base_url}/suburb/vic/box-hill-3128'
+    row = {'date': '2025.04.30', 'suburb': 'Box Hill 3128', 'house_value': 1_300_000.0, 'house_increase': 2.0,
+           'house_rent': 650.0, 'unit_value': 580_000.0, 'unit_increase': -1.0, 'unit_rent': 500.0}
+    browsed = []
+    monkeypatch.setattr(sys, 'argv', ['main-multi_suburb_scraper.py', '--browsers', '1'])
+    monkeypatch.setattr(scraper, 'warm_browser_address', lambda *args: None)
+    monkeypatch.setattr(scraper, 'setup_driver', lambda *args, **kwargs: FakeBrowser())
+    monkeypatch.setattr(scraper, 'get_property_data', lambda url, driver, **kwargs: browsed.append(url) or row)
+    store = ResultStore(str(tmp_path / 'results.db'))
+    timer = StageTimer()
+
+    def handle_result(url, data):
+        store.add(data)
+        return True
+
+    pipeline = scraper.build_pipeline(scraper.parse_args(), store, timer, None, None, handle_result,
+                                      Counter(), None, {})
+    pipeline.start()
+    pipeline.submit(url)
+    pipeline.close()
+    server.shutdown()
+    events = pipeline.events(timeout=0.01)
+    assert ('fallback', url) in events and ('completed', url) in events
+    assert browsed == [url]
+    assert timer.counters[('fallbacks', (('backend', 'chrome'),))] == 1
+    assert [row[1:4] for row in store.rows()] == [('Box Hill 3128', 'house', 1_300_000.0),
+                                                   ('Box Hill 3128', 'unit', 580_000.0)]
+    store.close()
@@ -0,0 +1,36 @@
+"""property_analyzer.PropertyAnalyzer 解析统计区块片段（不启动Chrome）"""
+import pytest
+
+import property_analyzer
+from corpus import load_corpus
+from property_analyzer import PropertyAnalyzer
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setattr(property_analyzer, 'warm_browser_address', lambda *args: None)
+    monkeypatch.setattr(PropertyAnalyzer, 'setup_driver', lambda self: None)
+    analyzer = PropertyAnalyzer()
+    yield analyzer
+    analyzer.close()
+
+
+def saved_fragment(case='increase_both'):
+    """语料页面中的统计区块，与 STATS_FRAGMENT_SCRIPT 在浏览器中取回的 outerHTML 相同"""
+    html = load_corpus()[case]['html']
+    start = html.index('<div class="suburb-statistics">')
+    end = html.index('</div>\n<p class="market-summary">', start) + len('</div>')
+    return html[start:end]
+
+
+def test_parse_saved_stats_fragment(analyzer):
+    stats = analyzer.parse_stats_fragment('Glen Waverley 3150', saved_fragment())
+    assert list(stats.items()) == [('suburb', 'Glen Waverley 3150'), ('中位价格', '$1,685,000'),
+                                   ('年度涨幅', '4.2%'), ('租金回报率', '2.28%')]
+    assert [name for _, name, _, _, _ in analyzer.timer.records] == ['extract']
+    assert analyzer.timer.counters[('field_rule', (('field', '租金回报率'), ('rule', 'stat_item')))] == 1
+
+
+def test_fragment_without_cards(analyzer):
+    assert analyzer.parse_stats_fragment('Glen Waverley 3150', '<div class="suburb-statistics"></div>') == {
+        'suburb': 'Glen Waverley 3150'}
@@ -0,0 +1,73 @@
+"""report_engine：排名与 pandas 按数值降序稳定排序的结果一致，表格和JSON完整输出"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from report_engine import RANKINGS, compute_rankings, page_slice, render_markdown_report, to_numeric, write_json_report
+
+
+def sample_frame(count=300, seed=7):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'suburb': [f'Suburb {i}' for i in range(count)],
+        '中位价格': [f'${value:,}' for value in rng.integers(400, 3000, count) * 1000],
+        # 保留一位小数，制造大量并列值
+        '年度涨幅': [f'{value:.1f}%' for value in rng.normal(3, 2, count)],
+        '租金回报率': [f'{value:.2f}%' for value in rng.uniform(1.5, 5, count)],
+    })
+    frame.loc[::17, '租金回报率'] = 'N/A'
+    frame.loc[::23, '中位价格'] = None
+    return frame
+
+
+def test_rankings_match_pandas_numeric_sort():
+    frame = sample_frame()
+    rankings = compute_rankings(frame)
+    for _, key, _ in RANKINGS:
+        expected = frame.assign(_key=to_numeric(frame[key])).sort_values(
+            '_key', ascending=False, kind='stable', na_position='last').index
+        assert rankings[key].tolist() == expected.tolist()
+
+
+def test_prices_rank_by_value_not_text():
+    frame = pd.DataFrame({'suburb': ['A', 'B', 'C'], '中位价格': ['$950,000', '$1,200,000', 'N/A'],
+                          '年度涨幅': ['9.5%', '10.5%', '-1.0%'], '租金回报率': ['3.1%', None, '2.9%']})
+    rankings = compute_rankings(frame)
+    # 按文本排序时 "$950,000" 会排在 "$1,200,000" 前面
+    assert rankings['中位价格'].tolist() == [1, 0, 2]
+    assert rankings['年度涨幅'].tolist() == [1, 0, 2]
+    assert rankings['租金回报率'].tolist() == [0, 2, 1]
+
+
+def test_page_slice():
+    assert page_slice(100) == (0, 100)
+    assert page_slice(100, top_n=10) == (0, 10)
+    assert page_slice(100, page=3, page_size=20) == (40, 60)
+    assert page_slice(50, page=3, page_size=20) == (40, 50)
+    assert page_slice(100, top_n=30, page=2, page_size=20) == (20, 30)
+
+
+def test_report_tables_follow_the_rankings(tmp_path):
+    frame = sample_frame(count=40)
+    path = tmp_path / 'property_report.md'
+    render_markdown_report(frame, str(path), top_n=10, chunk_size=3)
+    text = path.read_text(encoding='utf-8')
+    rankings = compute_rankings(frame)
+    for title, key, _ in RANKINGS:
+        section = text.split(f'## {title}\n\n')[1].split('\n\n')[0]
+        rows = [line.split(' | ') for line in section.splitlines()[2:]]
+        assert [row[0] for row in rows] == [f'| {rank}' for rank in range(1, 11)]
+        assert [row[1] for row in rows] == frame['suburb'].to_numpy()[rankings[key][:10]].tolist()
+    assert '- 本页显示排名：1-10\n' in text
+
+
+def test_json_report_streams_every_record(tmp_path):
+    frame = sample_frame(count=25)
+    path = tmp_path / 'property_data.json'
+    write_json_report(frame, str(path), chunk_size=4)
+    data = json.loads(path.read_text(encoding='utf-8'))
+    assert data['total_suburbs'] == 25
+    assert data['suburbs_data'] == frame.to_dict('records')
+    write_json_report(frame.iloc[:0], str(path))
+    assert json.loads(path.read_text(encoding='utf-8'))['suburbs_data'] == []
@@ -0,0 +1,84 @@
+"""result_store.ResultStore：按 (日期, 郊区, 类型) 去重的缓冲写入、Markdown表格、写入计数和最新一期的JSON快照"""
+import json
+
+import pytest
+
+from result_store import ResultStore
+
+
+def suburb(name, date, house_value=1_000_000.0, unit_value=600_000.0):
+    return {'date': date, 'suburb': name, 'house_value': house_value, 'house_increase': 5.0,
+            'house_rent': 700.0, 'unit_value': unit_value, 'unit_increase': -1.0, 'unit_rent': None}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.db'), batch_size=3)
+    yield store
+    store.close()
+
+
+def test_rows_are_buffered_until_a_batch_is_full(store):
+    store.add(suburb('Box Hill', '2025.04.30'))
+    store.add(suburb('Glen Waverley', '2025.04.30'))
+    assert store.count() == 0
+    assert store.has('2025.04.30', 'Box Hill')
+    store.add(suburb('Doncaster', '2025.04.30'))
+    assert store.count() == 6
+    assert not store.has('2025.03.31', 'Box Hill')
+
+
+def test_same_period_is_updated_not_duplicated(store):
+    store.upsert_many([suburb('Box Hill', '2025.04.30')])
+    store.upsert_many([suburb('Box Hill', '2025.04.30', house_value=1_100_000.0)])
+    rows = list(store.rows())
+    assert [row[:4] for row in rows] == [('2025.04.30', 'Box Hill', 'house', 1_100_000.0),
+                                         ('2025.04.30', 'Box Hill', 'unit', 600_000.0)]
+    assert rows[0][6] == pytest.approx(700 * 52 / 1_100_000 * 100)
+    assert rows[1][5:] == (None, None)
+
+
+def test_markdown_table_round_trips(store, tmp_path):
+    store.upsert_many([suburb('Box Hill', '2025.04.30'), suburb('Box Hill', '2025.03.31', house_value=990_000.0)])
+    path = str(tmp_path / 'suburb_analysis.md')
+    store.render_markdown(path)
+    with open(path, encoding='utf-8') as f:
+        assert '| 2025.04.30 | Box Hill | house | $1,000,000 | 5.0% | $700 | 3.64% |\n' in f.read()
+    copy = ResultStore(str(tmp_path / 'copy.db'))
+    assert copy.import_markdown(path) == 4
+    assert [row[:6] for row in copy.rows()] == [row[:6] for row in store.rows()]
+    copy.close()
+
+
+def test_buffered_rows_are_counted_once_written(store):
+    store.add(suburb('Box Hill', '2025.04.30'))
+    store.add(suburb('Glen Waverley', '2025.04.30'))
+    assert store.pending == 2
+    assert store.written == 0
+    assert store.has('2025.04.30', 'Box Hill')
+    store.add(suburb('Doncaster', '2025.04.30'))
+    assert store.pending == 0
+    assert store.written == 6
+    # 同一期再次写入时更新已有的行，仍然计入写入数（常驻模式据此重新发布）
+    store.add(suburb('Box Hill', '2025.04.30', house_value=1_100_000.0))
+    assert store.flush() == 2
+    assert store.written == 8
+    assert store.count() == 6
+
+
+def test_render_json_keeps_the_latest_period(store, tmp_path):
+    store.add(suburb('Box Hill', '2025.03.31', house_value=990_000.0))
+    store.add(suburb('Box Hill', '2025.04.30'))
+    store.add(suburb('Glen Waverley', '2025.03.31'))
+    store.flush()
+    store.refresh_trend_ranks()
+    path = tmp_path / 'latest.json'
+    store.render_json(str(path))
+    latest = json.loads(path.read_text(encoding='utf-8'))
+    assert [(entry['suburb'], entry['date']) for entry in latest] == [('Box Hill', '2025.04.30'),
+                                                                       ('Glen Waverley', '2025.03.31')]
+    house = latest[0]['house']
+    assert house['median_value'] == 1_000_000.0
+    assert house['rental_yield'] == pytest.approx(700 * 52 / 1_000_000 * 100)
+    assert latest[0]['unit']['weekly_rent'] is None
+    assert not (tmp_path / 'latest.json.tmp').exists()
@@ -0,0 +1,49 @@
+"""sales_history.SalesHistory.window_stats 与 analyze_prices 原来用 pandas 逐个窗口过滤的结果一致"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_history import WINDOWS, SalesHistory
+
+END = datetime(2026, 10, 18, 14, 30)
+
+
+@pytest.fixture(scope='module')
+def sales():
+    rng = np.random.default_rng(0)
+    days = list(rng.integers(0, 4000, 2000)) + [days_back for _, days_back in WINDOWS] + [30]
+    return pd.DataFrame({'date': pd.to_datetime([(END - timedelta(days=int(d))).date() for d in days]),
+                         'price': rng.integers(500_000, 2_000_000, len(days)).astype(float)})
+
+
+@pytest.mark.parametrize('end', [END, END.replace(hour=0, minute=0)])
+def test_windows_match_datetime_filters(sales, end):
+    stats = SalesHistory.from_frame(sales).window_stats(end).iloc[0]
+    current = sales[sales['date'] >= end - timedelta(days=30)]
+    assert stats['current_count'] == len(current)
+    assert stats['current_avg'] == pytest.approx(current['price'].mean())
+    for name, days_back in WINDOWS:
+        window = sales[(sales['date'] >= end - timedelta(days=days_back)) & (sales['date'] <= end)]
+        assert stats[f'count_{name}'] == len(window)
+        assert stats[f'avg_{name}'] == pytest.approx(window['price'].mean())
+        assert stats[f'since_{name}'] == window['date'].min()
+
+
+def test_groups_by_suburb_and_type():
+    frame = pd.DataFrame({'date': pd.to_datetime(['2026-10-01', '2026-09-01', '2026-10-02']),
+                          'price': [100.0, 200.0, 300.0],
+                          'suburb': ['Box Hill', 'Box Hill', 'Glen Waverley'],
+                          'type': ['house', 'unit', 'house']})
+    stats = SalesHistory.from_frame(frame).window_stats(END, by_type=True)
+    assert list(zip(stats['suburb'], stats['type'], stats['count_1y'])) == [
+        ('Box Hill', 'house', 1), ('Box Hill', 'unit', 1), ('Glen Waverley', 'house', 1)]
+
+
+def test_chunked_csv_matches_the_whole_frame(sales, tmp_path):
+    path = tmp_path / 'sales.csv'
+    sales.assign(date=sales['date'].dt.strftime('%Y-%m-%d'), price=[f'${price:,.0f}' for price in sales['price']]) \
+        .rename(columns={'date': 'Sold Date', 'price': 'sold_price'}).to_csv(path, index=False)
+    chunked = SalesHistory.from_files([str(path)], chunksize=300).window_stats(END)
+    pd.testing.assert_frame_equal(chunked, SalesHistory.from_frame(sales).window_stats(END))
@@ -0,0 +1,66 @@
+"""suburb_catalog：sitemap和郊区列表的加载，以及只取决于URL本身的确定性分片"""
+import gzip
+import random
+
+import pytest
+
+from suburb_catalog import (dedupe, load_catalog, load_sitemap, load_template_file, parse_shard, select_shard,
+                            shard_of)
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def test_shards_partition_the_catalog():
+    entries = load_catalog()
+    shards = [select_shard(entries, index, 4) for index in range(4)]
+    assert sorted(entry['url'] for shard in shards for entry in shard) == [entry['url'] for entry in entries]
+    assert all(shards)
+
+
+def test_shard_depends_only_on_the_url():
+    entries = load_catalog()
+    before = {entry['url']: shard_of(entry['url'], 8) for entry in entries}
+    # 目录增删郊区、顺序变化都不会让其他郊区换分片
+    changed = entries[5:] + [{'url': 'https://www.onthehouse.com.au/suburb/vic/newtown-3220'}]
+    random.Random(1).shuffle(changed)
+    for index in range(8):
+        for entry in select_shard(changed, index, 8):
+            assert before.get(entry['url'], index) == index
+
+
+def test_shard_is_the_same_on_every_machine():
+    # 不能用 hash()：字符串哈希每个进程随机化，不同机器会把同一个郊区分到不同的分片
+    assert shard_of('https://www.onthehouse.com.au/suburb/vic/balwyn-3103', 4) == 0
+    assert shard_of('https://www.onthehouse.com.au/suburb/vic/bayswater-north-3153', 4) == 2
+
+
+@pytest.mark.parametrize('text, expected', [('3/16', (3, 16)), (' 0 / 1 ', (0, 1))])
+def test_parse_shard(text, expected):
+    assert parse_shard(text) == expected
+
+
+@pytest.mark.parametrize('text', ['16/16', '1/0', '3', None])
+def test_parse_shard_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_shard(text)
+
+
+def test_sitemap_index_and_template_file(tmp_path):
+    child = tmp_path / 'suburbs-vic.xml.gz'
+    child.write_bytes(gzip.compress(f"""<?xml version="1.0"?>
+<urlset xmlns="{SITEMAP_NS}">
+  <url><loc>https://www.onthehouse.com.au/suburb/vic/box-hill-3128</loc></url>
+  <url><loc>https://www.onthehouse.com.au/property/vic/box-hill-3128/1-main-st</loc></url>
+  <url><loc>https://www.onthehouse.com.au/suburb/vic/glen-waverley-3150/</loc></url>
+</urlset>""".encode('utf-8')))
+    index = tmp_path / 'sitemap.xml'
+    index.write_text(f'<sitemapindex xmlns="{SITEMAP_NS}"><sitemap><loc>suburbs-vic.xml.gz</loc></sitemap>'
+                     '</sitemapindex>', encoding='utf-8')
+    listing = tmp_path / 'suburbs.txt'
+    listing.write_text('# 新南威尔士\nNSW, Surry Hills, 2010\nhttps://www.onthehouse.com.au/suburb/vic/box-hill-3128\n'
+                       'not a suburb\n', encoding='utf-8')
+
+    entries = dedupe(load_sitemap(str(index)) + load_template_file(str(listing)))
+    assert [(entry['state'], entry['name'], entry['postcode']) for entry in entries] == [
+        ('nsw', 'Surry Hills', '2010'), ('vic', 'Box Hill', '3128'), ('vic', 'Glen Waverley', '3150')]
+    assert entries[2]['url'] == 'https://www.onthehouse.com.au/suburb/vic/glen-waverley-3150'
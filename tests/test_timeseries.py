@@ -0,0 +1,112 @@
+"""timeseries：写入结果库时增量更新的 trends 与由 results 全量重建的结果完全一致（包括排名）"""
+import calendar
+import random
+from collections import defaultdict
+
+import pytest
+
+import timeseries
+from result_store import ResultStore
+from timeseries import TrendQueries
+
+SUBURBS = ['Box Hill', 'Carlton', 'Doncaster', 'Glen Waverley', 'Kew', 'Richmond']
+
+
+def month_ends(count, year=2023, month=1):
+    dates = []
+    for _ in range(count):
+        dates.append(f'{year}.{month:02d}.{calendar.monthrange(year, month)[1]:02d}')
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return dates
+
+
+DATES = month_ends(20)
+
+
+def snapshot(suburb, date, rng):
+    house = rng.randint(800, 2000) * 1000.0
+    return {'date': date, 'suburb': suburb, 'house_value': house, 'house_increase': 5.0,
+            'house_rent': rng.choice([None, rng.randint(400, 900)]),
+            'unit_value': house / 2, 'unit_increase': 1.0, 'unit_rent': rng.randint(300, 600)}
+
+
+def trends(store):
+    return store._conn.execute("SELECT * FROM trends ORDER BY suburb, property_type, date").fetchall()
+
+
+def rebuilt(store):
+    """同一份 results 全量重建后的 trends；在事务中重建后回滚，不改动增量结果"""
+    conn = store._conn
+    conn.execute("SAVEPOINT rebuild")
+    try:
+        timeseries.rebuild(conn)
+        return trends(store)
+    finally:
+        conn.execute("ROLLBACK TO rebuild")
+        conn.execute("RELEASE rebuild")
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = random.Random(5)
+    store = ResultStore(str(tmp_path / 'results.db'))
+    # 按月追加，有的郊区缺少个别月份
+    for date in DATES:
+        store.upsert_many([snapshot(suburb, date, rng) for suburb in SUBURBS if rng.random() > 0.15])
+    store.refresh_trend_ranks()
+    yield store
+    store.close()
+
+
+def test_monthly_appends_match_a_full_rebuild(store):
+    rows = trends(store)
+    assert len(rows) == store.count()
+    assert rows == rebuilt(store)
+    ranked = [row for row in rows if row[9] is not None]
+    assert ranked and all(row[13] is not None for row in ranked)
+    assert any(row[14] not in (None, 0) for row in rows)
+
+
+def test_corrections_and_backfills_match_a_full_rebuild(store):
+    rng = random.Random(11)
+    # 修改较早的一期、补录缺失的月份：其后依赖它们的快照（环比、同比、滑动平均和排名）一并更新
+    store.upsert_many([dict(snapshot('Kew', DATES[3], rng), house_value=5_000_000.0),
+                       snapshot('Carlton', DATES[8], rng), snapshot('Box Hill', DATES[15], rng)])
+    store.refresh_trend_ranks()
+    assert trends(store) == rebuilt(store)
+    kew = {row[2]: row for row in trends(store) if row[0] == 'Kew' and row[1] == 'house'}
+    assert kew[DATES[4]][6] < -50
+    assert kew[DATES[15]][8] == DATES[3]
+
+
+def test_count_ranking_matches_update_from(store, monkeypatch):
+    # 复制一个郊区的全部历史，同比涨幅相同的行排名也相同
+    twin = defaultdict(dict)
+    for date, _, property_type, value, change, rent, _ in store.rows(suburb='Kew'):
+        twin[date].update({f'{property_type}_value': value, f'{property_type}_increase': change,
+                           f'{property_type}_rent': rent})
+    store.upsert_many([dict(fields, date=date, suburb='Kew Twin') for date, fields in twin.items()])
+    store.refresh_trend_ranks()
+    ranks = {(row[0], row[1], row[2]): row[13] for row in trends(store)}
+    assert ranks[('Kew', 'house', DATES[-1])] == ranks[('Kew Twin', 'house', DATES[-1])] is not None
+    # SQLite 3.33 之前没有 UPDATE ... FROM，改用相关子查询计数
+    monkeypatch.setattr(timeseries, 'UPDATE_FROM', False)
+    assert trends(store) == rebuilt(store)
+
+
+def test_queries(store, tmp_path):
+    queries = TrendQueries(str(tmp_path / 'results.db'))
+    try:
+        assert queries.dates() == sorted({row[2] for row in trends(store)})
+        assert queries.latest_date() == DATES[-1]
+        movers = queries.movers('yoy_change', 'house', limit=3)
+        changes = [row['yoy_change'] for row in movers]
+        assert changes == sorted(changes, reverse=True) and len(movers) <= 3
+        assert [row['yoy_rank'] for row in movers] == list(range(1, len(movers) + 1))
+        series = queries.series('Kew', 'unit', limit=4)
+        assert [row['date'] for row in series] == sorted(row['date'] for row in series)
+        assert len(series) == 4 and series[-1]['date'] <= DATES[-1]
+        with pytest.raises(ValueError):
+            queries.movers('price')
+    finally:
+        queries.close()
@@ -0,0 +1,93 @@
+"""work_queue.WorkQueue 的状态转换：领取、完成、推迟、失败退避和租约过期"""
+import time
+
+import pytest
+
+from work_queue import DONE, FAILED, LEASED, PENDING, WorkQueue
+
+BATCH = '2025-10'
+URLS = ['https://example.com/a', 'https://example.com/b']
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.db'), max_attempts=3, base_backoff=0)
+    queue.enqueue(BATCH, URLS)
+    yield queue
+    queue.close()
+
+
+def row(queue, url):
+    return queue._conn.execute("SELECT status, attempts FROM work_items WHERE batch = ? AND url = ?",
+                               (BATCH, url)).fetchone()
+
+
+def test_enqueue_keeps_existing_items(queue):
+    queue.complete(BATCH, URLS[:1])
+    assert queue.enqueue(BATCH, URLS + ['https://example.com/c']) == 1
+    assert queue.stats(BATCH) == {DONE: 1, PENDING: 2}
+
+
+def test_claim_leases_each_url_once(queue):
+    assert sorted(queue.claim(BATCH, 'w1', limit=10)) == URLS
+    assert queue.claim(BATCH, 'w2', limit=10) == []
+    assert row(queue, URLS[0]) == (LEASED, 1)
+
+
+def test_complete(queue):
+    queue.complete(BATCH, queue.claim(BATCH, 'w1', limit=10))
+    assert queue.stats(BATCH) == {DONE: 2}
+
+
+def test_defer_does_not_count_attempts(queue):
+    url = URLS[0]
+    for _ in range(5):
+        assert url in queue.claim(BATCH, 'w1', limit=10)
+        queue.defer(BATCH, [(url, 0), (URLS[1], 0)])
+    assert row(queue, url) == (PENDING, 0)
+    # 推迟过多次之后，一次临时失败只安排退避重试，不会直接标记为失败
+    queue.claim(BATCH, 'w1', limit=10)
+    assert queue.fail(BATCH, url, 'timeout') == PENDING
+    assert row(queue, url) == (PENDING, 1)
+
+
+def test_defer_waits_until_next_check(queue):
+    queue.claim(BATCH, 'w1', limit=10)
+    queue.defer(BATCH, [(URLS[0], time.time() + 3600)])
+    queue.complete(BATCH, URLS[1:])
+    assert queue.claim(BATCH, 'w1', limit=10) == []
+    assert queue.next_retry_in(BATCH) > 3500
+
+
+def test_fail_backs_off_then_gives_up(queue):
+    url = URLS[0]
+    statuses = []
+    for _ in range(3):
+        assert url in queue.claim(BATCH, 'w1', limit=10)
+        statuses.append(queue.fail(BATCH, url, 'timeout'))
+    assert statuses == [PENDING, PENDING, FAILED]
+    assert queue.stats(BATCH) == {FAILED: 1, LEASED: 1}
+    assert queue.claim(BATCH, 'w1', limit=10) == []
+    assert queue.retry_failed(BATCH) == 1
+    assert row(queue, url) == (PENDING, 0)
+
+
+def test_backoff_doubles_up_to_the_limit(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.db'), base_backoff=60, max_backoff=300)
+    assert 48 <= queue.backoff_seconds(1) <= 72
+    assert 96 <= queue.backoff_seconds(2) <= 144
+    assert 240 <= queue.backoff_seconds(10) <= 360
+    queue.close()
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.db'), lease_seconds=-1, max_attempts=2)
+    queue.enqueue(BATCH, URLS[:1])
+    assert queue.claim(BATCH, 'w1') == URLS[:1]
+    # 租约已过期，被其他进程重新领取
+    assert queue.claim(BATCH, 'w2') == URLS[:1]
+    assert row(queue, URLS[0]) == (LEASED, 2)
+    # 用完尝试次数后租约再过期，标记为失败
+    assert queue.claim(BATCH, 'w3') == []
+    assert queue.stats(BATCH) == {FAILED: 1}
+    queue.close()
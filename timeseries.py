@@ -0,0 +1,384 @@
+"""月度快照的时间序列汇总：每写入一行 (日期, 郊区, 类型) 就增量更新 trends 表
+
+trends 表与 results 在同一个SQLite文件、同一个事务里维护，每行保存相对上一期的环比、
+相对一年前的同比、租金回报率变化、3期/12期滑动平均，以及按同比涨幅的排名和排名变化。
+新快照只需要读取同一序列最近十几期的数据，查询走 (日期, 类型, 指标) 索引，
+耗时与结果行数相关，与历史长度无关。
+
+用法:
+    python timeseries.py movers --metric yoy_change --type house --limit 20
+    python timeseries.py movers --metric yield_change --ascending
+    python timeseries.py climbers --limit 20
+    python timeseries.py series "Glen Waverley 3150" --type unit
+    python timeseries.py rebuild          # 从 results 全量重建（导入或合并旧数据之后）
+"""
+import argparse
+import sqlite3
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from result_store import DEFAULT_DB, PROPERTY_TYPES
+
+DATE_FORMAT = '%Y.%m.%d'
+# 滑动平均的期数
+SHORT_WINDOW = 3
+LONG_WINDOW = 12
+# 同比基期取一年前附近的快照：不早于一年前45天、不晚于一年前15天，取其中最新的一期
+BASE_EARLIEST = timedelta(days=45)
+BASE_LATEST = timedelta(days=15)
+# 新快照会影响其后这么长时间内的快照（它们的环比、滑动平均或同比基期可能用到这一期）
+AFFECTED_SPAN = timedelta(days=366 + 45)
+
+# UPDATE ... FROM 需要 SQLite 3.33 及以上；更早的版本按"同期同类型中同比涨幅更高的行数 + 1"
+# 用相关子查询计算，与 RANK() 的结果相同，走 (date, property_type, yoy_change) 索引
+UPDATE_FROM = sqlite3.sqlite_version_info >= (3, 33, 0)
+RANK_BY_JOIN = """
+    UPDATE trends SET yoy_rank = ranked.yoy_rank
+    FROM (
+        SELECT suburb, property_type, date,
+               CASE WHEN yoy_change IS NULL THEN NULL
+                    ELSE RANK() OVER (PARTITION BY property_type ORDER BY yoy_change IS NULL, yoy_change DESC)
+               END AS yoy_rank
+        FROM trends WHERE date = ?
+    ) AS ranked
+    WHERE trends.suburb = ranked.suburb AND trends.property_type = ranked.property_type
+      AND trends.date = ranked.date
+"""
+RANK_BY_COUNT = """
+    UPDATE trends SET yoy_rank = CASE WHEN yoy_change IS NULL THEN NULL ELSE (
+        SELECT COUNT(*) + 1 FROM trends AS better
+        WHERE better.date = trends.date AND better.property_type = trends.property_type
+          AND better.yoy_change > trends.yoy_change
+    ) END
+    WHERE date = ?
+"""
+
+# 可以排序查询的指标，每个都有 (date, property_type, 指标) 索引
+METRICS = ('yoy_change', 'mom_change', 'yield_change', 'rank_change', 'median_value', 'rental_yield')
+
+TRENDS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS trends (
+        suburb TEXT NOT NULL,
+        property_type TEXT NOT NULL,
+        date TEXT NOT NULL,
+        median_value REAL,
+        rental_yield REAL,
+        prev_date TEXT,
+        mom_change REAL,
+        yield_change REAL,
+        base_date TEXT,
+        yoy_change REAL,
+        avg_value_3 REAL,
+        avg_value_12 REAL,
+        avg_yield_3 REAL,
+        yoy_rank INTEGER,
+        rank_change INTEGER,
+        PRIMARY KEY (suburb, property_type, date)
+    ) WITHOUT ROWID;
+""" + ''.join(
+    f"CREATE INDEX IF NOT EXISTS idx_trends_{metric} ON trends (date, property_type, {metric});\n"
+    for metric in METRICS)
+
+TREND_COLUMNS = ('suburb', 'property_type', 'date', 'median_value', 'rental_yield', 'prev_date', 'mom_change',
+                 'yield_change', 'base_date', 'yoy_change', 'avg_value_3', 'avg_value_12', 'avg_yield_3')
+
+
+def ensure_schema(conn):
+    conn.executescript(TRENDS_SCHEMA)
+
+
+def _parse_date(text):
+    return datetime.strptime(text, DATE_FORMAT)
+
+
+def _format_date(date):
+    return date.strftime(DATE_FORMAT)
+
+
+def _base_window(date_text):
+    """同比基期允许的日期范围 (最早, 最晚)，格式与快照日期相同，可以直接按字符串比较"""
+    date = _parse_date(date_text)
+    try:
+        year_ago = date.replace(year=date.year - 1)
+    except ValueError:  # 2月29日
+        year_ago = date.replace(year=date.year - 1, day=28)
+    return _format_date(year_ago - BASE_EARLIEST), _format_date(year_ago + BASE_LATEST)
+
+
+def _percent_change(current, previous):
+    if current is None or not previous:
+        return None
+    return round((current - previous) / previous * 100, 4)
+
+
+def _mean(values):
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else None
+
+
+def rollup(suburb, property_type, current, history, base):
+    """计算一行 trends
+
+    current 为 (日期, 中位价, 回报率)；history 为更早的快照，按日期从新到旧，至少包含
+    LONG_WINDOW - 1 期（不足时有多少算多少）；base 为同比基期 (日期, 中位价) 或 None。
+    """
+    date, value, rental_yield = current
+    previous = history[0] if history else None
+    recent = [current] + list(history[:LONG_WINDOW - 1])
+    yield_change = None
+    if previous and rental_yield is not None and previous[2] is not None:
+        yield_change = round(rental_yield - previous[2], 4)
+    return (
+        suburb, property_type, date, value, rental_yield,
+        previous[0] if previous else None,
+        _percent_change(value, previous[1]) if previous else None,
+        yield_change,
+        base[0] if base else None,
+        _percent_change(value, base[1]) if base else None,
+        _mean(row[1] for row in recent[:SHORT_WINDOW]),
+        _mean(row[1] for row in recent),
+        _mean(row[2] for row in recent[:SHORT_WINDOW]),
+    )
+
+
+def _write_trends(conn, rows):
+    # 排名由 refresh_ranks 单独维护，这里只更新其余的列
+    conn.executemany(f"""
+        INSERT INTO trends ({', '.join(TREND_COLUMNS)}) VALUES ({', '.join('?' * len(TREND_COLUMNS))})
+        ON CONFLICT (suburb, property_type, date) DO UPDATE SET
+            {', '.join(f'{column} = excluded.{column}' for column in TREND_COLUMNS[3:])}
+    """, rows)
+
+
+def _rollup_from_db(conn, suburb, property_type, date):
+    current = conn.execute("""
+        SELECT date, median_value, rental_yield FROM results
+        WHERE suburb = ? AND property_type = ? AND date = ?
+    """, (suburb, property_type, date)).fetchone()
+    if current is None:
+        return None
+    history = conn.execute("""
+        SELECT date, median_value, rental_yield FROM results
+        WHERE suburb = ? AND property_type = ? AND date < ?
+        ORDER BY date DESC LIMIT ?
+    """, (suburb, property_type, date, LONG_WINDOW - 1)).fetchall()
+    earliest, latest = _base_window(date)
+    base = conn.execute("""
+        SELECT date, median_value FROM results
+        WHERE suburb = ? AND property_type = ? AND date BETWEEN ? AND ?
+        ORDER BY date DESC LIMIT 1
+    """, (suburb, property_type, earliest, latest)).fetchone()
+    return rollup(suburb, property_type, current, history, base)
+
+
+def apply_rows(conn, keys):
+    """results 中 (日期, 郊区, 类型) 写入或更新后调用，与写入在同一个事务里
+
+    按月追加时只计算新的一行；补录或修改较早的快照时，会一并重算其后受影响的快照。
+    返回受影响的快照日期集合，排名需要之后用 refresh_ranks 更新。
+    """
+    dirty = set()
+    for date, suburb, property_type in keys:
+        later = conn.execute("""
+            SELECT date FROM results
+            WHERE suburb = ? AND property_type = ? AND date > ? AND date <= ?
+            ORDER BY date
+        """, (suburb, property_type, date, _format_date(_parse_date(date) + AFFECTED_SPAN))).fetchall()
+        rows = []
+        for affected in [date] + [row[0] for row in later]:
+            row = _rollup_from_db(conn, suburb, property_type, affected)
+            if row is not None:
+                rows.append(row)
+                dirty.add(affected)
+        _write_trends(conn, rows)
+    return dirty
+
+
+def refresh_ranks(conn, dates):
+    """重算这些日期按同比涨幅的排名（每种类型分别排名），以及这些日期和下一期的排名变化
+
+    每个日期的代价与当期郊区数相关；一次抓取结束时调用一次。
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return
+    rank = RANK_BY_JOIN if UPDATE_FROM else RANK_BY_COUNT
+    for date in dates:
+        conn.execute(rank, (date,))
+    # 排名变化 = 上一期排名 - 本期排名（正数为上升）。其后的快照如果以这些日期为上一期，也要重算；
+    # 它们都在 AFFECTED_SPAN 之内，按日期范围走索引，不扫描整个历史
+    placeholders = ', '.join('?' * len(dates))
+    rank_change = """
+        UPDATE trends SET rank_change = (
+            SELECT previous.yoy_rank - trends.yoy_rank FROM trends AS previous
+            WHERE previous.suburb = trends.suburb AND previous.property_type = trends.property_type
+              AND previous.date = trends.prev_date
+        )
+    """
+    conn.execute(f"{rank_change} WHERE date IN ({placeholders})", dates)
+    conn.execute(f"{rank_change} WHERE date > ? AND date <= ? AND prev_date IN ({placeholders})",
+                 [dates[0], _format_date(_parse_date(dates[-1]) + AFFECTED_SPAN)] + dates)
+
+
+def rebuild(conn):
+    """由 results 全量重建 trends（导入Markdown、合并分片之后，或第一次启用时），返回行数"""
+    series = defaultdict(list)
+    for suburb, property_type, date, value, rental_yield in conn.execute("""
+        SELECT suburb, property_type, date, median_value, rental_yield FROM results
+        ORDER BY suburb, property_type, date
+    """):
+        series[(suburb, property_type)].append((date, value, rental_yield))
+    rows = []
+    for (suburb, property_type), snapshots in series.items():
+        dates = [snapshot[0] for snapshot in snapshots]
+        for index, current in enumerate(snapshots):
+            history = snapshots[max(0, index - LONG_WINDOW + 1):index][::-1]
+            earliest, latest = _base_window(current[0])
+            position = bisect_right(dates, latest, 0, index) - 1
+            base = snapshots[position][:2] if position >= 0 and dates[position] >= earliest else None
+            rows.append(rollup(suburb, property_type, current, history, base))
+    conn.execute("DELETE FROM trends")
+    _write_trends(conn, rows)
+    refresh_ranks(conn, {row[2] for row in rows})
+    return len(rows)
+
+
+class TrendQueries:
+    """trends 表的只读查询；使用独立连接，不阻塞抓取进程的写入"""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        self.conn.row_factory = sqlite3.Row
+
+    def close(self):
+        self.conn.close()
+
+    def latest_date(self):
+        return self.conn.execute("SELECT MAX(date) FROM trends").fetchone()[0]
+
+    def dates(self):
+        """所有快照日期；逐个跳到下一个日期，每步是一次索引查找，不扫描全部行"""
+        return [row[0] for row in self.conn.execute("""
+            WITH RECURSIVE snapshot(date) AS (
+                SELECT MIN(date) FROM trends
+                UNION ALL
+                SELECT (SELECT MIN(date) FROM trends WHERE date > snapshot.date) FROM snapshot
+                WHERE snapshot.date IS NOT NULL
+            )
+            SELECT date FROM snapshot WHERE date IS NOT NULL
+        """)]
+
+    def movers(self, metric='yoy_change', property_type='house', date=None, limit=20, ascending=False):
+        """某期按指标排序的前 limit 个郊区，例如同比涨幅最大、回报率下降最多"""
+        if metric not in METRICS:
+            raise ValueError(f"未知的指标: {metric}，可选 {', '.join(METRICS)}")
+        date = date or self.latest_date()
+        order = 'ASC' if ascending else 'DESC'
+        # 几个指标索引的前缀相同，指定索引以免按另一个索引取出整期数据再排序
+        return self.conn.execute(f"""
+            SELECT * FROM trends INDEXED BY idx_trends_{metric}
+            WHERE date = ? AND property_type = ? AND {metric} IS NOT NULL
+            ORDER BY {metric} {order} LIMIT ?
+        """, (date, property_type, limit)).fetchall()
+
+    def climbers(self, property_type='house', date=None, limit=20):
+        """排名上升最多的郊区"""
+        return self.movers('rank_change', property_type, date, limit)
+
+    def series(self, suburb, property_type=None, since=None, limit=None):
+        """一个郊区的历史（按日期），suburb 必须是完整名称（含邮编），例如 'Glen Waverley 3150'"""
+        conditions, params = ["suburb = ?"], [suburb]
+        if property_type:
+            conditions.append("property_type = ?")
+            params.append(property_type)
+        if since:
+            conditions.append("date >= ?")
+            params.append(since)
+        if not limit:
+            return self.conn.execute(
+                f"SELECT * FROM trends WHERE {' AND '.join(conditions)} ORDER BY property_type, date", params).fetchall()
+        # 最近N期：每种类型各N行
+        params.append(limit * (1 if property_type else len(PROPERTY_TYPES)))
+        rows = self.conn.execute(
+            f"SELECT * FROM trends WHERE {' AND '.join(conditions)} ORDER BY date DESC LIMIT ?", params).fetchall()
+        return sorted(rows, key=lambda row: (row['property_type'], row['date']))
+
+    def snapshot(self, suburb, date=None):
+        """一个郊区某期（默认最新一期）各类型的汇总行"""
+        date = date or self.latest_date()
+        return self.conn.execute(
+            "SELECT * FROM trends WHERE suburb = ? AND date = ? ORDER BY property_type", (suburb, date)).fetchall()
+
+
+def _format_value(value, percent=False):
+    if value is None:
+        return '-'
+    if percent:
+        return f"{value:+.2f}%"
+    if isinstance(value, float):
+        return f"${value:,.0f}" if value >= 1000 else f"{value:.2f}"
+    return str(value)
+
+
+def print_rows(rows):
+    if not rows:
+        print("没有数据")
+        return
+    print("| 日期 | 地区 | 类型 | 价格 | 环比 | 同比 | 回报率 | 回报率变化 | 3期均价 | 12期均价 | 同比排名 | 排名变化 |")
+    print("|------|------|------|------|------|------|--------|------------|---------|----------|----------|----------|")
+    for row in rows:
+        rank_change = row['rank_change']
+        print(f"| {row['date']} | {row['suburb']} | {row['property_type']} | {_format_value(row['median_value'])} "
+              f"| {_format_value(row['mom_change'], True)} | {_format_value(row['yoy_change'], True)} "
+              f"| {_format_value(row['rental_yield'])}% | {_format_value(row['yield_change'])} "
+              f"| {_format_value(row['avg_value_3'])} | {_format_value(row['avg_value_12'])} "
+              f"| {_format_value(row['yoy_rank'])} | {f'{rank_change:+d}' if rank_change is not None else '-'} |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='查询郊区数据的时间序列汇总（环比、同比、滑动平均、排名变化）')
+    parser.add_argument('--db', default=DEFAULT_DB, help='结果数据库文件')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    movers = subparsers.add_parser('movers', help='某期按指标排序的郊区')
+    movers.add_argument('--metric', default='yoy_change', choices=METRICS)
+    movers.add_argument('--ascending', action='store_true', help='从小到大排序（例如跌幅最大）')
+    climbers = subparsers.add_parser('climbers', help='同比排名上升最多的郊区')
+    for sub in (movers, climbers):
+        sub.add_argument('--type', default='house', choices=PROPERTY_TYPES)
+        sub.add_argument('--date', help='快照日期，例如 2025.04.30，默认最新一期')
+        sub.add_argument('--limit', type=int, default=20)
+
+    series = subparsers.add_parser('series', help='一个郊区的历史')
+    series.add_argument('suburb', help="完整郊区名称，例如 'Glen Waverley 3150'")
+    series.add_argument('--type', choices=PROPERTY_TYPES)
+    series.add_argument('--since', help='起始日期，例如 2023.01.31')
+    series.add_argument('--limit', type=int, help='只显示最近N期')
+
+    subparsers.add_parser('rebuild', help='由 results 全量重建 trends 表')
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        from result_store import ResultStore
+        store = ResultStore(args.db)
+        try:
+            print(f"重建了 {store.rebuild_trends()} 行时间序列汇总")
+        finally:
+            store.close()
+        return
+
+    queries = TrendQueries(args.db)
+    try:
+        if args.command == 'movers':
+            print_rows(queries.movers(args.metric, args.type, args.date, args.limit, args.ascending))
+        elif args.command == 'climbers':
+            print_rows(queries.climbers(args.type, args.date, args.limit))
+        else:
+            print_rows(queries.series(args.suburb, args.type, args.since, args.limit))
+    finally:
+        queries.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""持久化工作队列：每个URL都有状态、尝试次数、租约和下次可重试时间
+
+多个进程可以共用同一个队列文件；进程被杀掉后，它的租约过期会被其他进程重新领取。
+"""
+import os
+import random
+import socket
+import sqlite3
+import time
+
+DEFAULT_QUEUE = 'work_queue.db'
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def worker_id():
+    """当前进程的唯一标识，用作租约持有者"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    def __init__(self, path=DEFAULT_QUEUE, lease_seconds=600, max_attempts=5,
+                 base_backoff=60, max_backoff=6 * 3600):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        # isolation_level=None 由我们自己控制事务，领取时用 BEGIN IMMEDIATE 保证原子性
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS work_items (
+                batch TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                next_eligible REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (batch, url)
+            );
+            CREATE INDEX IF NOT EXISTS idx_work_claim ON work_items (batch, status, next_eligible);
+        """)
+
+    def _transaction(self, sql_calls):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = sql_calls()
+            self._conn.execute("COMMIT")
+            return result
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def enqueue(self, batch, urls):
+        """加入一批URL，已经在队列中的保持原状态；返回新加入的数量"""
+        now = time.time()
+
+        def insert():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO work_items (batch, url, status, updated_at) VALUES (?, ?, ?, ?)",
+                [(batch, url, PENDING, now) for url in urls])
+            return self._conn.total_changes - before
+
+        return self._transaction(insert)
+
+    def claim(self, batch, owner, limit=20):
+        """原子地领取最多 limit 个可处理的URL（待处理且已到重试时间，或租约已过期）"""
+        now = time.time()
+
+        def take():
+            # 租约过期且已用完尝试次数的直接标记为失败
+            self._conn.execute(
+                "UPDATE work_items SET status = ?, lease_owner = NULL, updated_at = ? "
+                "WHERE batch = ? AND status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, now, batch, LEASED, now, self.max_attempts))
+            rows = self._conn.execute(
+                "SELECT url FROM work_items WHERE batch = ? AND "
+                "((status = ? AND next_eligible <= ?) OR (status = ? AND lease_expires < ?)) "
+                "ORDER BY next_eligible, url LIMIT ?",
+                (batch, PENDING, now, LEASED, now, limit)).fetchall()
+            urls = [row[0] for row in rows]
+            self._conn.executemany(
+                "UPDATE work_items SET status = ?, attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires = ?, updated_at = ? WHERE batch = ? AND url = ?",
+                [(LEASED, owner, now + self.lease_seconds, now, batch, url) for url in urls])
+            return urls
+
+        return self._transaction(take)
+
+    def extend(self, batch, urls, owner):
+        """延长自己持有的租约"""
+        now = time.time()
+        self._transaction(lambda: self._conn.executemany(
+            "UPDATE work_items SET lease_expires = ?, updated_at = ? "
+            "WHERE batch = ? AND url = ? AND status = ? AND lease_owner = ?",
+            [(now + self.lease_seconds, now, batch, url, LEASED, owner) for url in urls]))
+
+    def complete(self, batch, urls):
+        now = time.time()
+        self._transaction(lambda: self._conn.executemany(
+            "UPDATE work_items SET status = ?, lease_owner = NULL, lease_expires = NULL, "
+            "last_error = NULL, updated_at = ? WHERE batch = ? AND url = ?",
+            [(DONE, now, batch, url) for url in urls]))
+
+    def defer(self, batch, items):
+        """把URL放回待处理状态，到指定时间再领取，不计入尝试次数；items 为 [(url, 时间戳)]
+
+        领取时已经把尝试次数加1，领取中的URL在这里退还这一次。
+        """
+        now = time.time()
+        self._transaction(lambda: self._conn.executemany(
+            "UPDATE work_items SET status = ?, next_eligible = ?, lease_owner = NULL, lease_expires = NULL, "
+            "attempts = CASE WHEN status = ? THEN MAX(attempts - 1, 0) ELSE attempts END, "
+            "updated_at = ? WHERE batch = ? AND url = ?",
+            [(PENDING, max(now, when), LEASED, now, batch, url) for url, when in items]))
+
+    def backoff_seconds(self, attempts):
+        """指数退避：base * 2^(attempts-1)，带±20%抖动，不超过 max_backoff"""
+        delay = min(self.max_backoff, self.base_backoff * 2 ** max(0, attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def fail(self, batch, url, error):
+        """记录一次失败：未达上限的安排退避重试，否则标记为失败"""
+        now = time.time()
+
+        def update():
+            row = self._conn.execute(
+                "SELECT attempts FROM work_items WHERE batch = ? AND url = ?", (batch, url)).fetchone()
+            attempts = row[0] if row else 0
+            if attempts >= self.max_attempts:
+                status, next_eligible = FAILED, now
+            else:
+                status, next_eligible = PENDING, now + self.backoff_seconds(attempts)
+            self._conn.execute(
+                "UPDATE work_items SET status = ?, next_eligible = ?, last_error = ?, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE batch = ? AND url = ?",
+                (status, next_eligible, error, now, batch, url))
+            return status
+
+        return self._transaction(update)
+
+    def retry_failed(self, batch):
+        """把已放弃的URL重新放回队列，尝试次数清零；返回数量"""
+        now = time.time()
+
+        def update():
+            cursor = self._conn.execute(
+                "UPDATE work_items SET status = ?, attempts = 0, next_eligible = 0, updated_at = ? "
+                "WHERE batch = ? AND status = ?", (PENDING, now, batch, FAILED))
+            return cursor.rowcount
+
+        return self._transaction(update)
+
+    def stats(self, batch):
+        rows = self._conn.execute(
+            "SELECT status, COUNT(*) FROM work_items WHERE batch = ? GROUP BY status", (batch,)).fetchall()
+        return dict(rows)
+
+    def next_retry_in(self, batch):
+        """距离下一个退避中的URL可以重试还有多少秒，没有时返回None"""
+        row = self._conn.execute(
+            "SELECT MIN(next_eligible) FROM work_items WHERE batch = ? AND status = ?",
+            (batch, PENDING)).fetchone()
+        return max(0.0, row[0] - time.time()) if row and row[0] is not None else None
+
+    def close(self):
+        self._conn.close()